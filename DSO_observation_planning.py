@@ -42,27 +42,27 @@ result in a list of matching DSOs from the internal catalogue.
 # sudo pip3 install matplotlib-label-lines --break-system-packages
 # sudo pip3 install reportlab --break-system-packages
 
-import os, sys, platform
+import os, sys, platform, time
+import json
 import optparse
-import matplotlib.pyplot as plt
 import numpy as np
 import datetime
-from astropy.visualization import astropy_mpl_style, quantity_support
 import astropy.units as u
-from astropy.coordinates import AltAz, EarthLocation, SkyCoord
+from astropy.coordinates import SkyCoord
 from astropy.time import Time
-from astroquery.simbad import Simbad # https://github.com/astropy/astroquery
 import config # own
 import sky_utils # own
-import pytz
-
-from reportlab.lib import colors
-from reportlab.lib.units import cm
-from reportlab.lib.pagesizes import A4, portrait
-from reportlab.platypus import SimpleDocTemplate, TableStyle, Table
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import Paragraph
-from reportlab.lib.enums import TA_JUSTIFY, TA_LEFT, TA_CENTER, TA_RIGHT
+import export_utils # own
+import catalogue_utils # own
+import index_utils # own
+import calendar_utils # own
+import watch_utils # own
+import validation_utils # own
+import cache_utils # own
+import checkpoint_utils # own
+import planning # own
+# matplotlib (plot_utils) and reportlab are imported where the plots and PDF reports
+# are made, runs without them (--profile embedded) do not load them
 
 debug = False #True
 base_dir = "./"
@@ -97,6 +97,9 @@ parser.add_option('-f', '--debug',
 parser.add_option('-b', '--best',
     action="store_true", dest="best",
     help="Check visibility during the year to find best date and time", default=False)
+parser.add_option('--plot',
+    action="store", dest="plot", choices=["curves", "heatmap", "sheet"],
+    help="--best chart: curves (1st of every month), heatmap (every night, one image per DSO) or sheet (every night, all DSOs in one image)", default="curves")
 
 query_opts_tonight = optparse.OptionGroup(
     parser, 'Tonight parameters',
@@ -116,10 +119,102 @@ query_opts_tonight.add_option('-j', '--justthetopones',
     help="Check visibility of DSOs tonight to find best time, consider the TOP ones only (requires tonight and moon option).", default=False)
 query_opts_tonight.add_option('-r', '--direction',
     action="store", dest="direction",
-    help="Filter tonight's best results for a certain direction (requires tonight and moon option).") # S/W/N/E
+    help="Filter tonight's best results for a certain direction (S/W/N/E/SE/... or an azimuth range like 150-210).") # S/W/N/E
+query_opts_tonight.add_option('-n', '--top',
+    action="store", dest="top",
+    help="Keep only the N DSOs with the best observability score (altitude, darkness, moon).", default=None)
+query_opts_tonight.add_option('--schedule',
+    action="store_true", dest="schedule",
+    help="Plan the night: sequence of DSOs and time blocks with the best summed observability.", default=False)
+query_opts_tonight.add_option('--min_block',
+    action="store", dest="min_block",
+    help="Schedule: minimal time per DSO in minutes", default=30)
+query_opts_tonight.add_option('--overhead',
+    action="store", dest="overhead",
+    help="Schedule: slew/refocus time between two DSOs in minutes", default=10)
+query_opts_tonight.add_option('--min_alt',
+    action="store", dest="min_alt",
+    help="Minimal altitude in degrees for the usable windows, the schedule blocks and the visibility index", default=30)
+query_opts_tonight.add_option('--darkness',
+    action="store", dest="darkness",
+    help="Darkness of the usable windows: nautical (default) or astronomical", default="nautical")
 query_opts_tonight.add_option('-c', '--catalogue',
     action="store", dest="catalogue",
-    help="Select catalogue (Messier, Caldwell, Others, All, South", default="Caldwell") # Messier/Caldwell/Others
+    help="Select catalogue (Messier, Caldwell, Others, All, South, Planets)", default="Caldwell") # Messier/Caldwell/Others
+query_opts_tonight.add_option('--catalogue_file',
+    action="store", dest="catalogue_file",
+    help="Check all objects of a local catalogue file (OpenNGC CSV or name;ra;dec CSV) instead of --catalogue", default=None)
+query_opts_tonight.add_option('--chunk_size',
+    action="store", dest="chunk_size",
+    help="Number of catalogue file objects evaluated at once", default=500)
+
+parser.add_option('--index',
+    action="store_true", dest="index",
+    help="Best placed DSOs of the catalogue at the date (--thenights_date) from the annual visibility index, built if needed", default=False)
+
+parser.add_option('--calendar',
+    action="store_true", dest="calendar",
+    help="Moon-free dark time of the nights from the night's date on (-n nights, default 30)", default=False)
+parser.add_option('--min_dark_hours',
+    action="store", dest="min_dark_hours", type="float",
+    help="Skip nights with less moon-free dark time (hours, sun below -18 deg, moon down or thin)", default=None)
+parser.add_option('--max_moon_illumination',
+    action="store", dest="max_moon_illumination", type="float",
+    help="A moon above the horizon still counts as dark time below this illuminated fraction", default=0.25)
+
+parser.add_option('--near',
+    action="store", dest="near",
+    help="List the catalogue objects within --radius of this DSO", default=None)
+parser.add_option('--radius',
+    action="store", dest="radius", type="float",
+    help="Radius of --near in deg", default=10.0)
+parser.add_option('--above',
+    action="store", dest="above", type="float",
+    help="List the catalogue objects above this altitude in deg at --at (and --direction)", default=None)
+parser.add_option('--at',
+    action="store", dest="at",
+    help="Local time hh:mm of --above, times before noon belong to the morning after the night's date", default="23:00")
+
+parser.add_option('--jobs-file',
+    action="store", dest="jobs_file",
+    help="Run all tonight reports of a JSON/YAML list of runs (sites, dates, catalogues, options) with shared work", default=None)
+
+parser.add_option('--build_catalogue',
+    action="store_true", dest="build_catalogue",
+    help="Resolve all DSOs of the built-in catalogues once via Simbad and store them in the local catalogue for offline name resolution", default=False)
+
+parser.add_option('--watch',
+    action="store_true", dest="watch",
+    help="Live table of the catalogue: current altitude, azimuth, time to culmination and to setting", default=False)
+parser.add_option('--interval',
+    action="store", dest="interval",
+    help="Refresh interval of --watch in seconds", default=10)
+
+parser.add_option('--engine',
+    action="store", dest="engine",
+    help="Alt/az computation of the DSOs: fast (cached ERFA rotations, default), astropy, skyfield or ephem", default="fast")
+
+parser.add_option('--backend',
+    action="store", dest="backend",
+    help="Ephemeris library for sun, moon and twilight times: astropy, skyfield or ephem (default: astropy positions, ephem twilight)", default=None)
+
+parser.add_option('--profile',
+    action="store", dest="profile",
+    help="embedded: low memory for small observatory computers, e.g. a Raspberry Pi (packaged catalogue only, sun and moon from ephem, samples of the night only, text and JSON output, no plots and PDF reports)", default=None)
+
+parser.add_option('--benchmark',
+    action="store_true", dest="benchmark",
+    help="Compare runtime and accuracy of the ephemeris backends for tonight", default=False)
+
+parser.add_option('--validate',
+    action="store_true", dest="validate",
+    help="Compare --engine/--backend/--samples with the astropy reference of the catalogue over the year at Frankfurt and Windhoek", default=False)
+parser.add_option('--validate_step',
+    action="store", dest="validate_step",
+    help="Validation: every n-th night of the year", default=7)
+parser.add_option('--samples',
+    action="store", dest="samples",
+    help="Validation: samples per night of the compared path (reference: 1000)", default=1000)
 
 parser.add_option('-i', '--configuration',
     action="store", dest="configuration",
@@ -127,508 +222,112 @@ parser.add_option('-i', '--configuration',
 
 parser.add_option_group(query_opts_tonight)
 
-options, args = parser.parse_args()
-
-if debug:
-  print("Find best tonight's DSOs: " + str(options.tonight))
-  if options.thenights_date:
-    print("The night's date: " + str(options.thenights_date))
-  print("Consider moon: " + str(options.moon))
-  print("  display only the TOP ones: " + str(options.justthetopones))
-  print("  filter for direction: " + str(options.direction))
-  print("  catalogue: " + str(options.catalogue))
-  print("  config: " + str(options.configuration))
-
-if str(options.configuration) == "Frankfurt":
-  config.coordinates = config.coordinates_Frankfurt
-if str(options.configuration) == "Windhoek":
-  config.coordinates = config.coordinates_Windhoek  
-
-today = datetime.date.today()
-
-if options.thenights_date:
-  the_date = options.thenights_date.split(".")
-  today = today.replace(day=int(the_date[0]), month=int(the_date[1]), year=int(the_date[2]))
-
-theDate = today.strftime("%d.%m.%Y")
-
-if options.debug:
-  debug = True
-
-my_DSO_dict = {}
-my_DSO_dict_messier = {"M1" : "M1", "M2" : "M2", "M3" : "M3", "M4" : "M4", "M5" : "M5", "M6" : "M6", "M7" : "M7", "M8" : "M8", "M9" : "M9", "M10" : "M10", 
-               "M11" : "M11", "M12" : "M12", "M13" : "M13", "M14" : "M14", "M15" : "M15", "M16" : "M16", "M17" : "M17", "M18" : "M18", 
-               "M19" : "M19", "M20" : "M20", "M21" : "M21", "M22" : "M22", "M23" : "M23", "M24" : "M24", "M25" : "M25", "M26" : "M26", 
-               "M27" : "M27", "M28" : "M28", "M29" : "M29", "M30" : "M30", "M31" : "M31", "M32" : "M32", "M33" : "M33", "M34" : "M34", 
-               "M35" : "M35", "M36" : "M36", "M37" : "M37", "M38" : "M38", "M39" : "M39", "M40" : "M40", "M41" : "M41", "M42" : "M42", 
-               "M43" : "M43", "M44" : "M44", "M45" : "M45", "M46" : "M46", "M47" : "M47", "M48" : "M48", "M49" : "M49", "M50" : "M50", 
-               "M51" : "M51", "M52" : "M52", "M53" : "M53", "M54" : "M54", "M55" : "M55", "M56" : "M56", "M57" : "M57", "M58" : "M58", 
-               "M59" : "M59", "M60" : "M60", "M61" : "M61", "M62" : "M62", "M63" : "M63", "M64" : "M64", "M65" : "M65", "M66" : "M66", 
-               "M67" : "M67", "M68" : "M68", "M69" : "M69", "M70" : "M70", "M71" : "M71", "M72" : "M72", "M73" : "M73", "M74" : "M74",
-               "M75" : "M75", "M76" : "M76", "M77" : "M77", "M78" : "M78", "M79" : "M79", "M80" : "M80", "M81" : "M81", "M82" : "M82",
-               "M83" : "M83", "M84" : "M84", "M85" : "M85", "M86" : "M86", "M87" : "M87", "M88" : "M88", "M89" : "M89", "M90" : "M90",
-               "M91" : "M91", "M92" : "M92", "M93" : "M93", "M94" : "M94", "M95" : "M95", "M96" : "M96", "M97" : "M97", "M98" : "M98", 
-               "M99" : "M99", "M100" : "M100", "M101" : "M101", "M102" : "M102", "M103" : "M103", "M104" : "M104", "M105" : "M105", 
-               "M106" : "M106", "M107" : "M107", "M108" : "M108", "M109" : "M109", "M110" : "M110"}
-if debug:
-  my_DSO_dict_messier = {"M1" : "M1", "M2" : "M2", "M3" : "M3", "M4" : "M4", "M5" : "M5", "M6" : "M6", "M7" : "M7", "M8" : "M8", "M9" : "M9", "M10" : "M10"}
-
-my_DSO_dict = my_DSO_dict_messier # default
-
-my_DSO_dict_div = { "NGC7822" : "NGC7822", 
-               "SH2-173" : "SH2-173", "NGC210" : "NGC210", "IC63" : "IC63", "SH2-188" : "SH2-188", "NGC613" : "NGC613", 
-               "NGC660" : "NGC660", "NGC672" : "NGC672", "NGC918" : "NGC918", "IC1795" : "IC1795", "IC1805" : "IC1805", 
-               "NGC1055" : "NGC1055", "IC1848" : "IC1848", "SH2-200" : "SH2-200", "NGC1350" : "NGC1350", "NGC1499" : "NGC1499",
-               "LBN777" : "LBN777", "NGC1532" : "NGC1532", "LDN1495" : "LDN1495", "NGC1555" : "NGC1555", "NGC1530" : "NGC1530", 
-               "NGC1624" : "NGC1624", "NGC1664" : "NGC1664", "Melotte15" : "Melotte15", "vdb31" : "vdb31", "NGC1721" : "NGC1721",
-               "IC2118" : "IC2118", "IC410" : "IC410", "SH2-223" : "SH2-223", "SH2-224" : "SH2-224", "IC434" : "IC434", 
-               "SH2-240" : "SH2-240", "LDN1622" : "LDN1622", "SH2-261" : "SH2-261", "SH2-254" : "SH2-254", "NGC2202" : "NGC2202",
-               "IC443" : "IC443", "NGC2146" : "NGC2146", "NGC2217" : "NGC2217", "NGC2245" : "NGC2245", "SH2-308" : "SH2-308", 
-               "NGC2327" : "NGC2327", "SH2-301" : "SH2-301", "Abell21" : "Abell21", "NGC2835" : "NGC2835", "Abell33" : "Abell33", 
-               "NGC2976" : "NGC2976", "Arp316" : "Arp316", "NGC3359" : "NGC3359", "Arp214" : "Arp214", "NGC4395" : "NGC4395", 
-               "NGC4535" : "NGC4535", "Abell35" : "Abell35", "NGC5068" : "NGC5068", "NGC5297" : "NGC5297", "NGC5371" : "NGC5371", 
-               "NGC5364" : "NGC5364", "NGC5634" : "NGC5634", "NGC5701" : "NGC5701", "NGC5963" : "NGC5963", "NGC5982" : "NGC5982", 
-               "IC4592" : "IC4592", "IC4628" : "IC4628", "Barnard59" : "Barnard59", "SH2-003" : "SH2-003", "Barnard252" : "Barnard252",
-               "NGC6334" : "NGC6334", "NGC6357" : "NGC6357", "Barnard75" : "Barnard75", "NGC6384" : "NGC6384", "SH2-54" : "SH2-54", 
-               "vdb126" : "vdb126", "SH2-82" : "SH2-82", "NGC6820" : "NGC6820", "SH2-101" : "SH2-101", "WR134" : "WR134", 
-               "LBN331" : "LBN331", "LBN325" : "LBN325", "SH2-112" : "SH2-112", "SH2-115" : "SH2-115", "LBN468" : "LBN468", 
-               "IC5070" : "IC5070", "vdb141" : "vdb141", "SH2-114" : "SH2-114", "vdb152" : "vdb152", "SH2-132" : "SH2-132", 
-               "Arp319" : "Arp319", "NGC7497" : "NGC7497", "SH2-157" : "SH2-157", "NGC7606" : "NGC7606", "Abell85" : "Abell85", 
-               "LBN 564" : "LBN 564", "SH2-170" : "SH2-170", "LBN603" : "LBN603", "LBN639" : "LBN639", "LBN640" : "LBN640", 
-               "LDN1333" : "LDN1333", "NGC1097" : "NGC1097", "LBN762" : "LBN762", "SH2-202" : "SH2-202", "vdb14" : "vdb14", 
-               "vdb15" : "vdb15", "LDN1455" : "LDN1455", "vdb13" : "vdb13", "vdb16" : "vdb16", "IC348" : "IC348", "SH2-205" : "SH2-205",
-               "SH2-204" : "SH2-204", "Barnard208" : "Barnard208", "Barnard7" : "Barnard7", "vdb27" : "vdb27", "Barnard8" : "Barnard8",
-               "Barnard18" : "Barnard18", "SH2-216" : "SH2-216", "Abell7" : "Abell7", "SH2-263" : "SH2-263", "SH2-265" : "SH2-265",
-               "SH2-232" : "SH2-232", "Barnard35" : "Barnard35", "SH2-249" : "SH2-249", "IC447" : "IC447", "SH2-280" : "SH2-280",
-               "SH2-282" : "SH2-282", "SH2-304" : "SH2-304", "SH2-284" : "SH2-284", "LBN1036" : "LBN1036", "NGC2353" : "NGC2353",
-               "SH2-310" : "SH2-310", "SH2-302" : "SH2-302", "Gum14" : "Gum14", "Gum15" : "Gum15", "Gum17" : "Gum17", "Abell31" : "Abell31",
-               "SH2-1" : "SH2-1", "SH2-273" : "SH2-273", "SH2-46" : "SH2-46", "SH2-34" : "SH2-34", "IC4685" : "IC4685", "SH2-91" : "SH2-91",
-               "Barnard147" : "Barnard147", "IC1318" : "IC1318", "LBN380" : "LBN380", "Barnard150" : "Barnard150", "LBN552" : "LBN552",
-               "SH2-119" : "SH2-119", "SH2-124" : "SH2-124", "Barnard169" : "Barnard169", "LBN420" : "LBN420", "SH2-134" : "SH2-134",
-               "SH2-150" : "SH2-150", "LDN1251" : "LDN1251", "LBN438" : "LBN438", "SH2-154" : "SH2-154", "LDN1218" : "LDN1218", 
-               "SH2-160" : "SH2-160", "SH2-122" : "SH2-122", "LBN575" : "LBN575", "LDN1262" : "LDN1262", "LBN534" : "LBN534", 
-               "vdb158" : "vdb158", "NGC7380" : "NGC7380", "NGC6543" : "NGC6543", "NGC2264" : "NGC2264", "NGC474" : "NGC474",
-               "NGC246" : "NGC246", "NGC7479" : "NGC7479", "NGC7741" : "NGC7741", "IC5068" : "IC5068", "SH2-155" : "SH2-155", 
-               "NGC7008" : "NGC7008", "NGC4676A" : "NGC4676A", "NGC4536" : "NGC4536", "NGC2403" : "NGC2403", "IC11" : "IC11", 
-               "NGC2359" : "NGC2359", "IC5067" : "IC5067", "NGC281" : "NGC281", "IC44" : "IC44", "NGC6992" : "NGC6992", 
-               "NGC7293" : "NGC7293", "NGC6960" : "NGC6960", "IC4703" : "IC4703", "NGC6618" : "NGC6618", "UGC1810" : "UGC1810"}
-    
-# caldwell
-my_DSO_dict_caldwell = {"C1" : "NGC188", "C2" : "NGC40", "C3" : "NGC4236", "C4" : "NGC7023", "C5" : "IC342", "C6" : "NGC6543", "C7" : "NGC2403", 
-                        "C8" : "NGC559", "C9" : "SH2-155", "C10" : "NGC663", "C11" : "NGC7635", "C12" : "NGC6946", "C13" : "NGC457", 
-                        "C14" : "NGC869", "C15" : "NGC6826", "C16" : "NGC7243", "C17" : "NGC147", "C18" : "NGC185", "C19" : "IC5146", 
-                        "C20" : "NGC7000", "C21" : "NGC4449", "C22" : "NGC7662", "C23" : "NGC891", "C24" : "NGC1275", "C25" : "NGC2419", 
-                        "C26" : "NGC4244", "C27" : "NGC6888", "C28" : "NGC752", "C29" : "NGC5005", "C30" : "NGC7331", "C31" : "IC405", 
-                        "C32" : "NGC4631", "C33" : "NGC6992", "C34" : "NGC6960", "C35" : "NGC4889",
-                        "C36" : "NGC4559", "C37" : "NGC6885", "C38" : "NGC4546", "C39" : "NGC2392", "C40" : "NGC3626", "C41" : "HYADES",
-                        "C42" : "NGC7006", "C43" : "NGC7814", "C44" : "NGC7479", "C45" : "NGC5248", "C46" : "NGC2261", "C47" : "NGC6934",
-                        "C48" : "NGC2775", "C49" : "NGC2238", "C50" : "NGC2244", "C51" : "IC16", "C52" : "NGC4697", "C53" : "NGC3115",
-                        "C54" : "NGC2506", "C55" : "NGC7009", "C56" : "NGC246", "C57" : "NGC6822", "C58" : "NGC2360", "C59" : "NGC3242",
-                        "C60" : "NGC4038", "C61" : "NGC4039", "C62" : "NGC247", "C63" : "NGC7293", "C64" : "NGC2362", "C65" : "NGC253",
-                        "C66" : "NGC5694", "C67" : "NGC1097", "C68" : "NGC6729", "C69" : "NGC6302", "C70" : "NGC300"}
-if debug:
-  my_DSO_dict_caldwell = {"C1" : "NGC188", "C2" : "NGC40", "C3" : "NGC4236", "C4" : "NGC7023", "C5" : "IC342", "C6" : "NGC6543", "C7" : "NGC2403", 
-                        "C8" : "NGC559", "C9" : "SH2-155", "C10" : "NGC663", "C11" : "NGC7635", "C12" : "NGC6946", "C13" : "NGC457" }
-
-# Solveigh's list of DSOs in southern hemisphere
-my_DSO_dict_southern_hemisphere = { "IC4406" : "IC4406", "IC4499" : "IC4499", "NGC104" : "NGC104", "NGC253" : "NGC253", "NGC346" : "NGC346",
-                                    "NGC1365" : "NGC1365", "NGC2070" : "NGC2070", "NGC2736" : "NGC2736", "NGC3132" : "NGC3132",
-                                    "NGC3293" : "NGC3293", "NGC3324" : "NGC3324", "NGC3372" : "NGC3372", "NGC3532" : "NGC3532",
-                                    "NGC3603" : "NGC3603", "NGC4372" : "NGC4372", "NGC4650" : "NGC4650", "NGC4755" : "NGC4755",
-                                    "NGC4945" : "NGC4945", "NGC5128" : "NGC5128", "NGC5139" : "NGC5139", "NGC5189" : "NGC5189",
-                                    "NGC5286" : "NGC5286", "NGC6300" : "NGC6300", "NGC6302" : "NGC6302", "NGC6334" : "NGC6334",
-                                    "NGC6337" : "NGC6337", "NGC6723" : "NGC6723", "NGC6744" : "NGC6744", "NGC6769" : "NGC6769",
-                                    "NGC6770" : "NGC6770", "NGC6771" : "NGC6771", "NGC6872" : "NGC6872" } #, "PN G329.0+01.9" : "PN G329.0+01.9",
-                                    #"SNR G263.9-03.3" : "SNR G263.9-03.3" }
-
-if str(options.catalogue) == "Messier" and options.dso == None:
-  my_DSO_dict = my_DSO_dict_messier
-  if debug:
-    print("Check Messier catalogue...")
-if str(options.catalogue) == "Caldwell" and options.dso == None:
-  my_DSO_dict = my_DSO_dict_caldwell
-  if debug:
-    print("Check Caldwell catalogue...")
-if str(options.catalogue) ==  "Others" and options.dso == None:
-  my_DSO_dict = my_DSO_dict_div
-  if debug:
-    print("Check my catalogue...")
-if options.catalogue == "All" and options.dso == None:
-  my_DSO_dict = my_DSO_dict_messier
-  my_DSO_dict.update(my_DSO_dict_caldwell)
-  my_DSO_dict.update(my_DSO_dict_div)
-  if debug:
-    print("Check all catalogues...")
-if str(options.catalogue) ==  "South" and options.dso == None:
-  my_DSO_dict = my_DSO_dict_southern_hemisphere
-  if debug:
-    print("Check Southern Hemisphere catalogue...")
-
-if options.dso != None:
-  dso_name = str(options.dso).upper()
-  my_DSO_dict = { dso_name : dso_name }
-
-#TEST
-#my_DSO_dict = {"M1" : "M1", "M2" : "M2", "M13" : "M13", "M31" : "M31", "M42":"M42"}
-
-if debug:
-  print(my_DSO_dict)
-
-class DSO:
-
-  def __init__(self, dso_name, dso_identifier, today, tomorrow):
-    self.the_object_name = str(dso_name).upper()
-    self.the_object_identifier = str(dso_identifier).upper() # e.g. M3, C19
-    self.theDate = today.strftime("%d.%m.%Y")
-    self.theDate_american = today.strftime("%Y-%m-%d")
-    self.today = today
-    self.tomorrow = tomorrow
-    self.tomorrow_american = tomorrow.strftime("%Y-%m-%d")
-
-    if debug:
-      print("Today: " + str(self.today))
-      print("Tomorrow: " + str(self.tomorrow))
-
-    self.civil_night_start, self.civil_night_end, self.nautical_night_start, self.nautical_night_end, self.astronomical_night_start, self.astronomical_night_end = sky_utils.astro_night_times(self.theDate, config.coordinates["latitude"], config.coordinates["longitude"], debug)
-
-    if debug:
-      print("Latitude: " + str(config.coordinates["latitude"]))
-      print("Longitude: " + str(config.coordinates["longitude"]))
-      print("Elevation: " + str(config.coordinates["elevation"]))
-      print("Location: " + str(config.coordinates["location"]))
-      print("Nautical night start: " + str(self.nautical_night_start))
-      print("Nautical night end: " + str(self.nautical_night_end))
-      print("Astronomical night start: " + str(self.astronomical_night_start))
-      print("Astronomical night end: " + str(self.astronomical_night_end))
-    if self.astronomical_night_start == None and self.astronomical_night_end == None:
-      self.astronomical_night_start = self.nautical_night_start
-      self.astronomical_night_end = self.nautical_night_end
-      if debug:
-        print("Astronomical night start: " + str(self.astronomical_night_start))
-        print("Astronomical night end: " + str(self.astronomical_night_end))
-
-    ##############################################################################
-    # `astropy.coordinates.SkyCoord.from_name` uses Simbad to resolve object
-    # names and retrieve coordinates.
-    #
-    # Get the coordinates of the desired DSO:
-    self.the_object = SkyCoord.from_name(self.the_object_name)
-    if debug:
-      print("SkyCoord: " + str(self.the_object))
-      #print(self.the_object.ra)
-
-    # http://vizier.u-strasbg.fr/cgi-bin/OType?$1
-    result_table = ""
-    try:
-      # SELECT a.main_id, a.otype, b.B, b.V FROM basic AS a JOIN allfluxes AS b ON oidref = oid WHERE a.main_id='m13';
-      #query = "SELECT main_id, otype FROM basic WHERE main_id IN ('" + str(self.the_object_name) + "')")
-      query = "SELECT a.main_id, a.otype, b.B, b.V FROM basic AS a JOIN allfluxes AS b ON oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
-      query = "SELECT a.main_id, a.otype, b.B, b.V, galdim_minaxis, galdim_majaxis FROM basic AS a JOIN allfluxes AS b ON b.oidref = oid JOIN ident AS c ON c.oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
-      result_table = Simbad.query_tap(query)
-    except Exception as e:
-      print("Simbad lookup error for " + str(self.the_object_name) + ": " + str(e))
-      #result_table = Simbad.query_tap("SELECT main_id, otype FROM basic WHERE main_id IN ('" + str(self.the_object_name) + "')")
-      query = "SELECT a.main_id, a.otype, b.B, b.V FROM basic AS a JOIN allfluxes AS b ON oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
-      query = "SELECT a.main_id, a.otype, b.B, b.V, galdim_minaxis, galdim_majaxis FROM basic AS a JOIN allfluxes AS b ON b.oidref = oid JOIN ident AS c ON c.oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
-      result_table = Simbad.query_tap(query)
-    if debug:
-      print(result_table)
-      print("Main id: " + str(result_table["main_id"]) + "; " + str(len(result_table["main_id"].pformat())))
-    if len(result_table["main_id"].pformat()) == 2:
-      if debug:
-        print("DSO " + str(self.the_object_name) + " not found.")
-      #sys.exit(0)
-      self.object_type = "NONE"
-    else:
-
-      if debug:
-        print("Query result length: " + str(len(result_table["main_id"].pformat())))
-        print(str(result_table["main_id"].pformat()))
-        print(str(result_table["V"].pformat()))
-        print(str(result_table["galdim_majaxis"].pformat()))
-        #print(str(result_table["K"].pformat()))
-
-      if len(result_table["main_id"].pformat()) > 0:
-        otype = result_table["otype"].pformat()[2].strip()
-        if otype != "--":
-          self.object_type = otype
-        if debug:
-          print("Main ID: " + str(result_table["main_id"].pformat()[0].strip())) #Main ID: main_id
-          print("Main ID: " + str(result_table["main_id"].pformat()[1].strip())) #Main ID: -------
-          print("Main ID: " + str(result_table["main_id"].pformat()[2].strip())) #Main ID: M   1
-          '''
-          main_id otype         B                 V         galdim_minaxis galdim_majaxis
-                                                              arcmin         arcmin
-          ------- ----- ----------------- ----------------- -------------- --------------
-          M  31   AGN 4.360000133514404 3.440000057220459          70.79         199.53
-          '''
-          print("Brightness B: " + str(result_table["B"].pformat()[2].strip()) + " V: " + str(result_table["V"].pformat()[2].strip()))
-          print("Size: " + str(result_table["galdim_majaxis"].pformat()[2].strip()) + " x " + str(result_table["galdim_minaxis"].pformat()[2].strip()))
-          print("Object type: " + str(self.object_type))
-
-        mag = result_table["V"].pformat()[2].strip()
-        if mag != "--":
-          self.magnitude = float(mag)
-        else:
-          self.magnitude = -1.0
-        majax = result_table["galdim_majaxis"].pformat()[2].strip()  # arcmin
-        if majax != "--":
-          self.major_axis = float(majax)
-        else:
-          self.major_axis = -1.0
-        minax = result_table["galdim_minaxis"].pformat()[2].strip()  # arcmin
-        if minax != "--":
-          self.minor_axis = float(minax)
-        else:
-          self.minor_axis = -1.0
-      else:
-        self.object_type = ""
-        self.magnitude = -1.0
-        self.major_axis = -1.0
-        self.minor_axis = -1.0
-        self.visible = False
-        self.object_type_string = ""
-
-    if self.object_type == "AGN":
-      self.object_type_string = "Active galaxy nucleus"
-    elif self.object_type == "SNR":
-      self.object_type_string = "SuperNova remnant"
-    elif self.object_type == "SFR":
-      self.object_type_string = "Star forming region"
-    elif self.object_type == "SFR":
-      self.object_type_string = "Star forming region"
-    elif self.object_type == "GNe":
-      self.object_type_string = "Nebula"
-    elif self.object_type == "RNe":
-      self.object_type_string = "Reflection nebula"
-    elif self.object_type == "GDNe":
-      self.object_type_string = "Dark cloud (nebula)"
-    elif self.object_type == "MoC":
-      self.object_type_string = "Molecular cloud"
-    elif self.object_type == "IG":
-      self.object_type_string = "Interacting galaxies"
-    elif self.object_type == "PaG":
-      self.object_type_string = "Pair of galaxies"
-    elif self.object_type == "GiP":
-      self.object_type_string = "Galaxy in pair of galaxies"
-    elif self.object_type == "CGG":
-      self.object_type_string = "Compact group of galaxies"
-    elif self.object_type == "CIG":
-      self.object_type_string = "Cluster of galaxies"
-    elif self.object_type == "BH":
-      self.object_type_string = "Black hole"
-    elif self.object_type == "LSB":
-      self.object_type_string = "Low surface brightness galaxy"
-    elif self.object_type == "SBG":
-      self.object_type_string = "Starburst galaxy"
-    elif self.object_type == "H2G":
-      self.object_type_string = "HII galaxy"
-    elif self.object_type == "GGG":
-      self.object_type_string = "Galaxy"
-    elif self.object_type == "Cl":
-      self.object_type_string = "Cluster of stars"
-    elif self.object_type == "GlC":
-      self.object_type_string = "Globular cluster"
-    elif self.object_type == "OpC":
-      self.object_type_string = "Open cluster"
-    elif self.object_type == "Cl*":
-      self.object_type_string = "Open cluster"
-    elif self.object_type == "LIN":
-      self.object_type_string = "LINER-type active galaxy nucleus"
-    elif self.object_type == "SyG":
-      self.object_type_string = "Seyfert galaxy"
-    elif self.object_type == "Sy1":
-      self.object_type_string = "Seyfert 1 galaxy"
-    elif self.object_type == "Sy2":
-      self.object_type_string = "Seyfert 2 galaxy"
-    elif self.object_type == "GiG":
-      self.object_type_string = "Galaxy towards a group of galaxies"
-    elif self.object_type == "As*":
-      self.object_type_string = "Association of stars"
-    elif self.object_type == "PN":
-      self.object_type_string = "Planetary nebula"
-    else:
-      self.object_type_string = ""
-
-    time = Time(str(self.theDate_american) + " 23:59:00") - utcoffset
-    if debug:
-      print("Observation time: " + str(time))
-
-    ##############################################################################
-    # `astropy.coordinates.EarthLocation.get_site_names` and
-    # `~astropy.coordinates.EarthLocation.get_site_names` can be used to get
-    # locations of major observatories.
-    #
-    # Use `astropy.coordinates` to find the Alt, Az coordinates of the DSO at as
-    # observed from the current location today
-    self.the_object_altaz = self.the_object.transform_to(AltAz(obstime=time, location=the_location))
-    to_alt = self.the_object_altaz.alt
-    to_az = self.the_object_altaz.az
-    if debug:
-      print(str(self.the_object_name) + "'s altitude = " + str(to_alt) + ", azimut = " + str(to_az))
-    direction = sky_utils.compass_direction(to_az.value)
-    if debug:
-      print("Dir@: " + str(time) + ": " + str(direction))
-
-    ##############################################################################
-    # This is helpful since it turns out M33 is barely above the horizon at this
-    # time. It's more informative to find M33's airmass over the course of
-    # the night.
-    #
-    # Find the alt,az coordinates of the object at 100 times evenly spaced between 10pm
-    # and 7am EDT:
-    # +1: otherwise the dso graph does not match the x-axis ticks
-    self.midnight = Time(str(self.tomorrow_american) + " 00:00:00") - utcoffset
-    #self.delta_midnight = np.linspace(-2, 10, 100) * u.hour
-    self.delta_midnight = np.linspace(-12, 12, 1000) * u.hour
-    self.frame_night = AltAz(obstime=self.midnight + self.delta_midnight, location=the_location)
-    self.the_objectaltazs_night = self.the_object.transform_to(self.frame_night)
-
-    ##############################################################################
-    # convert alt, az to airmass with `~astropy.coordinates.AltAz.secz` attribute:
-    #the_objectairmasss_night = the_objectaltazs_night.secz
-    ##############################################################################
-    # Plot the airmass as a function of time:
-    '''
-      plt.plot(delta_midnight, the_objectairmasss_night)
-      plt.xlim(-2, 10)
-      plt.ylim(1, 4)
-      plt.xlabel("Hours from EDT Midnight")
-      plt.ylabel("Airmass [Sec(z)]")
-      plt.show()
-    '''
-
-    ##############################################################################
-    # Use  `~astropy.coordinates.get_sun` to find the location of the Sun at 1000
-    # evenly spaced times between noon on July 12 and noon on July 13:
-    from astropy.coordinates import get_sun
-    self.delta_midnight = np.linspace(-12, 12, 1000) * u.hour
-    self.times_overnight = self.midnight + self.delta_midnight
-    self.frame_over_night = AltAz(obstime=self.times_overnight, location=the_location)
-    self.sunaltazs_over_night = get_sun(self.times_overnight).transform_to(self.frame_over_night)
-
-
-    ##############################################################################
-    # Do the same with `~astropy.coordinates.get_body` to find when the moon is
-    # up. Be aware that this will need to download a 10MB file from the internet
-    # to get a precise location of the moon.
-    from astropy.coordinates import get_body
-    self.moon_over_night = get_body("moon", self.times_overnight)
-    self.moonaltazs_over_night = self.moon_over_night.transform_to(self.frame_over_night)
-
-    self.the_objectaltazs_over_night = self.the_object.transform_to(self.frame_over_night)
-    self.visible = False
-    self.max_alt, self.max_alt_direction, self.max_alt_az, self.max_alt_time, self.max_alt_during_night, self.max_alt_during_night_direction, self.max_alt_during_night_obstime, self.visible = self.max_altitudes(self.frame_over_night, self.the_objectaltazs_over_night)
-
-    # moon data once it is available
-    self.score_at_max_alt, self.top_score_at_max_alt, self.sub_text_moon_at_max_alt, self.moon_dir_at_max_alt, self.moon_alt_at_max_alt, self.moon_phase_percent_at_max_alt = self.moon_check_at_max_alt()
-
-  def max_altitudes(self, frame_over_night, the_objectaltazs_over_night):
-    try:
-      if debug:
-        print("Check object alt az during night time")
-      dso_in_the_dark_ot = []
-      dso_in_the_dark_alt = []
-      dso_in_the_dark_az = []
-
-      if debug:
-        print("Astro night: " + str(self.astronomical_night_start) + "  " + str(self.astronomical_night_end))
-        print("Nautical night: " + str(self.nautical_night_start) + "  " + str(self.nautical_night_start))
-      for o in the_objectaltazs_over_night:
-        dt = o.obstime.tt.datetime
-        #if astronomical_night_start < dt < astronomical_night_end:
-          #print(dt)
-        if self.nautical_night_start < dt < self.nautical_night_end:
-          #if debug:
-          #  print("  " + str(o.obstime) + ": " + str(o.alt) + ", " + str(o.az))
-          dso_in_the_dark_alt.append(o.alt.value)
-          dso_in_the_dark_az.append(o.az.value)
-          dso_in_the_dark_ot.append(o.obstime.tt.datetime)
-
-      if debug:
-        print(len(the_objectaltazs_over_night))
-        print(len(dso_in_the_dark_alt))
-
-      if len(dso_in_the_dark_alt)>0:
-        dso_in_the_dark_alt_max = max(dso_in_the_dark_alt)
-        index_alt_max = dso_in_the_dark_alt.index(dso_in_the_dark_alt_max) #np.argmax(dso_in_the_dark_alt)
-        if debug:
-          print("max: " + str(dso_in_the_dark_alt_max) + " at " + str(dso_in_the_dark_ot[index_alt_max]))
-
-        # check whether object is visible during the night
-        visible = False
-        if len(dso_in_the_dark_alt)>0:
-          v = []
-          for a in dso_in_the_dark_alt:
-            if a > 5:
-              v.append(1)
-          if debug:
-            print(len(dso_in_the_dark_alt))
-            print(len(v))
-          if len(v) > 30:
-            visible = True # DSO is visible for at least 30 minutes during the night time
-          else:
-            visible = False
-
-        if debug:
-          print("DSO night max alt: " + str(dso_in_the_dark_alt_max) + " at " + str(dso_in_the_dark_ot[index_alt_max]))
-        dso_in_the_dark_alt_max_az = dso_in_the_dark_az[index_alt_max]
-        direction_max_alt = sky_utils.compass_direction(dso_in_the_dark_alt_max_az)
-        if debug:
-          print("DSO night max alt direction: " + str(direction_max_alt))
-
-        # Direction of total max. altitude
-        alt_max_total = max(the_objectaltazs_over_night.alt.value)
-        index_alt_max_total = np.argmax(the_objectaltazs_over_night.alt)
-        direction_max_alt_total = sky_utils.compass_direction(the_objectaltazs_over_night.az[index_alt_max_total].value)
-
-        alt_max_total_obstime = dso_in_the_dark_ot[index_alt_max] #frame_over_night.obstime[index_alt_max_total]
-        max_alt_txt = "Max. Alt. " + str(round(alt_max_total,2)) + "deg at: " + str(alt_max_total_obstime) + " in " + str(direction_max_alt_total)
-        if debug:
-          print(max_alt_txt)
-      else:
-        return -1, -1, -1, -1, -1, -1, False
-      return dso_in_the_dark_alt_max, direction_max_alt, dso_in_the_dark_alt_max_az, dso_in_the_dark_ot[index_alt_max], alt_max_total, direction_max_alt_total, alt_max_total_obstime, visible
-    except Exception as e:
-      print(str(e))
-
-
-  def moon_check_at_max_alt(self):
-    score = False
-    top_score = False
-    sub_text = "    "
-
-    try:
-      moon_rise, moon_set, full_moon, moon_phase, moon_phase_percent, moon_alt, moon_az, moon_dist = sky_utils.moon_data(self.theDate, self.max_alt_time.strftime("%H:%M"))
-      moon_dir = sky_utils.compass_direction(moon_az)
+query_opts_export = optparse.OptionGroup(
+    parser, 'Export',
+    'These options write the results in a machine-readable format.',
+    )
+query_opts_export.add_option('-x', '--export',
+    action="store", dest="export",
+    help="Write one summary row per DSO to this file (.csv or .jsonl)", default=None)
+query_opts_export.add_option('-k', '--tracks',
+    action="store", dest="tracks",
+    help="Write the altitude/azimuth tracks of every DSO to this file (.npz)", default=None)
+query_opts_export.add_option('--resume',
+    action="store_true", dest="resume",
+    help="Keep the progress of a --tonight or --best run in a checkpoint and continue an interrupted run from it, failed DSOs are evaluated again", default=False)
+query_opts_export.add_option('--no_cache',
+    action="store_true", dest="no_cache",
+    help="Regenerate plots and PDF reports even if their inputs did not change", default=False)
+parser.add_option_group(query_opts_export)
+
+# options which do not change the content of a plot or report
+output_neutral_options = ["thenights_date", "export", "tracks", "debug", "no_cache", "resume", "jobs_file", "interval"]
+
+class Run:
+  # Options, planner and night of one run: the command line or a job of a
+  # jobs file. The functions of the command line get it instead of globals.
+
+  def __init__(self, options, track_cache=None, output_cache=None):
+    # track_cache: precomputed (alt, az) tracks by (site, date, DSO), shared by the runs of a jobs file, see run_jobs();
+    # output_cache: cache_utils.OutputCache, by default one for this run
+    self.options = options
+    # catalogue of the run: a built-in catalogue, one DSO (--dso) or a catalogue file
+    self.dso_name = None
+    if options.dso != None:
+      self.dso_name = str(options.dso).upper()
+    elif options.catalogue_file != None:
+      options.catalogue = os.path.splitext(os.path.basename(options.catalogue_file))[0]
       if debug:
-        print("  Moon rise: " + str(moon_rise) + " set: " + str(moon_set) + " next full moon: " + str(full_moon) + " phase: " + str(moon_phase) + " (" + str(moon_phase_percent) + " %)")
-        print("  Moon alt " + str(moon_alt) + " az " + str(moon_az) + " dir " + str(moon_dir))
-
-      if float(moon_alt) < 0:
-        msg = "TOP: Moon < the horizon at " + str(self.max_alt_time.strftime("%d.%m. %H:%M"))
-        if debug:
-          print(msg)
-        score = True
-        top_score = True
-        sub_text += "\n    " + msg
-      if moon_dir != self.max_alt_direction:
-        msg = "OK: Dir moon: " + str(moon_dir) + " (" + str(round(moon_az,0)) + ", alt " + " (" + str(round(moon_alt,0)) + ") " + ", DSO: " + str(self.max_alt_direction) + " (" + str(round(self.max_alt_az,0)) + ")"
-        if debug:
-          print(msg)
-        score = True
-        sub_text += "\n    " + msg
-      if moon_phase_percent < 50:
-        msg = "Nice: Moon illumination < 50 %: " + str(moon_phase_percent) + " %"
-        if debug:
-          print(msg)
-        score = True
-        sub_text += "\n    " + msg
-      return score, top_score, sub_text, moon_dir, moon_alt, moon_phase_percent
-    except Exception as e:
-      print("Moon check error: " + str(e))
+        print("Check catalogue file " + str(options.catalogue_file) + "...")
+    elif debug:
+      print("Check " + str(options.catalogue) + " catalogue...")
+    # planner of the run: site, local horizon and the settings of the options
+    self.planner = planning.Planner(options.configuration, options)
+    if track_cache != None:
+      self.planner.track_cache = track_cache
+    # the night of the run, dd.mm.yyyy or today
+    self.today = datetime.date.today()
+    if options.thenights_date:
+      self.today = planning.parse_date(options.thenights_date)
+    self.theDate = self.today.strftime("%d.%m.%Y")
+    self.tomorrow = self.today + datetime.timedelta(days=1)
+    self.my_DSO_dict = self.planner.catalogue()
+    # --profile embedded: only DSOs of the local catalogues, the others are named once and skipped
+    self.missing = []
+    if self.planner.embedded and (options.catalogue_file == None or options.dso != None) and not options.build_catalogue:
+      self.my_DSO_dict, self.missing = self.planner.local_DSOs(self.my_DSO_dict)
+      if len(self.missing) > 0 and len(self.my_DSO_dict) > 0:
+        print("Not in the local catalogues, skipped with --profile embedded: " + ", ".join(self.missing))
+    # plots and PDF reports are only regenerated when their inputs change, see output_inputs()
+    self.output_cache = output_cache
+    if output_cache == None:
+      self.output_cache = cache_utils.OutputCache(base_dir, enabled=not options.no_cache)
+    # checkpoint of the running --tonight or --best run (written with --resume only), saved when the run stops on an error
+    self.checkpoint = None
+
+def run_checkpoint(run, mode, date, key):
+  # checkpoint of a run of its site and catalogue, kept and resumed with --resume
+  options = run.options
+  catalogue_name = options.dso if options.dso != None else options.catalogue
+  run.checkpoint = checkpoint_utils.Checkpoint(checkpoint_utils.checkpoint_file_name(base_dir, mode, run.planner.site, catalogue_name, date), key, options.resume)
+  return run.checkpoint
+
+def keep_progress(run):
+  # a run stopped on an error: its checkpoint goes to disk for --resume
+  if run.checkpoint != None and run.checkpoint.enabled:
+    run.checkpoint.save()
+    print("Progress kept in " + str(run.checkpoint.file_name) + ", continue with --resume")
+
+def run_inputs(run):
+  # what every plot or report of a run is made of: site, horizon, orbital elements and options
+  options, planner = run.options, run.planner
+  orbit_files = list(config.comet_elements_files) + list(config.asteroid_elements_files)
+  return dict(site = planner.site,
+              horizon_file = cache_utils.file_hash(planner.site.get("horizon_file")),
+              orbital_elements = [cache_utils.file_hash(f) for f in orbit_files],
+              options = dict((k, v) for k, v in vars(options).items() if k not in output_neutral_options))
+
+def output_inputs(run, **inputs):
+  # everything a plot or report of the whole catalogue of a run is made of
+  options, planner = run.options, run.planner
+  return dict(inputs, **run_inputs(run),
+              catalogue = planner.catalogue_contents(run.my_DSO_dict if options.catalogue_file == None or options.dso != None else None),
+              local_catalogues = [cache_utils.file_hash(f) for f in config.catalogue_files])
+
+def dso_inputs(planner, dso_identifier):
+  # what one DSO is for a plot of its own: its local catalogue record (position, type, size),
+  # the name alone if Simbad resolves it or it moves (the orbital elements are part of run_inputs())
+  record = planner.resolve_record(dso_identifier)
+  if record == None:
+    return str(dso_identifier).upper()
+  return dict((k, record.get(k)) for k in ("name", "ra", "dec", "object_type", "magnitude", "major_axis", "minor_axis"))
+
+def best_plot_name(dso_name, year):
+  return base_dir + "DSO_" + str(dso_name).upper() + "_" + str(year) + ".png"
 
 def plot(dsolist):
+  import matplotlib.pyplot as plt
+  from astropy.visualization import astropy_mpl_style, quantity_support
   try:
     plt.clf()
     plt.cla()
@@ -645,9 +344,9 @@ def plot(dsolist):
       score = False
       top_score = False
 
-      dso_max_alt = round(max(dso.the_objectaltazs_over_night.alt.value),0)
-      index_alt_max_total = np.argmax(dso.the_objectaltazs_over_night.alt)
-      az = dso.the_objectaltazs_over_night.az[index_alt_max_total].value
+      dso_max_alt = round(float(np.max(dso.track_alt)),0)
+      index_alt_max_total = np.argmax(dso.track_alt)
+      az = float(dso.track_az[index_alt_max_total])
       direction_max_alt_total = sky_utils.compass_direction(az)
       if debug:
         print("  max alt: " + str(dso_max_alt) + " at " + str(dso.max_alt_time.strftime("%H:%M")) + " in " + str(direction_max_alt_total) + " (" + str(round(az,0)) + ")")
@@ -734,12 +433,12 @@ def plot(dsolist):
       if not dso.top_score_at_max_alt:
         alpha_value = 0.3
       plt.scatter(
-          dso.delta_midnight,
-          dso.the_objectaltazs_over_night.alt,
+          dso.track_hours * u.hour,
+          dso.track_alt * u.deg,
           c=color_code,
           label=label_text,
           linewidths=0,
-          s=8,
+          s=8 if getattr(dso, "track_quality", None) is None else 2 + 14 * np.clip(dso.track_quality, 0, 1), # bigger: better sky
           alpha=alpha_value)
     if debug:
       print("Sub text: " + str(sub_text))
@@ -767,10 +466,10 @@ def plot(dsolist):
     plt.xlabel("Hours from Midnight") # EDT: Eastern Daylight Time
     plt.ylabel("Altitude [deg]")
 
-    plot_name = base_dir + "DSO_" + str(dso.the_object_name) + "_" + str(the_year_format) + ".png"
+    plot_name = best_plot_name(dso.the_object_name, the_year_format)
     if platform.system() == "Linux":
       if os.path.isdir(base_dir):
-        plot_name = base_dir + "DSO_" + str(dso.the_object_name) + "_" + str(the_year_format) + ".png"
+        plot_name = best_plot_name(dso.the_object_name, the_year_format)
     if plot_name != "":
       plt.savefig(plot_name)
       if debug:
@@ -781,349 +480,605 @@ def plot(dsolist):
   except Exception as e:
     print("DSO observation night plotting error " + str(dso.the_object_name) + ": " + str(e))
 
-def is_summertime(dt, timeZone):
-   aware_dt = timeZone.localize(dt)
-   return aware_dt.dst() != datetime.timedelta(0,0)
+def night_text(start, end):
+  # e.g. "19.10.26 17:38 - 20.10.26 04:42", "none" if there is no such night (e.g. in summer far north)
+  if start == None or end == None:
+    return "none"
+  return str(start.strftime("%d.%m.%y %H:%M")) + " - " + str(end.strftime("%d.%m.%y %H:%M"))
+
+def usable_text(dso):
+  # e.g. " usable 21:40-02:15"
+  windows = getattr(dso, "usable_windows", None)
+  if not windows:
+    return ""
+  return " usable " + ", ".join(start.strftime("%H:%M") + "-" + end.strftime("%H:%M") for start, end in windows)
+
+def best_text(planner, dso_list):
+  # --best without a plot (--profile embedded): the 1st of every month, best observability first
+  print(str(dso_list[0].the_object_name) + " " + str(dso_list[0].today.strftime("%Y")) + " at " + str(planner.site["location"]) + ":")
+  for dso in sorted(dso_list, key=lambda dso: (bool(dso.visible), getattr(dso, "observability", 0.0)), reverse=True):
+    print("  " + str(dso.today.strftime("%d.%m.")) + ": " + str(round(dso.max_alt,0)) + " in " + str(dso.max_alt_direction) + " (" + str(round(dso.max_alt_az,0)) + ") at " + str(dso.max_alt_time.strftime("%H:%M")) + usable_text(dso) + ", score " + str(round(getattr(dso, "observability", 0.0),2)))
+
+def dso_label(dso):
+  # all designations of a merged DSO, e.g. NGC6992 / C33
+  if getattr(dso, "designations", None) and len(dso.designations) > 1:
+    return " / ".join(dso.designations)
+  return str(dso.the_object_name)
+
+def build_catalogue(file_name):
+  # all DSOs of the built-in catalogues with every name they are listed under
+  identifiers = {}
+  for catalogue in (planning.my_DSO_dict_messier, planning.my_DSO_dict_caldwell, planning.my_DSO_dict_div, planning.my_DSO_dict_southern_hemisphere):
+    for dso_name, dso_identifier in catalogue.items():
+      names = identifiers.setdefault(str(dso_identifier), [])
+      if dso_name != dso_identifier and dso_name not in names:
+        names.append(dso_name)
+  records = []
+  for dso_identifier, names in identifiers.items():
+    print("Resolve " + str(dso_identifier) + "...")
+    try:
+      the_object = SkyCoord.from_name(dso_identifier)
+    except Exception as e:
+      print("Name resolution error " + str(dso_identifier) + ": " + str(e))
+      continue
+    records.append(dict(name=dso_identifier, ra=the_object.ra.deg, dec=the_object.dec.deg, aliases=names))
+  os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+  catalogue_utils.write_catalogue(file_name, records)
+  print("Wrote " + str(len(records)) + " DSOs to " + str(file_name))
+
+def watch_DSOs(run):
+  # precompute tonight once, then only advance the time index on every refresh
+  options, planner = run.options, run.planner
+  day = run.today
+  if Time.now() < planner.midnight(day) - 12 * u.hour:
+    day -= datetime.timedelta(days=1) # after midnight: the night started yesterday
+  midnight = planner.midnight(day)
+  utcoffset = planner.utcoffset(day)
+  night = planner.night(day)
+  names, ra, dec = planner.catalogue_coordinates()
+  alt, az = planner.targets_altaz(ra, dec, night)
+  free = sky_utils.above_horizon(alt, az, planner.horizon)
+  table = watch_utils.WatchTable(names, planner.sample_hours, alt, az, free, night["sun_alt"])
+  del alt, az, free
 
-def sort_DSOs(dso_list):
-  # sort by max. altitude time
-  dsol = sorted(dso_list, key=lambda x: x.max_alt_time)
+  try:
+    while True:
+      now = Time.now()
+      hour = (now - midnight).to_value(u.hour)
+      if hour > planner.sample_hours[-1]:
+        print("The night is over.")
+        break
+      state = table.state(hour)
+      lines = watch_utils.format_table(table, state, sky_utils.compass_direction, options.top)
+      header = "What's up at " + str(planner.site["location"]) + ", " + str((now.datetime + datetime.timedelta(hours=utcoffset.to_value(u.hour))).strftime("%d.%m.%Y %H:%M:%S")) + " (sun " + str(round(state["sun_alt"], 1)) + " deg)"
+      if not debug:
+        print("\033[2J\033[H", end="") # clear the terminal
+      print(header)
+      print("\n".join(lines))
+      sys.stdout.flush()
+      time.sleep(float(options.interval))
+  except KeyboardInterrupt:
+    pass
+
+def validate_engines(run):
+  # accuracy and speed of the selected engine, backend and sampling against the astropy path
+  options, my_DSO_dict = run.options, run.my_DSO_dict
+  year = run.today.year
+  days = validation_utils.night_days(year, int(options.validate_step))
+  k = int(options.top) if options.top != None else 10
+  for site in validation_utils.reference_sites:
+    reference_planner = planning.Planner(site, options, engine="astropy", backend=None, profile=None)
+    key = validation_utils.reference_key(reference_planner.site, reference_planner.catalogue_contents(my_DSO_dict), year, options.validate_step)
+    file_name = validation_utils.reference_file_name(base_dir, reference_planner.site, options.catalogue, year, options.validate_step)
+    # names and positions are stored with the reference, they are only resolved to build it
+    reference = validation_utils.load_reference(file_name, key)
+    if reference == None:
+      names, ra, dec = reference_planner.catalogue_coordinates(my_DSO_dict)
+      if len(names) == 0:
+        print("No DSO positions for the validation.")
+        return
+      reference = validation_utils.build_reference(reference_planner, file_name, key, names, ra, dec, days, int(options.chunk_size))
+    names, ra, dec, reference, reference_seconds = reference
+
+    candidate_planner = planning.Planner(site, options)
+    candidate, seconds = validation_utils.evaluate(candidate_planner, names, ra, dec, days, int(options.samples), int(options.chunk_size))
+    report = validation_utils.compare(reference, candidate, k)
+    print("Engine " + str(options.engine) + ", backend " + str(options.backend or "astropy") + ", " + str(options.samples) + " samples at " + str(site) + " (" + str(len(days)) + " nights x " + str(len(names)) + " DSOs):")
+    print("\n".join(validation_utils.format_report(report)))
+    print("  runtime " + str(round(seconds, 2)) + " s, reference " + str(round(reference_seconds, 2)) + " s: speedup " + str(round(reference_seconds / max(seconds, 1e-9), 1)) + "x")
+
+def read_jobs(file_name):
+  # list of runs, each a dict of option names (configuration, catalogue, thenights_date, dso, moon, top, export, ...)
+  with open(file_name, encoding="utf-8") as f:
+    if file_name.endswith(".yaml") or file_name.endswith(".yml"):
+      import yaml # only needed for YAML job files
+      jobs = yaml.safe_load(f)
+    else:
+      jobs = json.load(f)
+  if isinstance(jobs, dict):
+    jobs = jobs.get("jobs", [])
+  return jobs
+
+def job_options(job, defaults):
+  # options of one run of a jobs file, unset options as given on the command line
+  options = optparse.Values(defaults)
+  for key, value in job.items():
+    key = key.replace("-", "_")
+    if key not in defaults:
+      print("Unknown job option " + str(key) + ", ignored")
+      continue
+    setattr(options, key, value)
+  return options
+
+def run_jobs(run, file_name):
+  # The jobs depend on shared pieces of work: name resolution per DSO, sun/moon/twilight
+  # per site and night and alt/az tracks per DSO, site and night. Every piece is computed
+  # once, the jobs run grouped by site and night and the tracks of a night are dropped
+  # after its last job.
+  jobs = read_jobs(file_name)
+  defaults = dict(vars(run.options))
+  defaults["jobs_file"] = None
+  # precomputed (alt, az) tracks by (site, date, DSO), shared by the planners of all jobs
+  track_cache = {}
+  runs = [Run(job_options(job, defaults), track_cache, run.output_cache) for job in jobs]
+
+  nights = {} # (site, date) -> job numbers and DSO identifiers
+  resolvers = {} # DSO identifier -> planner of the first job with it, it knows the catalogue file of the job
+  for number, job in enumerate(runs):
+    night = nights.setdefault((job.options.configuration, job.theDate), dict(jobs=[], identifiers=set()))
+    night["jobs"].append(number)
+    if job.options.catalogue_file == None or job.options.dso != None:
+      for dso_identifier in job.my_DSO_dict.values():
+        night["identifiers"].add(str(dso_identifier))
+        resolvers.setdefault(str(dso_identifier), job.planner)
+  identifiers = set()
+  for night in nights.values():
+    identifiers.update(night["identifiers"])
+  print("Jobs: " + str(len(jobs)) + " runs, " + str(len(nights)) + " site nights, " + str(len(identifiers)) + " DSOs")
+
+  positions = {}
+  for dso_identifier in sorted(identifiers):
+    position = resolvers[dso_identifier].object_position(dso_identifier)
+    if position != None:
+      positions[dso_identifier] = position
+
+  for (configuration, date), night in nights.items():
+    first = runs[night["jobs"][0]]
+    planner = first.planner
+    names = sorted(i for i in night["identifiers"] if i in positions)
+    if len(names) > 0 and planner.dark_enough(first.today, base_dir):
+      ephemeris = planner.night(first.today)
+      alt, az = planner.targets_altaz([positions[i][0] for i in names], [positions[i][1] for i in names], ephemeris)
+      for k, dso_identifier in enumerate(names):
+        track_cache[(planner.site["location"], date, dso_identifier.upper())] = (alt[k], az[k])
+      del alt, az
+    for number in night["jobs"]:
+      job = runs[number]
+      print("\nJob " + str(number + 1) + ": " + str(job.options.catalogue) + " at " + str(job.planner.site["location"]) + " " + str(job.theDate))
+      exporter = None
+      if job.options.export or job.options.tracks:
+        exporter = export_utils.ResultExporter(job.options.export, job.options.tracks)
+      try:
+        tonight_report(job, exporter)
+      except KeyboardInterrupt:
+        keep_progress(job)
+        raise
+      except Exception as e:
+        print("Job " + str(number + 1) + " error: " + str(e))
+        keep_progress(job)
+      if exporter:
+        exporter.close()
+    for key in [key for key in track_cache if key[0] == planner.site["location"] and key[1] == date]:
+      del track_cache[key]
+
+def tonight_report(run, exporter=None):
+  # best DSOs of the night (today) of a run at its site: console output and PDF report
+  options, planner, today, tomorrow, theDate = run.options, run.planner, run.today, run.tomorrow, run.theDate
+  fileName = str(options.catalogue) + "_Catalogue DSOs_in_" + str(planner.site["location"]) + "_" + str(theDate) + ".pdf"
+  if options.dso != None:
+    fileName = str(options.dso) + "_DSO_in_" + str(planner.site["location"]) + "_" + str(theDate) + ".pdf"
+  if not planner.dark_enough(today, base_dir):
+    print("Skip the night of " + str(theDate) + " at " + str(planner.site["location"]) + ": " + str(round(planner.dark_calendar(today.year, base_dir).moon_free_hours(today), 1)) + " h moon-free dark time, less than " + str(options.min_dark_hours) + " h")
+    return
+  output_key = cache_utils.output_key(**output_inputs(run, report="tonight", date=theDate))
+  if exporter == None and not planner.embedded and run.output_cache.fresh(fileName, output_key):
+    print("Inputs unchanged, reusing " + str(fileName))
+    return
+
+  # data format for pdf
+  #data = [["M1", "TODO"], ["M2", "TODO"],
+  pdfdata_nn, pdfdata_an, pdfdata_in, pdfdata_sc = [], [], [], []
+
+  print("Find best DSOs for " + str(today.strftime("%d.%m.%Y")) + " - " + str(tomorrow.strftime("%d.%m.%Y")) + ", ordered by their max. altitude...")
+  from_file = options.catalogue_file != None and options.dso == None
+  if from_file:
+    print("Check DSOs of " + str(options.catalogue_file) + "...")
+
+  def checked(dso):
+    # every DSO right after its evaluation: the passing ones at once with their
+    # result, the ordered lists follow when all are done
+    msg = ""
+    if planner.reportable(dso):
+      msg = ": " + str(round(dso.max_alt,0)) + " in " + str(dso.max_alt_direction) + " (" + str(round(dso.max_alt_az,0)) + ") at " + str(dso.max_alt_time.strftime("%H:%M")) + usable_text(dso) + ", score " + str(round(dso.observability,2))
+    if not from_file:
+      print("Check DSO: " + str(dso.the_object_identifier) + " (" + str(dso.the_object_name) + ")" + msg, flush=True)
+    elif msg != "":
+      print("  " + dso_label(dso) + msg, flush=True)
+    if exporter:
+      exporter.write(dso)
+
+  # results of a catalogue file are not kept beyond what the lists need
+  checkpoint = run_checkpoint(run, "tonight", theDate, output_key)
+  plan = planner.plan_night(today, run.my_DSO_dict if not from_file else None, callback=checked, keep_tracks=options.tracks != None, keep_results=not from_file, checkpoint=checkpoint)
+  if len(plan["nautical"]) + len(plan["astronomical"]) + len(plan["invisible"]) == 0:
+    # nothing usable tonight (or no DSO could be evaluated at all), no report
+    print("No DSOs for " + str(theDate) + " at " + str(planner.site["location"]) + " (nautical night: " + night_text(*plan["nautical_night"]) + ")")
+    checkpoint.finish()
+    return
+
+  result_msg = "Best DSOs for " + str(today.strftime("%d.%m.Y")) + " - " + str(tomorrow.strftime("%d.%m.%Y")) + " at " + str(planner.site["location"]) + " (" + str(planner.site["latitude"]) + ", " + str(planner.site["longitude"]) + " [" + str(planner.site["elevation"]) + " m])"
+
+  nautical_night_start, nautical_night_end = plan["nautical_night"]
+  astronomical_night_start, astronomical_night_end = plan["astronomical_night"]
+  nautical_night_dsos, astronomical_night_dsos, invisible_dsos = plan["nautical"], plan["astronomical"], plan["invisible"]
+
+  msg = "\n\nNautical night: " + night_text(nautical_night_start, nautical_night_end)
   if debug:
-    print("\n\n\n")
-    print("Sorted by max. altitude time:")
-
-  astronomical_night_start, astronomical_night_end = "",""
-  nautical_night_start, nautical_night_end = "", ""
-  astronomical_night_dsos = []
-  nautical_night_dsos = []
-  invisible_dsos = []
-  for dso in dsol:
-    dt = dso.max_alt_time
-    astronomical_night_start = dso.astronomical_night_start
-    astronomical_night_end = dso.astronomical_night_end
-    nautical_night_start = dso.nautical_night_start
-    nautical_night_end = dso.nautical_night_end
-
+    print("# DSOs in nautical night: " + str(len(nautical_night_dsos)))
+  print(msg)
+  result_msg += msg
+  for ndso in nautical_night_dsos:
+    msg = "\n  " + str(round(ndso.max_alt,0)) + " in " + str(ndso.max_alt_direction) + " (" + str(round(ndso.max_alt_az,0)) + ") at " + str(ndso.max_alt_time.strftime("%H:%M")) + usable_text(ndso) # + " (nautical night)")
     if options.moon:
-      if debug:
-        print("###" + str(dso.score_at_max_alt) + ", " + str(dso.top_score_at_max_alt) + ", " + str(dso.sub_text_moon_at_max_alt))
+      msg +=  str(ndso.sub_text_moon_at_max_alt)
+    if options.moon or options.top != None:
+      msg += "\n    Score: " + str(round(ndso.observability,2)) + ", airmass " + str(round(ndso.airmass_at_max_alt,2)) + ", sky " + str(round(ndso.sky_brightness_at_max_alt,1)) + " mag/arcsec2"
+    if hasattr(ndso, "major_axis") and hasattr(ndso, "minor_axis") and hasattr(ndso, "magnitude"):
+      msg += "\n dimensions: " + str(round(ndso.major_axis,1)) + "*" + str(round(ndso.minor_axis,1)) + "\'"
+      if round(ndso.magnitude,1) > -1.0:
+        msg += "; mag: " + str(round(ndso.magnitude,1))
+    pdfdata_nn.append([dso_label(ndso), msg.lstrip("\n\r")])
+    print(msg)
+    result_msg += msg
+
+  msg = "\n\nAstronomical night: " + night_text(astronomical_night_start, astronomical_night_end)
+  if debug:
+    print("# DSOs in astronomical night: " + str(len(astronomical_night_dsos)))
+  print(msg)
+  result_msg += msg
+  for asdso in astronomical_night_dsos:
+    msg = "\n  " + str(round(asdso.max_alt,0)) + " in " + str(asdso.max_alt_direction) + " (" + str(round(asdso.max_alt_az,0)) + ") at " + str(asdso.max_alt_time.strftime("%H:%M")) + usable_text(asdso) # + " (astronomical night)")
+    if options.moon:
+      msg += str(asdso.sub_text_moon_at_max_alt)
+    if options.moon or options.top != None:
+      msg += "\n    Score: " + str(round(asdso.observability,2)) + ", airmass " + str(round(asdso.airmass_at_max_alt,2)) + ", sky " + str(round(asdso.sky_brightness_at_max_alt,1)) + " mag/arcsec2"
+    if hasattr(asdso, "major_axis") and hasattr(asdso, "minor_axis") and hasattr(asdso, "magnitude"):
+      msg += "\n dimensions: " + str(round(asdso.major_axis,1)) + "*" + str(round(asdso.minor_axis,1)) + "\'"
+      if round(asdso.magnitude,1) > -1.0:
+        msg += "; mag: " + str(round(asdso.magnitude,1))
+    pdfdata_an.append([dso_label(asdso), msg.lstrip("\n\r")])
+    print(msg)
+    result_msg += msg
 
-    if dso.max_alt > 0:
-      if dso.astronomical_night_start < dt < dso.astronomical_night_end:
-        if debug:
-          print(dso.the_object_name + ": " + str(dso.max_alt) + " in " + str(dso.max_alt_direction) + " at " + str(dso.max_alt_time) + " (astronomical night)")
-          if hasattr(dso, "major_axis") and hasattr(dso, "minor_axis") and hasattr(dso, "magnitude"):
-            print("  dimensions: " + str(dso.major_axis) + " * " + str(dso.minor_axis) + " \"""; mag: " + str(dso.magnitude))
-        if options.moon:
-          if options.justthetopones:
-            if "TOP" in dso.sub_text_moon_at_max_alt:
-              if options.direction != None:
-                if str(options.direction) in str(dso.max_alt_direction):
-                  astronomical_night_dsos.append(dso)
-              else:
-                astronomical_night_dsos.append(dso)
-          else:
-            if "TOP" in dso.sub_text_moon_at_max_alt or "OK" in dso.sub_text_moon_at_max_alt:
-              if options.direction != None:
-                if str(options.direction) in str(dso.max_alt_direction):
-                  astronomical_night_dsos.append(dso)
-              else:
-                astronomical_night_dsos.append(dso)
-        else:
-          if options.direction != None:
-            if str(options.direction) in str(dso.max_alt_direction):
-              astronomical_night_dsos.append(dso)
-          else:
-            astronomical_night_dsos.append(dso)
-      elif dso.nautical_night_start < dt < dso.nautical_night_end:
-        if debug:
-          print(dso.the_object_name + ": " + str(dso.max_alt) + " in " + str(dso.max_alt_direction) + " at " + str(dso.max_alt_time) + " (nautical night)")
-          if hasattr(dso, "major_axis") and hasattr(dso, "minor_axis") and hasattr(dso, "magnitude"):
-            print("  dimensions: " + str(dso.major_axis) + " * " + str(dso.minor_axis) + " \"""; mag: " + str(dso.magnitude))
-        if options.moon:
-          if options.justthetopones:
-            if "TOP" in dso.sub_text_moon_at_max_alt:
-              if options.direction != None :
-                if str(options.direction) in str(dso.max_alt_direction):
-                  nautical_night_dsos.append(dso)
-              else:
-                nautical_night_dsos.append(dso)
-          else:
-            if "TOP" in dso.sub_text_moon_at_max_alt or "OK" in dso.sub_text_moon_at_max_alt:
-              if options.direction != None:
-                if str(options.direction) in str(dso.max_alt_direction):
-                  nautical_night_dsos.append(dso)
-              else:
-                nautical_night_dsos.append(dso)
-        else:
-          if options.direction != None:
-            if str(options.direction) in str(dso.max_alt_direction):
-              nautical_night_dsos.append(dso)
-          else:
-            nautical_night_dsos.append(dso)
-    else:
-      if debug:
-        print("Invisible DSO: " + str(dso.the_object_name))
-      invisible_dsos.append(dso)
+  if debug:
+    print("# Invisible DSOs: " + str(len(invisible_dsos)))
+
+  msg = "\n\nInvisible DSOs:"
+  result_msg += msg
+  if len(invisible_dsos)>0:
+    print(msg)
+    for idso in invisible_dsos:
+      msg = "\n  " + dso_label(idso) + ": " + str(round(idso.max_alt,0)) + " in " + str(idso.max_alt_direction) + " (" + str(round(idso.max_alt_az,0)) + ") at " + str(idso.max_alt_time.strftime("%H:%M")) #+ " [" + str(my_DSO_dict.values()[idso.the_object_name]) + "]"
+      print(msg)
+      pdfdata_in.append([dso_label(idso), msg.lstrip("\n\r")])
+      result_msg += msg
+  else:
+    print("No invisible DSOs in the list.")
+
+  if options.schedule:
+    msg = "\n\nSchedule (min. " + str(options.min_block) + " min per DSO, " + str(options.overhead) + " min overhead, min. alt " + str(options.min_alt) + "):"
+    print(msg)
+    result_msg += msg
+    for sdso, block_start, block_end, block_alt, block_score in plan["schedule"]:
+      msg = "\n  " + str(block_start.strftime("%H:%M")) + " - " + str(block_end.strftime("%H:%M")) + " " + str(sdso.the_object_name) + ": mean alt " + str(round(block_alt,0)) + ", score " + str(round(block_score,2))
+      print(msg)
+      pdfdata_sc.append([sdso.the_object_name, msg.lstrip("\n\r")])
+      result_msg += msg
 
+  if planner.embedded:
+    # text (and --export) only
+    checkpoint.finish()
+    return
+
+  # create PDF document
+  from reportlab.lib import colors
+  from reportlab.lib.units import cm
+  from reportlab.lib.pagesizes import A4, portrait
+  from reportlab.platypus import SimpleDocTemplate, TableStyle, Table
+  from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+  from reportlab.platypus import Paragraph
+  from reportlab.lib.enums import TA_LEFT
   if debug:
-    print("Astronomical night: " + str(astronomical_night_start) + " - " + str(astronomical_night_end))
-    print("Nautical night: " + str(nautical_night_start) + " - " + str(nautical_night_end))
-  return astronomical_night_start, astronomical_night_end, astronomical_night_dsos, nautical_night_start, nautical_night_end, nautical_night_dsos, invisible_dsos
+    print("Create PDF " + str(fileName) + "...")
+    print("")
+    print(pdfdata_nn)
+    print("")
+    print(pdfdata_an)
+    print("")
+    print(pdfdata_in)
+  documentTitle = str(options.catalogue) + " Catalogue DSO Visibility in " + str(planner.site["location"])
+  title = str(options.catalogue) + " Catalogue DSO Visibility"
+  subTitle = today.strftime("%d.%m.") + "-" + tomorrow.strftime("%d.%m.%Y") + " in " + str(planner.site["location"]) + " (" + str(planner.site["latitude"]) + ", " + str(planner.site["longitude"]) + ")"
+
+  elements = []
+  PAGESIZE = portrait(A4)
+  doc = SimpleDocTemplate(fileName,  pagesize=PAGESIZE, leftMargin=1*cm, title=documentTitle)
+  style = getSampleStyleSheet()
+  styleH2 = ParagraphStyle('H2Style',
+                             fontName="Helvetica-Bold",
+                             fontSize=16,
+                             parent=style['Heading2'],
+                             alignment=1,
+                             spaceAfter=14)
+  elements.append(Paragraph(title, styleH2))
+  styleH3 = ParagraphStyle('H3Style',
+                             fontName="Helvetica-Bold",
+                             fontSize=12,
+                             parent=style['Heading3'],
+                             alignment=TA_LEFT,
+                             spaceAfter=12)
+  elements.append(Paragraph(subTitle, styleH3))
+
+  if len(pdfdata_nn)>0:
+    paragraph = "Nautical night: " + night_text(nautical_night_start, nautical_night_end)
+    elements.append(Paragraph(paragraph, styleH3))
+    #paragraph = "DSOs during nautical night:"
+    t = Table(pdfdata_nn, colWidths=[2*cm] + [None] * (len(pdfdata_nn[0]) - 1), rowHeights=65, hAlign='LEFT')
+    table_style = TableStyle([
+        ('ALIGN',(1,1),(-2,-2),'RIGHT'),
+        ('BACKGROUND',(1,1),(-2,-2),colors.white),
+        ('TEXTCOLOR',(0,0),(1,-1),colors.black),
+        ('INNERGRID',(0,0),(-1,-1),0.25,colors.black),
+        ('BOX',(0,0),(-1,-1),0.25,colors.black),
+    ])
+    for row, values in enumerate(pdfdata_nn):
+      #print(row, values)
+      if row % 2 == 0:
+        table_style.add('BACKGROUND',(0,row),(1,row),colors.lightgrey)
+    t.setStyle(table_style)
+    elements.append(t)
+
+  if len(pdfdata_an)>0:
+    paragraph = "Astronomical night: " + night_text(astronomical_night_start, astronomical_night_end)
+    elements.append(Paragraph(paragraph, styleH3))
+    #paragraph = "DSOs during astronomical night:"
+    t = Table(pdfdata_an, colWidths=[2*cm] + [None] * (len(pdfdata_an[0]) - 1), rowHeights=65, hAlign='LEFT')
+    table_style = TableStyle([
+        ('ALIGN',(1,1),(-2,-2),'RIGHT'),
+        ('BACKGROUND',(1,1),(-2,-2),colors.white),
+        ('TEXTCOLOR',(0,0),(1,-1),colors.black),
+        ('INNERGRID',(0,0),(-1,-1),0.25,colors.black),
+        ('BOX',(0,0),(-1,-1),0.25,colors.black),
+    ])
+    for row, values in enumerate(pdfdata_an):
+      #print(row, values)
+      if row % 2 == 0:
+        table_style.add('BACKGROUND',(0,row),(1,row),colors.lightgrey)
+    t.setStyle(table_style)
+    elements.append(t)
+
+  if len(pdfdata_in)>0:
+    paragraph = "Invisible DSOs:"
+    elements.append(Paragraph(paragraph, styleH3))
+    t = Table(pdfdata_in, colWidths=[2*cm] + [None] * (len(pdfdata_in[0]) - 1), rowHeights=65, hAlign='LEFT')
+    table_style = TableStyle([
+        ('ALIGN',(1,1),(-2,-2),'RIGHT'),
+        ('BACKGROUND',(1,1),(-2,-2),colors.white),
+        ('TEXTCOLOR',(0,0),(1,-1),colors.black),
+        ('INNERGRID',(0,0),(-1,-1),0.25,colors.black),
+        ('BOX',(0,0),(-1,-1),0.25,colors.black),
+    ])
+    for row, values in enumerate(pdfdata_in):
+      #print(row, values)
+      if row % 2 == 0:
+        table_style.add('BACKGROUND',(0,row),(1,row),colors.lightgrey)
+    t.setStyle(table_style)
+    elements.append(t)
+
+
+  if len(pdfdata_sc)>0:
+    paragraph = "Schedule:"
+    elements.append(Paragraph(paragraph, styleH3))
+    t = Table(pdfdata_sc, colWidths=[2*cm] + [None] * (len(pdfdata_sc[0]) - 1), hAlign='LEFT')
+    table_style = TableStyle([
+        ('TEXTCOLOR',(0,0),(1,-1),colors.black),
+        ('INNERGRID',(0,0),(-1,-1),0.25,colors.black),
+        ('BOX',(0,0),(-1,-1),0.25,colors.black),
+    ])
+    for row, values in enumerate(pdfdata_sc):
+      if row % 2 == 0:
+        table_style.add('BACKGROUND',(0,row),(1,row),colors.lightgrey)
+    t.setStyle(table_style)
+    elements.append(t)
+
+  # create PDF
+  doc.build(elements)
+  if len(plan["failures"]) == 0:
+    run.output_cache.record(fileName, output_key, report="tonight", site=planner.site["location"], date=theDate, catalogue=options.catalogue)
+  checkpoint.finish()
+
+def main():
+  global debug
+  options, args = parser.parse_args()
+
+  if options.debug:
+    debug = True
+    planning.debug = True
+    export_utils.debug = True
+    catalogue_utils.debug = True
+    index_utils.debug = True
+    calendar_utils.debug = True
+    watch_utils.debug = True
+    validation_utils.debug = True
+    cache_utils.debug = True
+    checkpoint_utils.debug = True
+    # shorter catalogues for testing
+    planning.my_DSO_dict_messier = dict(list(planning.my_DSO_dict_messier.items())[:10])
+    planning.my_DSO_dict_caldwell = dict(list(planning.my_DSO_dict_caldwell.items())[:13])
 
-if __name__ == '__main__':
+  if debug:
+    print("Find best tonight's DSOs: " + str(options.tonight))
+    if options.thenights_date:
+      print("The night's date: " + str(options.thenights_date))
+    print("Consider moon: " + str(options.moon))
+    print("  display only the TOP ones: " + str(options.justthetopones))
+    print("  filter for direction: " + str(options.direction))
+    print("  catalogue: " + str(options.catalogue))
+    print("  config: " + str(options.configuration))
+
+  run = Run(options)
+  if len(run.missing) > 0 and len(run.my_DSO_dict) == 0:
+    print("--profile embedded takes the DSOs from the local catalogues " + ", ".join(config.catalogue_files) + " only, none of them knows " + ", ".join(run.missing[:5]) + (" (and " + str(len(run.missing) - 5) + " more)" if len(run.missing) > 5 else "") + ". "
+          + "Create " + str(config.catalogue_files[0]) + " once with --build_catalogue (or any run without --profile embedded) on a computer with internet access and copy it.")
+    sys.exit(1)
+  planner, today, tomorrow, theDate, my_DSO_dict, output_cache = run.planner, run.today, run.tomorrow, run.theDate, run.my_DSO_dict, run.output_cache
+  dso_name = run.dso_name
+
+  #TEST
+  #my_DSO_dict = {"M1" : "M1", "M2" : "M2", "M13" : "M13", "M31" : "M31", "M42":"M42"}
 
-  try:
-    ######################################################################################
-    # Use `astropy.coordinates.EarthLocation` to provide the location of the desired time
-    the_location = EarthLocation(lat=config.coordinates["latitude"], lon=config.coordinates["longitude"], height=config.coordinates["elevation"])
+  if debug:
+    print(my_DSO_dict)
 
+  try:
     now = datetime.datetime.now()
-    theDate = today.strftime("%d.%m.%Y")
     theYear = now.strftime("%Y")
     if options.thenights_date:
-      theYear = theDate[2]
-
-    timeZone = pytz.timezone(config.coordinates["timezone"])
-    # MEZ assumed (UTC+1/2)
-    if is_summertime(now, timeZone):
-      utcoffset = +2 * u.hour  # +2 summertime, +1 wintertime
-      if debug:
-        print("Summertime: UTC+2")
-    else:
-      utcoffset = +1 * u.hour
-      if debug:
-        print("Wintertime: UTC+1")
+      theYear = today.strftime("%Y")
 
-    tomorrow = today + datetime.timedelta(days=1)
     if debug:
       print("Now: " + str(now))
       print("The day: " + str(today))
       print("The day after: " + str(tomorrow))
 
-    if options.best:
-      if options.dso:
-        # single DSO
-        dso_list = []
-        # loop over 12 dates/year
-        for the_month in ["01", "02", "03", "04", "05", "06", "07", "08", "09", "10", "11", "12"]:
-          the_date = "01." + str(the_month) + "." + str(theYear)
-          if debug:
-            print("Calculate visibility of " + str(dso_name) + " at " + str(the_date))
-          the_day = today.replace(day=int(1), month=int(the_month), year=int(theYear))
-          the_tomorrow = the_day + datetime.timedelta(days=1)
-          dso = DSO(dso_name, dso_name, the_day, the_tomorrow) # TODO dso_identifier
-          dso_list.append(dso)
-        plot(dso_list)
-          
+    exporter = None
+    if options.export or options.tracks:
+      exporter = export_utils.ResultExporter(options.export, options.tracks)
+
+    if options.jobs_file:
+      run_jobs(run, options.jobs_file)
+    elif options.build_catalogue:
+      build_catalogue(config.catalogue_files[0])
+    elif options.watch:
+      watch_DSOs(run)
+    elif options.validate:
+      validate_engines(run)
+    elif options.benchmark:
+      midnight = planner.midnight(today)
+      # a few well known DSOs as targets: M31, M42, M13, M57
+      results = sky_utils.benchmark_backends(planner.site["latitude"], planner.site["longitude"], planner.site["elevation"],
+                                             midnight, [10.68, 83.82, 250.42, 283.40], [41.27, -5.39, 36.46, 33.03], len(planning.delta_midnight_hours))
+      print("Ephemeris backends for " + str(today.strftime("%d.%m.%Y")) + " at " + str(planner.site["location"]) + " (" + str(len(planning.delta_midnight_hours)) + " samples):")
+      for name, result in results.items():
+        timings = ", ".join(what + " " + str(round(seconds * 1000, 1)) + " ms" for what, seconds in result["timings"].items())
+        errors = ", ".join(what + " " + str(round(error * 3600, 1)) + "\"" if what != "illumination" else what + " " + str(round(error * 100, 2)) + "%" for what, error in result["errors"].items())
+        print("  " + name + ": " + timings)
+        print("    deviation from astropy: " + errors)
+        print("    astronomical night (UTC): " + str(result["twilight"][0]) + " - " + str(result["twilight"][1]))
+    elif options.calendar:
+      print("Moon-free dark time at " + str(planner.site["location"]) + " (sun below " + str(calendar_utils.dark_sun_alt) + " deg, moon down or below " + str(round(100 * options.max_moon_illumination)) + "% illuminated, UTC):")
+      for day, moon_free_hours, dark_hours, intervals in planner.dark_nights(today, int(options.top) if options.top != None else 30, base_dir):
+        intervals = ", ".join(start.strftime("%H:%M") + "-" + end.strftime("%H:%M") for start, end in intervals)
+        print("  " + day.strftime("%a %d.%m.%Y") + ": " + str(round(moon_free_hours, 1)) + " of " + str(round(dark_hours, 1)) + " h " + intervals)
+    elif options.index:
+      if not planner.dark_enough(today, base_dir):
+        calendar = planner.dark_calendar(today.year, base_dir)
+        next_nights = [day.strftime("%d.%m.") for day in calendar.nights(options.min_dark_hours) if day > today][:5]
+        print("Note: the night of " + str(theDate) + " has only " + str(round(calendar.moon_free_hours(today), 1)) + " h moon-free dark time, next nights with at least " + str(options.min_dark_hours) + " h: " + ", ".join(next_nights))
+      index = planner.visibility_index(today.year, my_DSO_dict, base_dir)
+      msg = "Best placed DSOs for " + str(today.strftime("%d.%m.%Y")) + " at " + str(planner.site["location"]) + " (astronomical night, above " + str(index.min_alt) + " deg):"
+      print(msg)
+      for name, row in index.best(today, options.top):
+        peak_time = (24 + float(row["peak_time"])) % 24
+        print("  " + str(name) + ": " + str(round(float(row["dark_hours"]),1)) + " h, max. alt " + str(round(float(row["peak_alt"]),0)) + " at " + "%02d:%02d" % (int(peak_time), int(round((peak_time % 1) * 60)) % 60))
+
+    elif options.near != None:
+      names, index = planner.sky_index(my_DSO_dict)
+      planner.object_position(options.near) # resolved once, not part of the query
+      start = time.perf_counter()
+      near = planner.objects_near(options.near, options.radius, my_DSO_dict)
+      print("Within " + str(options.radius) + " deg of " + str(options.near) + " (" + str(len(near)) + " of " + str(len(index)) + " objects, " + str(round((time.perf_counter() - start) * 1000, 2)) + " ms):")
+      for name, separation in near[:int(options.top) if options.top != None else None]:
+        print("  " + str(name) + ": " + str(round(separation, 2)) + " deg")
+    elif options.above != None:
+      the_time = datetime.datetime.strptime(options.at, "%H:%M").time()
+      when = datetime.datetime.combine(today if the_time.hour >= 12 else tomorrow, the_time)
+      names, index = planner.sky_index(my_DSO_dict)
+      start = time.perf_counter()
+      above = planner.objects_above(when, options.above, options.direction, my_DSO_dict)
+      print("Above " + str(options.above) + " deg at " + when.strftime("%d.%m.%Y %H:%M") + " in " + str(planner.site["location"]) + (" (" + str(options.direction) + ")" if options.direction != None else "") + ": " + str(len(above)) + " of " + str(len(index)) + " objects, " + str(round((time.perf_counter() - start) * 1000, 2)) + " ms")
+      for name, alt, az in above[:int(options.top) if options.top != None else None]:
+        print("  " + str(name) + ": " + str(round(alt, 1)) + " in " + sky_utils.compass_direction(az) + " (" + str(round(az, 0)) + ")")
+    elif options.best and options.plot != "curves" and planner.embedded:
+      print("--plot " + str(options.plot) + " is not available with --profile embedded")
+    elif options.best and options.plot != "curves":
+      # every night of the year as one image
+      import plot_utils # own
+      plot_utils.debug = debug
+      output_key = cache_utils.output_key(**output_inputs(run, plot=options.plot, year=theYear))
+      if options.plot == "sheet":
+        plot_names = [base_dir + "DSO_sheet_" + str(options.catalogue) + "_" + str(theYear) + ".png"]
+      else:
+        plot_names = [base_dir + "DSO_" + str(name) + "_" + str(theYear) + "_heatmap.png" for name in planner.catalogue_coordinates(my_DSO_dict)[0]]
+      if all(output_cache.fresh(plot_name, output_key) for plot_name in plot_names):
+        print("Inputs unchanged, reusing " + ", ".join(plot_names))
       else:
-        # loop over all DSOs
-        #for dso_name in my_DSO_list:
-        for dso_name, dso_identifier in my_DSO_dict.items():
-          dso_list = []
-          # loop over 12 dates/year
-          for the_month in ["01", "02", "03", "04", "05", "06", "07", "08", "09", "10", "11", "12"]:
-            the_date = "01." + str(the_month) + "." + str(theYear)
-            if debug:
-              print("Calculate visibility of " + str(dso_name) + " at " + str(the_date))
-            the_day = today.replace(day=int(1), month=int(the_month), year=int(theYear))
-            the_tomorrow = the_day + datetime.timedelta(days=1)
-            dso = DSO(dso_name, dso_identifier, the_day, the_tomorrow)
-            dso_list.append(dso)
-          #print(dso_list)
+        names, altitudes, grid = planner.altitude_year(theYear, my_DSO_dict)
+        if options.plot == "sheet":
+          plot_utils.plot_sheet(plot_names[0], names, altitudes, grid, str(options.catalogue) + " " + str(theYear) + " at " + str(planner.site["location"]))
+          output_cache.record(plot_names[0], output_key, plot="sheet", site=planner.site["location"], year=theYear, catalogue=options.catalogue)
+          print("Saved " + str(plot_names[0]))
+        else:
+          for name, altitude in zip(names, altitudes):
+            plot_name = base_dir + "DSO_" + str(name) + "_" + str(theYear) + "_heatmap.png"
+            plot_utils.plot_year(plot_name, name, altitude, grid)
+            output_cache.record(plot_name, output_key, plot="heatmap", site=planner.site["location"], year=theYear, dso=name)
+            print("Saved " + str(plot_name))
+    elif options.best:
+      # the 1st of every month of a single DSO (--dso) or of all DSOs
+      dsos = {dso_name : dso_name} if options.dso else my_DSO_dict
+      # one chart per DSO: keyed on the run and that DSO only, another catalogue entry does not change it
+      inputs = dict(run_inputs(run), plot="curves", year=theYear)
+      checkpoint = run_checkpoint(run, "best", theYear, cache_utils.output_key(**inputs, catalogue=planner.catalogue_contents(dsos)))
+      for dso_name, dso_identifier in dsos.items():
+        plot_name = best_plot_name(dso_name, theYear)
+        output_key = cache_utils.output_key(**inputs, dso=dso_identifier, record=dso_inputs(planner, dso_identifier))
+        # embedded runs print text and make no chart, a chart of another run is never theirs
+        if exporter == None and not planner.embedded and output_cache.fresh(plot_name, output_key):
+          print("Inputs unchanged, reusing " + str(plot_name))
+          continue
+        # a failing DSO or month does not stop the loop, its chart is made again next time
+        failures = len(planner.failures)
+        dso_list = planner.best_dates(dso_name, dso_identifier, theYear, callback=exporter.write if exporter else None, checkpoint=checkpoint, keep_tracks=not planner.embedded or options.tracks != None)
+        if len(dso_list) > 0 and planner.embedded:
+          best_text(planner, dso_list)
+        elif len(dso_list) > 0:
           plot(dso_list)
+        if len(planner.failures) == failures and not planner.embedded:
+          output_cache.record(plot_name, output_key, plot="curves", site=planner.site["location"], year=theYear, dso=dso_name)
+      checkpoint.finish()
 
     elif options.tonight:
+      tonight_report(run, exporter)
 
-      # data format for pdf
-      #data = [["M1", "TODO"], ["M2", "TODO"],
-      pdfdata_nn, pdfdata_an, pdfdata_in = [], [], []
-
-      print("Find best DSOs for " + str(today.strftime("%d.%m.%Y")) + " - " + str(tomorrow.strftime("%d.%m.%Y")) + ", ordered by their max. altitude...")
-      dso_list = []
-      #for dso_name in my_DSO_list:
-      for dso_name, dso_identifier in my_DSO_dict.items():
-        print("Check DSO: " + str(dso_name) + " (" + str(dso_identifier) + ")")
-        dso = DSO(dso_identifier, dso_name, today, tomorrow)
-        dso_list.append(dso)
-
-      result_msg = "Best DSOs for " + str(today.strftime("%d.%m.Y")) + " - " + str(tomorrow.strftime("%d.%m.%Y")) + " at " + str(config.coordinates["location"]) + " (" + str(config.coordinates["latitude"]) + ", " + str(config.coordinates["longitude"]) + " [" + str(config.coordinates["elevation"]) + " m])"
-
-      astronomical_night_start, astronomical_night_end, astronomical_night_dsos, nautical_night_start, nautical_night_end, nautical_night_dsos, invisible_dsos = sort_DSOs(dso_list)
+    if exporter:
+      exporter.close()
 
-      msg = "\n\nNautical night: " + str(nautical_night_start.strftime("%d.%m.%y %H:%M")) + " - " + str(nautical_night_end.strftime("%d.%m.%y %H:%M"))
-      if debug:
-        print("# DSOs in nautical night: " + str(len(nautical_night_dsos)))
-      print(msg)
-      result_msg += msg
-      for ndso in nautical_night_dsos:
-        msg = "\n  " + str(round(ndso.max_alt,0)) + " in " + str(ndso.max_alt_direction) + " (" + str(round(ndso.max_alt_az,0)) + ") at " + str(ndso.max_alt_time.strftime("%H:%M")) # + " (nautical night)")
-        if options.moon:
-          msg +=  str(ndso.sub_text_moon_at_max_alt)
-        if hasattr(ndso, "major_axis") and hasattr(ndso, "minor_axis") and hasattr(ndso, "magnitude"):
-          msg += "\n dimensions: " + str(round(ndso.major_axis,1)) + "*" + str(round(ndso.minor_axis,1)) + "\'"
-          if round(ndso.magnitude,1) > -1.0:
-            msg += "; mag: " + str(round(ndso.magnitude,1))
-        pdfdata_nn.append([ndso.the_object_name, msg.lstrip("\n\r")])
-        print(msg)
-        result_msg += msg
-
-      msg = "\n\nAstronomical night: " + str(astronomical_night_start.strftime("%d.%m.%y %H:%M")) + " - " + str(astronomical_night_end.strftime("%d.%m.%y %H:%M"))
-      if debug:
-        print("# DSOs in astronomical night: " + str(len(astronomical_night_dsos)))
-      print(msg)
-      result_msg += msg
-      for asdso in astronomical_night_dsos:
-        msg = "\n  " + str(round(asdso.max_alt,0)) + " in " + str(asdso.max_alt_direction) + " (" + str(round(asdso.max_alt_az,0)) + ") at " + str(asdso.max_alt_time.strftime("%H:%M")) # + " (astronomical night)")
-        if options.moon:
-          msg += str(asdso.sub_text_moon_at_max_alt)
-        if hasattr(asdso, "major_axis") and hasattr(asdso, "minor_axis") and hasattr(asdso, "magnitude"):
-          msg += "\n dimensions: " + str(round(asdso.major_axis,1)) + "*" + str(round(asdso.minor_axis,1)) + "\'"
-          if round(asdso.magnitude,1) > -1.0:
-            msg += "; mag: " + str(round(asdso.magnitude,1))
-        pdfdata_an.append([str(asdso.the_object_name), msg.lstrip("\n\r")])
-        print(msg)
-        result_msg += msg
-
-      if debug:
-        print("# Invisible DSOs: " + str(len(invisible_dsos)))
-
-      msg = "\n\nInvisible DSOs:"
-      result_msg += msg
-      if len(invisible_dsos)>0:
-        print(msg)
-        for idso in invisible_dsos:
-          msg = "\n  " + idso.the_object_name + ": " + str(round(idso.max_alt,0)) + " in " + str(idso.max_alt_direction) + " (" + str(round(idso.max_alt_az,0)) + ") at " + str(idso.max_alt_time.strftime("%H:%M")) #+ " [" + str(my_DSO_dict.values()[idso.the_object_name]) + "]"
-          print(msg)
-          pdfdata_in.append([idso.the_object_name, msg.lstrip("\n\r")])
-          result_msg += msg
-      else:
-        print("No invisible DSOs in the list.")
-
-      # create PDF document
-      fileName = str(options.catalogue) + "_Catalogue DSOs_in_" + str(config.coordinates["location"]) + "_" + str(theDate) + ".pdf"
-      if options.dso != None:
-        fileName = str(options.dso) + "_DSO_in_" + str(config.coordinates["location"]) + "_" + str(theDate) + ".pdf"
-        
-      if debug:
-        print("Create PDF " + str(fileName) + "...")
-        print("")
-        print(pdfdata_nn)
-        print("")
-        print(pdfdata_an)
-        print("")
-        print(pdfdata_in)
-      documentTitle = str(options.catalogue) + " Catalogue DSO Visibility in " + str(config.coordinates["location"])
-      title = str(options.catalogue) + " Catalogue DSO Visibility"
-      subTitle = today.strftime("%d.%m.") + "-" + tomorrow.strftime("%d.%m.%Y") + " in " + str(config.coordinates["location"]) + " (" + str(config.coordinates["latitude"]) + ", " + str(config.coordinates["longitude"]) + ")"
-
-      elements = []
-      PAGESIZE = portrait(A4)
-      doc = SimpleDocTemplate(fileName,  pagesize=PAGESIZE, leftMargin=1*cm)
-      style = getSampleStyleSheet()
-      styleH2 = ParagraphStyle('H2Style',
-                                 fontName="Helvetica-Bold",
-                                 fontSize=16,
-                                 parent=style['Heading2'],
-                                 alignment=1,
-                                 spaceAfter=14)
-      elements.append(Paragraph(title, styleH2))
-      styleH3 = ParagraphStyle('H3Style',
-                                 fontName="Helvetica-Bold",
-                                 fontSize=12,
-                                 parent=style['Heading3'],
-                                 alignment=TA_LEFT,
-                                 spaceAfter=12)
-      elements.append(Paragraph(subTitle, styleH3))
-
-      style.add(ParagraphStyle(name='Normal_LEFT',
-                          parent=style['Normal'],
-                          fontName='Helvetica',
-                          wordWrap='LTR',
-                          alignment=TA_LEFT,
-                          fontSize=11,
-                          leading=13,
-                          textColor=colors.black,
-                          borderPadding=0,
-                          leftIndent=0,
-                          rightIndent=0,
-                          spaceAfter=0,
-                          spaceBefore=0,
-                          splitLongWords=True,
-                          spaceShrinkage=0.05,
-                          ))
-      styleP = ParagraphStyle('PStyle',
-                              parent=style['Normal_LEFT'],
-                                 fontName="Helvetica",
-                                 fontSize=11,
-                                 alignment=1,
-                                 spaceAfter=10)
-
-      if len(pdfdata_nn)>0:
-        paragraph = "Nautical night: " + str(nautical_night_start.strftime("%d.%m.%y %H:%M")) + " - " + str(nautical_night_end.strftime("%d.%m.%y %H:%M"))
-        elements.append(Paragraph(paragraph, styleH3))
-        #paragraph = "DSOs during nautical night:"
-        #elements.append(Paragraph(paragraph, styleP))
-        colWidths=(1*cm, 5*cm)
-        t = Table(pdfdata_nn, colWidths=[2*cm] + [None] * (len(pdfdata_nn[0]) - 1), rowHeights=65, hAlign='LEFT')
-        table_style = TableStyle([
-            ('ALIGN',(1,1),(-2,-2),'RIGHT'),
-            ('BACKGROUND',(1,1),(-2,-2),colors.white),
-            ('TEXTCOLOR',(0,0),(1,-1),colors.black),
-            ('INNERGRID',(0,0),(-1,-1),0.25,colors.black),
-            ('BOX',(0,0),(-1,-1),0.25,colors.black),
-        ])
-        for row, values in enumerate(pdfdata_nn):
-          #print(row, values)
-          if row % 2 == 0:
-            table_style.add('BACKGROUND',(0,row),(1,row),colors.lightgrey)
-        t.setStyle(table_style)
-        elements.append(t)
-
-      if len(pdfdata_an)>0:
-        paragraph = "Astronomical night: " + str(astronomical_night_start.strftime("%d.%m.%y %H:%M")) + " - " + str(astronomical_night_end.strftime("%d.%m.%y %H:%M"))
-        elements.append(Paragraph(paragraph, styleH3))
-        #paragraph = "DSOs during astronomical night:"
-        #elements.append(Paragraph(paragraph, styleP))
-        colWidths=(1*cm, 5*cm)
-        t = Table(pdfdata_an, colWidths=[2*cm] + [None] * (len(pdfdata_an[0]) - 1), rowHeights=65, hAlign='LEFT')
-        table_style = TableStyle([
-            ('ALIGN',(1,1),(-2,-2),'RIGHT'),
-            ('BACKGROUND',(1,1),(-2,-2),colors.white),
-            ('TEXTCOLOR',(0,0),(1,-1),colors.black),
-            ('INNERGRID',(0,0),(-1,-1),0.25,colors.black),
-            ('BOX',(0,0),(-1,-1),0.25,colors.black),
-        ])
-        for row, values in enumerate(pdfdata_an):
-          #print(row, values)
-          if row % 2 == 0:
-            table_style.add('BACKGROUND',(0,row),(1,row),colors.lightgrey)
-        t.setStyle(table_style)
-        elements.append(t)
-
-      if len(pdfdata_in)>0:
-        paragraph = "Invisible DSOs:"
-        elements.append(Paragraph(paragraph, styleH3))
-        colWidths=(1*cm, 5*cm)
-        t = Table(pdfdata_in, colWidths=[2*cm] + [None] * (len(pdfdata_in[0]) - 1), rowHeights=65, hAlign='LEFT')
-        table_style = TableStyle([
-            ('ALIGN',(1,1),(-2,-2),'RIGHT'),
-            ('BACKGROUND',(1,1),(-2,-2),colors.white),
-            ('TEXTCOLOR',(0,0),(1,-1),colors.black),
-            ('INNERGRID',(0,0),(-1,-1),0.25,colors.black),
-            ('BOX',(0,0),(-1,-1),0.25,colors.black),
-        ])
-        for row, values in enumerate(pdfdata_in):
-          #print(row, values)
-          if row % 2 == 0:
-            table_style.add('BACKGROUND',(0,row),(1,row),colors.lightgrey)
-        t.setStyle(table_style)
-        elements.append(t)
-
-
-      # create PDF
-      doc.build(elements)
-
-  except Exception as e:
+  except (Exception, KeyboardInterrupt) as e:
     print("DSO observation planning error " + str(dso_name) + ": " + str(e))
+    keep_progress(run)
+    sys.exit(1)
   sys.exit(0)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Content-addressed output cache of Solveighs DSO observation planning
+#
+# Every generated file (plot, PDF report) gets a key: the hash of everything it
+# is made of (site, date or year, catalogue contents, options and the source
+# code of the planning). The manifest remembers key and content hash of every
+# file produced; if a run would produce a file with the same key and the file
+# is still unchanged on disk, it is reused instead of computed again.
+#
+
+import os
+import glob
+import json
+import hashlib
+import datetime
+import functools
+
+debug = False
+
+manifest_version = 1
+manifest_name = "output_manifest.json"
+
+@functools.lru_cache(maxsize=1)
+def code_version():
+  # hash of the python sources next to this file: new code, new outputs
+  sha = hashlib.sha1()
+  for file_name in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+    sha.update(os.path.basename(file_name).encode("utf-8"))
+    with open(file_name, "rb") as f:
+      sha.update(f.read())
+  return sha.hexdigest()
+
+@functools.lru_cache(maxsize=64)
+def _file_hash(file_name, size, mtime):
+  sha = hashlib.sha1()
+  with open(file_name, "rb") as f:
+    for block in iter(lambda: f.read(1 << 20), b""):
+      sha.update(block)
+  return sha.hexdigest()
+
+def file_hash(file_name):
+  # content hash of a file, None if missing; cached per size and modification time
+  if file_name == None or not os.path.isfile(file_name):
+    return None
+  stat = os.stat(file_name)
+  return _file_hash(os.path.abspath(file_name), stat.st_size, stat.st_mtime_ns)
+
+def output_key(**inputs):
+  # key of an output from its inputs (anything json can write) and the code version
+  data = json.dumps([manifest_version, code_version(), inputs], sort_keys=True, default=str)
+  return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+class OutputCache:
+
+  def __init__(self, base_dir="./", enabled=True):
+    self.enabled = enabled
+    self.file_name = os.path.join(base_dir, manifest_name)
+    self.entries = {}
+    if os.path.isfile(self.file_name):
+      try:
+        with open(self.file_name) as f:
+          manifest = json.load(f)
+        if manifest.get("version") == manifest_version:
+          self.entries = manifest.get("outputs", {})
+      except (ValueError, OSError) as e:
+        print("Output manifest " + str(self.file_name) + " ignored: " + str(e))
+
+  def fresh(self, output_name, key):
+    # True if output_name was produced from the same inputs and not changed since
+    if not self.enabled:
+      return False
+    entry = self.entries.get(os.path.normpath(output_name))
+    if entry == None or entry.get("key") != key:
+      return False
+    if file_hash(output_name) != entry.get("sha1"):
+      if debug:
+        print("Output " + str(output_name) + " changed on disk")
+      return False
+    if debug:
+      print("Output " + str(output_name) + " is up to date")
+    return True
+
+  def record(self, output_name, key, **description):
+    # remember a produced file, description: a few inputs for humans reading the manifest
+    if not os.path.isfile(output_name):
+      return
+    self.entries[os.path.normpath(output_name)] = dict(key=key, sha1=file_hash(output_name), size=os.path.getsize(output_name),
+                                                       created=datetime.datetime.now().isoformat(timespec="seconds"), inputs=description)
+    self.save()
+
+  def save(self):
+    # write to a temporary file first, a crash never leaves half a manifest
+    os.makedirs(os.path.dirname(self.file_name) or ".", exist_ok=True)
+    temporary = self.file_name + ".tmp"
+    with open(temporary, "w") as f:
+      json.dump(dict(version=manifest_version, outputs=self.entries), f, indent=1, sort_keys=True)
+    os.replace(temporary, self.file_name)
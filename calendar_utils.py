@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Moon-free dark time calendar of Solveighs DSO observation planning
+#
+# For every night of a year the intervals of true dark time: sun below -18 deg
+# and the moon below the horizon or thinner than an illumination threshold.
+# Sun and moon are computed for every minute of the year in one vectorized
+# pass, the intervals come from the edges of the minute mask. The calendar is
+# stored per site and year (.npz) and only rebuilt when its inputs change; the
+# modes use it to skip nights without enough dark time before any DSO is
+# evaluated.
+#
+
+import os
+import json
+import hashlib
+import datetime
+import numpy as np
+from astropy.time import Time
+import sky_utils # own
+
+debug = False
+
+calendar_version = 1
+step_minutes = 1
+dark_sun_alt = -18 # deg
+
+def calendar_key(site, year, max_illumination):
+  site_data = dict((k, site.get(k)) for k in ("latitude", "longitude", "elevation", "timezone"))
+  data = json.dumps([calendar_version, step_minutes, dark_sun_alt, site_data, int(year), float(max_illumination)], sort_keys=True, default=str)
+  return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+def calendar_file_name(base_dir, site, year):
+  return os.path.join(base_dir, "calendar", "dark_time_" + str(site["location"]) + "_" + str(year) + ".npz")
+
+def build_calendar(file_name, key, location, year, utcoffset_hours, max_illumination=0.25):
+  # utcoffset_hours: per night, the nights run from local noon to local noon
+  first_night = datetime.date(int(year), 1, 1)
+  nights = (datetime.date(int(year) + 1, 1, 1) - first_night).days
+  samples = 24 * 60 // step_minutes
+  noons = Time(first_night.isoformat() + " 12:00:00").utc.jd + np.arange(nights) - np.asarray(utcoffset_hours, dtype=float) / 24.0
+  jd = (noons[:, None] + np.arange(samples)[None, :] * step_minutes / (24.0 * 60.0)).ravel()
+  sun_alt, moon_alt, illumination = sky_utils.sun_moon_altitudes(jd, location)
+  dark = (sun_alt < dark_sun_alt).reshape(nights, samples)
+  moon_free = dark & ((moon_alt < 0) | (illumination < max_illumination)).reshape(nights, samples)
+  rows, starts, ends = sky_utils.mask_intervals(moon_free)
+
+  os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+  np.savez_compressed(file_name, key=key, first_night=first_night.isoformat(), noons=noons,
+                      dark_minutes=np.count_nonzero(dark, axis=1) * step_minutes,
+                      moon_free_minutes=np.count_nonzero(moon_free, axis=1) * step_minutes,
+                      rows=rows, starts=starts * step_minutes, ends=ends * step_minutes)
+  if debug:
+    print("Dark time calendar " + str(file_name) + ": " + str(len(rows)) + " intervals in " + str(nights) + " nights")
+  return load_calendar(file_name, key)
+
+def load_calendar(file_name, key=None):
+  # None if missing or built from other inputs
+  if not os.path.isfile(file_name):
+    return None
+  with np.load(file_name, allow_pickle=False) as data:
+    if key != None and str(data["key"]) != key:
+      if debug:
+        print("Dark time calendar " + str(file_name) + " is outdated")
+      return None
+    return DarkCalendar(dict((name, data[name]) for name in data.files))
+
+class DarkCalendar:
+
+  def __init__(self, data):
+    self.first_night = datetime.date.fromisoformat(str(data["first_night"]))
+    self.noons = data["noons"]
+    self.dark_minutes = data["dark_minutes"]
+    self.moon_free_minutes = data["moon_free_minutes"]
+    # intervals of night n: starts/ends[first[n]:first[n + 1]], minutes from local noon
+    self.starts = data["starts"]
+    self.ends = data["ends"]
+    self.first = np.searchsorted(data["rows"], np.arange(len(self.noons) + 1))
+
+  def _night(self, day):
+    n = (day - self.first_night).days
+    if n < 0 or n >= len(self.noons):
+      raise KeyError("no dark time calendar for " + str(day))
+    return n
+
+  def dark_hours(self, day):
+    # astronomical darkness of the night starting at day
+    return self.dark_minutes[self._night(day)] / 60.0
+
+  def moon_free_hours(self, day):
+    return self.moon_free_minutes[self._night(day)] / 60.0
+
+  def intervals(self, day):
+    # moon-free dark intervals of the night as UTC datetimes, like the night times of the report
+    n = self._night(day)
+    noon = Time(self.noons[n], format="jd", scale="utc").datetime
+    return [(noon + datetime.timedelta(minutes=int(start)), noon + datetime.timedelta(minutes=int(end))) for start, end in zip(self.starts[self.first[n]:self.first[n + 1]], self.ends[self.first[n]:self.first[n + 1]])]
+
+  def nights(self, min_hours=0.0):
+    # dates of the nights with at least min_hours moon-free dark time
+    good = np.flatnonzero(self.moon_free_minutes >= float(min_hours) * 60.0)
+    return [self.first_night + datetime.timedelta(days=int(n)) for n in good]
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Collection of Solveighs DSO catalogue helpers
+#
+# Large catalogues (e.g. OpenNGC, https://github.com/mattiaverga/OpenNGC) are
+# read from a local CSV file in chunks, so that only one chunk of objects is in
+# memory at a time.
+#
+# Names are resolved offline through an alias index: every designation and
+# common name of the catalogue is normalized ("Sh 2-155", "SH2-155" -> "SH2-155")
+# and looked up in a dict. Only common names (letters only, e.g. "Andromeda
+# Galaxy") may be misspelled; a designation (catalogue prefix and number) has to
+# match, an unknown one is not mistaken for its neighbour (NGC6993 is no NGC6992).
+#
+# Comets and asteroids are read from MPC orbital elements files.
+#
+
+import os
+import re
+import csv
+import difflib
+import numpy as np
+
+debug = False
+
+# OpenNGC object types which are no deep sky objects (or no objects at all)
+skip_types = ["*", "**", "*Ass", "Dup", "NonEx", "Other"]
+
+# OpenNGC type -> Simbad otype as used by DSO.object_type_string
+openngc_types = {"G" : "GGG", "GPair" : "PaG", "GTrpl" : "CGG", "GGroup" : "CGG", "PN" : "PN",
+                 "OCl" : "OpC", "GCl" : "GlC", "Cl+N" : "OpC", "Neb" : "GNe", "HII" : "GNe",
+                 "EmN" : "GNe", "RfN" : "RNe", "SNR" : "SNR", "DrkN" : "GDNe", "Nova" : "",
+                 "Other" : ""}
+
+def sexagesimal_to_deg(value, hours=False):
+  value = value.strip()
+  if ":" not in value and " " not in value:
+    return float(value) # already in degrees
+  sign = -1.0 if value.startswith("-") else 1.0
+  parts = [abs(float(p)) for p in value.replace(":", " ").split()]
+  while len(parts) < 3:
+    parts.append(0.0)
+  deg = sign * (parts[0] + parts[1] / 60.0 + parts[2] / 3600.0)
+  if hours:
+    deg *= 15.0
+  return deg
+
+def _float(value):
+  try:
+    return float(value)
+  except (TypeError, ValueError):
+    return -1.0
+
+def _aliases(row):
+  # all designations of an OpenNGC row
+  aliases = []
+  if row.get("M"):
+    aliases.append("M" + str(int(row["M"])))
+  for key in ("NGC", "IC"):
+    if row.get(key):
+      for number in row[key].split(","):
+        aliases.append(key + number.strip().lstrip("0"))
+  for key in ("Identifiers", "Common names"):
+    if row.get(key):
+      aliases += [a.strip() for a in row[key].split(",") if a.strip() != ""]
+  return aliases
+
+def parse_row(row):
+  # OpenNGC row (or any CSV with name/ra/dec columns) -> catalogue record
+  name = row.get("Name") or row.get("name")
+  ra = row.get("RA") or row.get("ra")
+  dec = row.get("Dec") or row.get("dec")
+  if not name or not ra or not dec:
+    return None
+  otype = row.get("Type") or row.get("type") or ""
+  if otype in skip_types:
+    return None
+  return dict(
+    name = name.strip(),
+    ra = sexagesimal_to_deg(ra, hours=":" in ra or " " in ra.strip()),
+    dec = sexagesimal_to_deg(dec),
+    object_type = openngc_types.get(otype, otype),
+    magnitude = _float(row.get("V-Mag") or row.get("B-Mag") or row.get("magnitude")),
+    major_axis = _float(row.get("MajAx") or row.get("major_axis")),
+    minor_axis = _float(row.get("MinAx") or row.get("minor_axis")),
+    aliases = _aliases(row)
+  )
+
+def iter_catalogue(file_name, chunk_size=500):
+  # yield lists of at most chunk_size records, reading the file line by line
+  with open(file_name, newline="", encoding="utf-8") as f:
+    first_line = f.readline()
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    f.seek(0)
+    chunk = []
+    rows = 0
+    for row in csv.DictReader(f, delimiter=delimiter):
+      rows += 1
+      record = parse_row(row)
+      if record is None:
+        continue
+      chunk.append(record)
+      if len(chunk) >= chunk_size:
+        yield chunk
+        chunk = []
+    if len(chunk) > 0:
+      yield chunk
+    if debug:
+      print("Read " + str(rows) + " rows from " + str(file_name))
+
+# catalogue prefixes written out in full -> short form
+name_prefixes = {"MESSIER" : "M", "CALDWELL" : "C", "SHARPLESS" : "SH", "BARNARD" : "B"}
+
+def _name_tokens(name):
+  tokens = re.findall(r"[A-Z]+|[0-9]+", str(name).upper())
+  return [name_prefixes.get(t, t) if not t.isdigit() else str(int(t)) for t in tokens]
+
+def name_key(name):
+  # case, blanks and leading zeros do not matter, "-" only between two numbers: SH2-155, M31, NGC224
+  key = ""
+  previous = None
+  for token in _name_tokens(name):
+    if previous != None and previous.isdigit() and token.isdigit():
+      key += "-"
+    key += token
+    previous = token
+  return key
+
+def compact_key(name):
+  # even more tolerant: SH2155
+  return "".join(_name_tokens(name))
+
+class AliasIndex:
+
+  def __init__(self):
+    self.records = []
+    self.keys = {}
+    self.compact_keys = {}
+    self.prefixes = {} # first two characters -> common name keys, for the fuzzy search
+
+  def _add_key(self, alias, i):
+    key = name_key(alias)
+    if key == "":
+      return
+    if key not in self.keys:
+      self.keys[key] = i
+      if key.isalpha():
+        self.prefixes.setdefault(key[:2], []).append(key)
+    self.compact_keys.setdefault(compact_key(alias), i)
+
+  def add(self, record):
+    i = len(self.records)
+    self.records.append(record)
+    for alias in [record["name"]] + record.get("aliases", []):
+      self._add_key(alias, i)
+
+  def add_alias(self, alias, name):
+    # another designation of a known object, e.g. a Caldwell number
+    i = self.keys.get(name_key(name))
+    if i != None:
+      self._add_key(alias, i)
+
+  def resolve(self, name, fuzzy=True):
+    # catalogue record of a designation or common name, None if unknown;
+    # fuzzy: tolerate typos in common names (never in designations)
+    key = name_key(name)
+    i = self.keys.get(key)
+    if i == None:
+      i = self.compact_keys.get(compact_key(name))
+    if i == None and fuzzy and key.isalpha():
+      matches = difflib.get_close_matches(key, self.prefixes.get(key[:2], []), n=1, cutoff=0.85)
+      if len(matches) > 0:
+        i = self.keys[matches[0]]
+        if debug:
+          print("Resolved " + str(name) + " as " + str(matches[0]))
+    if i == None:
+      return None
+    return self.records[i]
+
+  def __len__(self):
+    return len(self.records)
+
+def build_alias_index(file_name, chunk_size=500):
+  index = AliasIndex()
+  for records in iter_catalogue(file_name, chunk_size):
+    for record in records:
+      index.add(record)
+  if debug:
+    print("Alias index: " + str(len(index.keys)) + " names of " + str(len(index)) + " objects")
+  return index
+
+catalogue_header = ["Name", "Type", "RA", "Dec", "MajAx", "MinAx", "V-Mag", "Identifiers"]
+
+def _catalogue_row(record):
+  return [record["name"], record.get("object_type", ""), "%.6f" % record["ra"], "%.6f" % record["dec"],
+          record.get("major_axis", ""), record.get("minor_axis", ""), record.get("magnitude", ""),
+          ",".join(record.get("aliases", []))]
+
+def write_catalogue(file_name, records):
+  # records as catalogue file that iter_catalogue() reads again (coordinates in deg)
+  with open(file_name, "w", newline="", encoding="utf-8") as f:
+    writer = csv.writer(f, delimiter=";")
+    writer.writerow(catalogue_header)
+    for record in records:
+      writer.writerow(_catalogue_row(record))
+
+def append_catalogue(file_name, records):
+  # add records to a catalogue file written by write_catalogue(), a missing file is created
+  new_file = not os.path.isfile(file_name) or os.path.getsize(file_name) == 0
+  if new_file:
+    os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+  with open(file_name, "a", newline="", encoding="utf-8") as f:
+    writer = csv.writer(f, delimiter=";")
+    if new_file:
+      writer.writerow(catalogue_header)
+    for record in records:
+      writer.writerow(_catalogue_row(record))
+
+def _orbit_aliases(designation):
+  # "C/2023 A3 (Tsuchinshan-ATLAS)" -> C/2023 A3, Tsuchinshan-ATLAS; "12P/Pons-Brooks" -> 12P, Pons-Brooks; "(1) Ceres" -> Ceres
+  aliases = []
+  match = re.match(r"^\((\d+)\)\s*(.+)$", designation)
+  if match:
+    aliases.append(match.group(2))
+  match = re.match(r"^(.+?)\s*\((.+)\)$", designation)
+  if match:
+    aliases += [match.group(1), match.group(2)]
+  match = re.match(r"^(\d+[PID])/(.+?)(\s*\(.*\))?$", designation)
+  if match:
+    aliases += [match.group(1), match.group(2)]
+  return aliases
+
+def load_orbital_elements(file_name, kind="comet"):
+  # records of the comets (MPC CometEls.txt format) or asteroids (kind "asteroid",
+  # MPCORB.DAT format) of a file, "orbit" holds the elements, see sky_utils.orbit()
+  from skyfield.data import mpc # only needed for comets and asteroids
+  import io
+  with open(file_name, "rb") as f:
+    text = f.read()
+  if kind == "comet":
+    elements = mpc.load_comets_dataframe(io.BytesIO(text))
+  else:
+    # skip the header of the full MPCORB.DAT
+    header_end = text.find(b"\n-----")
+    if header_end >= 0:
+      text = text[text.index(b"\n", header_end + 1) + 1:]
+    elements = mpc.load_mpcorb_dataframe(io.BytesIO(text))
+  records = []
+  for i in range(len(elements)):
+    row = elements.iloc[i]
+    designation = str(row["designation"]).strip()
+    records.append(dict(name=designation, object_type="Comet" if kind == "comet" else "Asteroid",
+                        magnitude=-1.0, major_axis=-1.0, minor_axis=-1.0,
+                        aliases=_orbit_aliases(designation), orbit=(kind, row)))
+  if debug:
+    print("Read " + str(len(records)) + " orbits from " + str(file_name))
+  return records
+
+def cross_match(ra, dec, tolerance):
+  # group label of every object: objects closer than tolerance (deg), directly or
+  # through a chain, get the index of the first of them. Sweep over the objects
+  # sorted by declination, so only neighbours within tolerance in dec are compared.
+  ra = np.radians(np.asarray(ra, dtype=float))
+  dec_deg = np.asarray(dec, dtype=float)
+  dec = np.radians(dec_deg)
+  labels = np.arange(len(ra))
+
+  def root(i):
+    while labels[i] != i:
+      labels[i] = labels[labels[i]]
+      i = labels[i]
+    return i
+
+  order = np.argsort(dec_deg, kind="stable")
+  sorted_dec = dec_deg[order]
+  for a in range(len(order)):
+    end = np.searchsorted(sorted_dec, sorted_dec[a] + tolerance, side="right")
+    if end <= a + 1:
+      continue
+    i = order[a]
+    j = order[a + 1:end]
+    # haversine, precise for small separations
+    h = np.sin((dec[j] - dec[i]) / 2.0) ** 2 + np.cos(dec[i]) * np.cos(dec[j]) * np.sin((ra[j] - ra[i]) / 2.0) ** 2
+    for k in j[2.0 * np.degrees(np.arcsin(np.sqrt(np.minimum(h, 1.0)))) <= tolerance]:
+      ri, rk = root(i), root(k)
+      if ri != rk:
+        labels[max(ri, rk)] = min(ri, rk)
+  return np.array([root(i) for i in range(len(labels))], dtype=int)
+
+class SkyIndex:
+  # Zones of zone_height deg in declination, the objects of a zone sorted by ra:
+  # a cone query only looks at the zones it overlaps and, within them, at the ra
+  # interval it covers, then checks the exact separation of these candidates.
+
+  def __init__(self, ra, dec, zone_height=1.0):
+    self.ra = np.asarray(ra, dtype=float) % 360.0
+    self.dec = np.asarray(dec, dtype=float)
+    self.zone_height = float(zone_height)
+    ra_rad, dec_rad = np.radians(self.ra), np.radians(self.dec)
+    self.xyz = np.stack([np.cos(dec_rad) * np.cos(ra_rad), np.cos(dec_rad) * np.sin(ra_rad), np.sin(dec_rad)], -1)
+    self.zones = int(np.ceil(180.0 / self.zone_height))
+    # sorted by zone * 360 + ra: zone z holds the keys z * 360 ... z * 360 + 360
+    keys = self._zone(self.dec) * 360.0 + self.ra
+    self.order = np.argsort(keys, kind="stable")
+    self.keys = keys[self.order]
+
+  def _zone(self, dec):
+    return np.clip(((np.asarray(dec) + 90.0) / self.zone_height).astype(int), 0, self.zones - 1)
+
+  def cone(self, ra, dec, radius):
+    # indices of the objects within radius (deg) of ra, dec and their separations, nearest first
+    ra, dec, radius = float(ra) % 360.0, float(dec), float(radius)
+    zones = np.arange(self._zone(dec - radius), self._zone(dec + radius) + 1) * 360.0
+    if abs(dec) + radius >= 90.0:
+      intervals = [(0.0, 360.0)] # all of the zones near the poles
+    else:
+      # widest ra half width of the cone, wrapped around 0/360
+      half_width = np.degrees(np.arcsin(min(1.0, np.sin(np.radians(radius)) / np.cos(np.radians(dec)))))
+      intervals = [(max(low, 0.0), min(high, 360.0)) for low, high in ((ra - half_width, ra + half_width), (ra - half_width + 360.0, ra + half_width + 360.0), (ra - half_width - 360.0, ra + half_width - 360.0)) if high > 0.0 and low < 360.0]
+    firsts = np.concatenate([np.searchsorted(self.keys, zones + low, side="left") for low, high in intervals])
+    lasts = np.concatenate([np.searchsorted(self.keys, zones + high, side="left") for low, high in intervals])
+    candidates = [self.order[first:last] for first, last in zip(firsts, lasts) if last > first]
+    if len(candidates) == 0:
+      return np.array([], dtype=int), np.array([], dtype=float)
+    candidates = np.concatenate(candidates)
+    ra_rad, dec_rad = np.radians(ra), np.radians(dec)
+    center = np.array([np.cos(dec_rad) * np.cos(ra_rad), np.cos(dec_rad) * np.sin(ra_rad), np.sin(dec_rad)])
+    separation = np.degrees(np.arccos(np.clip(self.xyz[candidates] @ center, -1.0, 1.0)))
+    inside = separation <= radius
+    candidates, separation = candidates[inside], separation[inside]
+    nearest = np.argsort(separation, kind="stable")
+    return candidates[nearest], separation[nearest]
+
+  def __len__(self):
+    return len(self.ra)
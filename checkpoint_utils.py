@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Checkpoints of long runs of Solveighs DSO observation planning
+#
+# Every evaluated object (DSO and night) of a run is an item. With --resume a
+# run appends every finished item (its scalar results, never the tracks) and
+# every failed one (e.g. a Simbad timeout) to a log file; the log is flushed
+# every few items and seconds, so writing stays linear in the number of items.
+# The next run with --resume takes the finished items from the log and only
+# evaluates the rest and the failed ones again. The log is removed when a run
+# ends without failures. Without --resume nothing is written.
+#
+
+import os
+import time
+import pickle
+
+debug = False
+
+checkpoint_version = 2
+save_every = 25 # items
+save_seconds = 30.0
+
+def checkpoint_file_name(base_dir, mode, site, catalogue_name, date):
+  return os.path.join(base_dir, "checkpoint", str(mode) + "_" + str(site["location"]) + "_" + str(catalogue_name) + "_" + str(date) + ".pkl")
+
+def read_log(file_name):
+  # header and entries of a log, a truncated last entry (crash while writing) is dropped
+  entries = []
+  with open(file_name, "rb") as f:
+    header = pickle.load(f)
+    while True:
+      try:
+        entries.append(pickle.load(f))
+      except EOFError:
+        break
+      except (pickle.UnpicklingError, ValueError, AttributeError):
+        if debug:
+          print("Checkpoint " + str(file_name) + ": truncated entry dropped")
+        break
+  return header, entries
+
+class Checkpoint:
+
+  def __init__(self, file_name, key, enabled=False):
+    # key: hash of the inputs of the run, a checkpoint of other inputs is not resumed;
+    # enabled (--resume): resume an existing log and log this run
+    self.file_name = file_name
+    self.key = key
+    self.enabled = enabled
+    self.results = {} # finished items of the previous runs
+    self.failures = {}
+    self.log = None
+    self.unsaved = 0
+    self.saved_at = time.time()
+    if enabled and os.path.isfile(file_name):
+      try:
+        header, entries = read_log(file_name)
+        if header.get("version") == checkpoint_version and header.get("key") == key:
+          for kind, item, value in entries:
+            if kind == "done":
+              self.results[item] = value
+              self.failures.pop(item, None)
+            else:
+              self.failures[item] = value
+          self.log = open(file_name, "ab")
+          print("Resume " + str(file_name) + ": " + str(len(self.results)) + " done, " + str(len(self.failures)) + " failed to retry")
+        else:
+          print("Checkpoint " + str(file_name) + " is from other inputs, start from scratch")
+      except Exception as e:
+        print("Checkpoint " + str(file_name) + " not readable, start from scratch: " + str(e))
+
+  def result(self, item):
+    # result of an item finished by a previous run, None if it has to be evaluated (again)
+    return self.results.get(item)
+
+  def _write(self, entry):
+    if not self.enabled:
+      return
+    if self.log == None:
+      os.makedirs(os.path.dirname(self.file_name) or ".", exist_ok=True)
+      self.log = open(self.file_name, "wb")
+      pickle.dump(dict(version=checkpoint_version, key=self.key), self.log, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.dump(entry, self.log, protocol=pickle.HIGHEST_PROTOCOL)
+    self.unsaved += 1
+    if self.unsaved >= save_every or time.time() - self.saved_at >= save_seconds:
+      self.save()
+
+  def add(self, item, result):
+    # result: scalars only (see DSOResult.without_tracks()), it is not kept in memory
+    self.failures.pop(item, None)
+    self._write(("done", item, result))
+
+  def fail(self, item, error):
+    self.failures[item] = str(error)
+    self._write(("failed", item, str(error)))
+    self.save()
+
+  def save(self):
+    # push the log to disk
+    if self.log != None:
+      self.log.flush()
+      os.fsync(self.log.fileno())
+    self.unsaved = 0
+    self.saved_at = time.time()
+    if debug and self.log != None:
+      print("Checkpoint " + str(self.file_name) + ": " + str(len(self.failures)) + " failed so far")
+
+  def close(self):
+    if self.log != None:
+      self.log.close()
+      self.log = None
+
+  def finish(self):
+    # end of the run: drop the log if everything worked, else keep it for --resume
+    self.save()
+    self.close()
+    if len(self.failures) == 0:
+      if self.enabled and os.path.isfile(self.file_name):
+        os.remove(self.file_name)
+      return
+    if self.enabled:
+      print(str(len(self.failures)) + " evaluations failed, kept in " + str(self.file_name) + ", run again with --resume to retry them:")
+    else:
+      print(str(len(self.failures)) + " evaluations failed (with --resume a run keeps its progress and retries only these):")
+    for item, error in sorted(self.failures.items()):
+      print("  " + " ".join(str(part) for part in item) + ": " + (str(error).splitlines() or [""])[0])
@@ -4,12 +4,22 @@
 # Solveighs astro calculation configuration
 #
 
+import os
+import numpy as np
+
 coordinates_Frankfurt = dict(
   latitude = 50.110573,
   longitude = 8.684966,
   elevation = 207,
   location = 'Frankfurt',
-  timezone = 'Europe/Berlin'
+  timezone = 'Europe/Berlin',
+  # V band sky brightness at the zenith on a moonless night in mag/arcsec^2
+  sky_brightness = 19.5,
+  # local horizon: (azimuth, altitude) points in deg, linear in between,
+  # e.g. [(0, 25), (90, 10), (135, 35), (200, 15), (300, 40)]
+  horizon = [(0, 5)],
+  # or a text file with "azimuth altitude" per line (overrides horizon)
+  horizon_file = None
 )
 
 coordinates_Windhoek = dict(
@@ -17,8 +27,58 @@ coordinates_Windhoek = dict(
   longitude = 17.0657549,
   elevation = 1655,
   location = 'Windhoek',
-  timezone = 'Africa/Windhoek'
+  timezone = 'Africa/Windhoek',
+  sky_brightness = 21.5,
+  horizon = [(0, 5)],
+  horizon_file = None
 )
 
 # default
 coordinates = coordinates_Frankfurt
+
+# local catalogues for offline name resolution of every DSO, the first one is
+# written by --build_catalogue and grows with every DSO found by Simbad, the
+# others may be e.g. OpenNGC's NGC.csv; missing files are skipped and Simbad is
+# asked if no catalogue knows the name
+catalogue_files = ["catalogue/DSO_catalogue.csv", "catalogue/NGC.csv"]
+
+# orbital elements of comets (MPC CometEls.txt format) and asteroids (MPCORB.DAT
+# format) for solar system targets, missing files are skipped
+comet_elements_files = ["catalogue/CometEls.txt"]
+asteroid_elements_files = []
+# comets and asteroids checked with the planets (--catalogue Planets), e.g. ["12P", "Ceres"]
+solar_system_targets = []
+
+# azimuth-indexed horizon lookup of the current site: horizon[int(az)] is the
+# lowest free altitude in deg, see load_horizon()
+horizon = None
+horizons = {}
+
+def read_horizon_file(file_name):
+  points = []
+  with open(file_name) as f:
+    for line in f:
+      line = line.split("#")[0].replace(",", " ").split()
+      if len(line) >= 2:
+        points.append((float(line[0]), float(line[1])))
+  return points
+
+def site_horizon(site):
+  # 360 element lookup of a site, built once per site
+  if site['location'] not in horizons:
+    points = site.get('horizon') or [(0, 0)]
+    if site.get('horizon_file') and os.path.isfile(site['horizon_file']):
+      points = read_horizon_file(site['horizon_file'])
+    points = sorted((az % 360, alt) for az, alt in points)
+    az = np.array([p[0] for p in points], dtype=float)
+    alt = np.array([p[1] for p in points], dtype=float)
+    horizons[site['location']] = np.interp(np.arange(360), az, alt, period=360).astype(np.float32)
+  return horizons[site['location']]
+
+def load_horizon(site=None):
+  # horizon of the current site (or the given one)
+  global horizon
+  if site == None:
+    site = coordinates
+  horizon = site_horizon(site)
+  return horizon
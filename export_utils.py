@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Machine-readable export of Solveighs DSO observation planning results
+#
+# Summary rows go to CSV or JSON Lines (chosen by the file extension),
+# altitude/azimuth tracks optionally go to a compressed npz archive.
+# Every object is written as soon as it has been evaluated, so nothing
+# has to be kept in memory for the export.
+#
+
+import csv
+import json
+import zipfile
+import numpy as np
+
+debug = False
+
+summary_fields = ["name", "identifier", "designations", "date", "max_alt", "max_alt_az", "max_alt_direction", "max_alt_time",
+                  "max_alt_total", "max_alt_total_direction", "visible",
+                  "moon_alt", "moon_direction", "moon_illumination", "moon_separation", "moon_score", "moon_top_score",
+                  "airmass", "sky_brightness", "score", "usable", "usable_hours", "rise_time", "transit_time", "set_time",
+                  "object_type", "magnitude", "major_axis", "minor_axis"]
+
+def _value(value):
+  # plain python values for csv/json
+  if value is None:
+    return None
+  if hasattr(value, "isoformat"):
+    return value.isoformat(sep=" ", timespec="minutes")
+  if isinstance(value, (np.floating, float)):
+    return round(float(value), 2)
+  if isinstance(value, np.integer):
+    return int(value)
+  if isinstance(value, np.bool_):
+    return bool(value)
+  return value
+
+def summary_row(dso):
+  row = dict(
+    name = dso.the_object_name,
+    identifier = dso.the_object_identifier,
+    designations = ",".join(getattr(dso, "designations", None) or []),
+    date = dso.theDate,
+    max_alt = dso.max_alt,
+    max_alt_az = dso.max_alt_az,
+    max_alt_direction = dso.max_alt_direction,
+    max_alt_time = dso.max_alt_time,
+    max_alt_total = dso.max_alt_during_night,
+    max_alt_total_direction = dso.max_alt_during_night_direction,
+    visible = dso.visible,
+    moon_alt = dso.moon_alt_at_max_alt,
+    moon_direction = dso.moon_dir_at_max_alt,
+    moon_illumination = dso.moon_phase_percent_at_max_alt,
+    moon_separation = getattr(dso, "moon_sep_at_max_alt", None),
+    moon_score = dso.score_at_max_alt,
+    moon_top_score = dso.top_score_at_max_alt,
+    airmass = getattr(dso, "airmass_at_max_alt", None),
+    sky_brightness = getattr(dso, "sky_brightness_at_max_alt", None),
+    score = getattr(dso, "observability", None),
+    usable = ";".join(start.strftime("%H:%M") + "-" + end.strftime("%H:%M") for start, end in (getattr(dso, "usable_windows", None) or [])),
+    usable_hours = getattr(dso, "usable_hours", None),
+    rise_time = getattr(dso, "rise_time", None),
+    transit_time = getattr(dso, "transit_time", None),
+    set_time = getattr(dso, "set_time", None),
+    object_type = getattr(dso, "object_type", None),
+    magnitude = getattr(dso, "magnitude", None),
+    major_axis = getattr(dso, "major_axis", None),
+    minor_axis = getattr(dso, "minor_axis", None)
+  )
+  for key in row:
+    row[key] = _value(row[key])
+  return row
+
+class ResultExporter:
+
+  def __init__(self, summary_file=None, tracks_file=None):
+    self.summary_file = summary_file
+    self.tracks_file = tracks_file
+    self.rows = 0
+    self.summary = None
+    self.csv_writer = None
+    self.tracks = None
+    self.hours_written = False
+
+    if summary_file:
+      self.summary = open(summary_file, "w", newline="", encoding="utf-8")
+      if not (summary_file.endswith(".jsonl") or summary_file.endswith(".json")):
+        self.csv_writer = csv.DictWriter(self.summary, fieldnames=summary_fields)
+        self.csv_writer.writeheader()
+    if tracks_file:
+      # npz is just a zip of npy files, so it can be filled member by member
+      self.tracks = zipfile.ZipFile(tracks_file, "w", compression=zipfile.ZIP_DEFLATED)
+
+  def write(self, dso):
+    if self.summary is not None:
+      row = summary_row(dso)
+      if self.csv_writer is not None:
+        self.csv_writer.writerow(row)
+      else:
+        self.summary.write(json.dumps(row) + "\n")
+      self.summary.flush()
+    if self.tracks is not None and dso.track_alt is not None:
+      if not self.hours_written:
+        # the time axis (hours from midnight) is the same for every object
+        self._write_array("hours", dso.track_hours)
+        self.hours_written = True
+      key = str(dso.the_object_name).replace(" ", "_") + "_" + str(dso.theDate_american)
+      self._write_array(key + "_alt", dso.track_alt)
+      self._write_array(key + "_az", dso.track_az)
+    self.rows += 1
+    if debug:
+      print("Exported " + str(dso.the_object_name) + " (" + str(self.rows) + ")")
+
+  def _write_array(self, name, values):
+    with self.tracks.open(name + ".npy", "w", force_zip64=True) as f:
+      np.lib.format.write_array(f, np.asarray(values, dtype=np.float32), allow_pickle=False)
+
+  def close(self):
+    if self.summary is not None:
+      self.summary.close()
+      self.summary = None
+      print("Exported " + str(self.rows) + " rows to " + str(self.summary_file))
+    if self.tracks is not None:
+      self.tracks.close()
+      self.tracks = None
+      print("Exported tracks to " + str(self.tracks_file))
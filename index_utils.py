@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Annual visibility index of Solveighs DSO observation planning
+#
+# For every night of a year and every object of a catalogue the index holds
+# the hours of astronomical darkness above a minimal altitude, the peak
+# altitude during darkness and the time of that peak. It is a memory-mappable
+# .npy file (nights x objects) plus a small json file with the object names
+# and a key of the inputs; it is only rebuilt when site, catalogue, year or
+# threshold change.
+#
+
+import os
+import json
+import hashlib
+import datetime
+import numpy as np
+import astropy.units as u
+from astropy.time import Time
+from astropy.coordinates import get_sun
+import sky_utils # own
+
+debug = False
+
+index_version = 2
+step_minutes = 10
+chunk_size = 50 # objects per vectorized step
+
+index_dtype = np.dtype([("dark_hours", np.float32), ("peak_alt", np.float32), ("peak_time", np.float32)])
+
+def index_key(site, catalogue, year, min_alt):
+  # catalogue: list of (name, identifier) or the content hash of a catalogue file
+  site_data = dict((k, site.get(k)) for k in ("latitude", "longitude", "elevation", "horizon", "horizon_file"))
+  data = json.dumps([index_version, step_minutes, site_data, catalogue, int(year), float(min_alt)], sort_keys=True, default=str)
+  return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+def index_file_name(base_dir, site, catalogue_name, year):
+  return os.path.join(base_dir, "index", "DSO_index_" + str(site["location"]) + "_" + str(catalogue_name) + "_" + str(year) + ".npy")
+
+def build_index(file_name, key, names, ra, dec, location, year, utcoffset_hours, min_alt=30, horizon=None):
+  # utcoffset_hours: per night (or one for all), peak times are local time around midnight
+  first_night = datetime.date(int(year), 1, 1)
+  nights = (datetime.date(int(year) + 1, 1, 1) - first_night).days
+  hours = np.arange(-12, 12, step_minutes / 60.0)
+  samples = len(hours)
+  ra = np.asarray(ra, dtype=float)
+  dec = np.asarray(dec, dtype=float)
+
+  # one time grid for the whole year: nights x samples around local midnight
+  midnights = Time((first_night + datetime.timedelta(days=1)).isoformat() + " 00:00:00") + np.arange(nights) * u.day - np.asarray(utcoffset_hours, dtype=float) * u.hour
+  times = (midnights[:, None] + hours[None, :] * u.hour).ravel()
+  engine = sky_utils.transform_engine(times, location)
+  sun = get_sun(times)
+  sun_alt, _ = sky_utils.fast_altaz(sun.ra.deg, sun.dec.deg, engine, per_sample=True)
+  dark = (sun_alt[0] < -18).reshape(nights, samples)
+  del sun, sun_alt
+
+  os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+  index = np.lib.format.open_memmap(file_name, mode="w+", dtype=index_dtype, shape=(nights, len(names)))
+  for start in range(0, len(names), chunk_size):
+    end = min(start + chunk_size, len(names))
+    alt, az = sky_utils.fast_altaz(ra[start:end], dec[start:end], engine)
+    free = sky_utils.above_horizon(alt, az, horizon).reshape(end - start, nights, samples) & dark[None, :, :]
+    alt = alt.reshape(end - start, nights, samples)
+    usable = free & (alt >= min_alt)
+    index["dark_hours"][:, start:end] = (np.count_nonzero(usable, axis=2) * step_minutes / 60.0).T
+    alt_dark = np.where(free, alt, -90.0)
+    peak = np.argmax(alt_dark, axis=2)
+    index["peak_alt"][:, start:end] = np.take_along_axis(alt_dark, peak[:, :, None], axis=2)[:, :, 0].T
+    index["peak_time"][:, start:end] = hours[peak].T
+    if debug:
+      print("Index: " + str(end) + " of " + str(len(names)) + " objects")
+  index.flush()
+  del index
+
+  with open(os.path.splitext(file_name)[0] + ".json", "w") as f:
+    json.dump(dict(key=key, year=int(year), first_night=first_night.isoformat(), min_alt=float(min_alt),
+                   step_minutes=step_minutes, names=list(names)), f)
+  return load_index(file_name, key)
+
+def load_index(file_name, key=None):
+  # None if missing or built from other inputs
+  meta_name = os.path.splitext(file_name)[0] + ".json"
+  if not os.path.isfile(file_name) or not os.path.isfile(meta_name):
+    return None
+  with open(meta_name) as f:
+    meta = json.load(f)
+  if key != None and meta.get("key") != key:
+    if debug:
+      print("Index " + str(file_name) + " is outdated")
+    return None
+  return VisibilityIndex(file_name, meta)
+
+class VisibilityIndex:
+
+  def __init__(self, file_name, meta):
+    self.file_name = file_name
+    self.meta = meta
+    self.names = meta["names"]
+    self.min_alt = meta["min_alt"]
+    self.columns = dict((name, i) for i, name in enumerate(self.names))
+    self.first_night = datetime.date.fromisoformat(meta["first_night"])
+    self.data = np.load(file_name, mmap_mode="r")
+
+  def night(self, day):
+    # all objects for the night starting at day: (objects,) record array
+    return self.data[(day - self.first_night).days]
+
+  def object(self, name):
+    # all nights of one object: (nights,) record array
+    return self.data[:, self.columns[name]]
+
+  def lookup(self, name, day):
+    return self.data[(day - self.first_night).days, self.columns[name]]
+
+  def best(self, day, count=None):
+    # names and records of the night, best placed (longest dark time above min_alt) first
+    row = self.night(day)
+    order = np.argsort(-row["dark_hours"], kind="stable")
+    order = order[row["dark_hours"][order] > 0]
+    if count != None:
+      order = order[:int(count)]
+    return [(self.names[i], row[i]) for i in order]
@@ -0,0 +1,1327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Importable planning API of Solveighs DSO observation planning
+#
+# plan_night() and best_dates() evaluate DSOs for a site and return the
+# results instead of printing a report. Nothing is kept in module globals:
+# site, local horizon, settings and the caches of a run (tracks, merged
+# designations, alias index) belong to a Planner, so planners for several
+# sites or dates can be used one after another or side by side in threads.
+# DSO_observation_planning.py is the command line front end of this module.
+#
+#   import planning
+#   plan = planning.plan_night("Windhoek", datetime.date(2025, 6, 1), "South", moon=True, top=10)
+#   for dso in plan["astronomical"]:
+#     print(dso.the_object_name, dso.max_alt, dso.max_alt_time)
+#
+
+import os
+import hashlib
+import datetime
+import heapq
+import threading
+import functools
+import dataclasses
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import AltAz, EarthLocation, SkyCoord
+from astropy.time import Time
+import pytz
+import config # own
+import sky_utils # own
+import catalogue_utils # own
+import index_utils # own
+import calendar_utils # own
+
+debug = False
+
+# built-in catalogues
+my_DSO_dict_messier = {"M1" : "M1", "M2" : "M2", "M3" : "M3", "M4" : "M4", "M5" : "M5", "M6" : "M6", "M7" : "M7", "M8" : "M8", "M9" : "M9", "M10" : "M10", 
+               "M11" : "M11", "M12" : "M12", "M13" : "M13", "M14" : "M14", "M15" : "M15", "M16" : "M16", "M17" : "M17", "M18" : "M18", 
+               "M19" : "M19", "M20" : "M20", "M21" : "M21", "M22" : "M22", "M23" : "M23", "M24" : "M24", "M25" : "M25", "M26" : "M26", 
+               "M27" : "M27", "M28" : "M28", "M29" : "M29", "M30" : "M30", "M31" : "M31", "M32" : "M32", "M33" : "M33", "M34" : "M34", 
+               "M35" : "M35", "M36" : "M36", "M37" : "M37", "M38" : "M38", "M39" : "M39", "M40" : "M40", "M41" : "M41", "M42" : "M42", 
+               "M43" : "M43", "M44" : "M44", "M45" : "M45", "M46" : "M46", "M47" : "M47", "M48" : "M48", "M49" : "M49", "M50" : "M50", 
+               "M51" : "M51", "M52" : "M52", "M53" : "M53", "M54" : "M54", "M55" : "M55", "M56" : "M56", "M57" : "M57", "M58" : "M58", 
+               "M59" : "M59", "M60" : "M60", "M61" : "M61", "M62" : "M62", "M63" : "M63", "M64" : "M64", "M65" : "M65", "M66" : "M66", 
+               "M67" : "M67", "M68" : "M68", "M69" : "M69", "M70" : "M70", "M71" : "M71", "M72" : "M72", "M73" : "M73", "M74" : "M74",
+               "M75" : "M75", "M76" : "M76", "M77" : "M77", "M78" : "M78", "M79" : "M79", "M80" : "M80", "M81" : "M81", "M82" : "M82",
+               "M83" : "M83", "M84" : "M84", "M85" : "M85", "M86" : "M86", "M87" : "M87", "M88" : "M88", "M89" : "M89", "M90" : "M90",
+               "M91" : "M91", "M92" : "M92", "M93" : "M93", "M94" : "M94", "M95" : "M95", "M96" : "M96", "M97" : "M97", "M98" : "M98", 
+               "M99" : "M99", "M100" : "M100", "M101" : "M101", "M102" : "M102", "M103" : "M103", "M104" : "M104", "M105" : "M105", 
+               "M106" : "M106", "M107" : "M107", "M108" : "M108", "M109" : "M109", "M110" : "M110"}
+
+my_DSO_dict_div = { "NGC7822" : "NGC7822", 
+               "SH2-173" : "SH2-173", "NGC210" : "NGC210", "IC63" : "IC63", "SH2-188" : "SH2-188", "NGC613" : "NGC613", 
+               "NGC660" : "NGC660", "NGC672" : "NGC672", "NGC918" : "NGC918", "IC1795" : "IC1795", "IC1805" : "IC1805", 
+               "NGC1055" : "NGC1055", "IC1848" : "IC1848", "SH2-200" : "SH2-200", "NGC1350" : "NGC1350", "NGC1499" : "NGC1499",
+               "LBN777" : "LBN777", "NGC1532" : "NGC1532", "LDN1495" : "LDN1495", "NGC1555" : "NGC1555", "NGC1530" : "NGC1530", 
+               "NGC1624" : "NGC1624", "NGC1664" : "NGC1664", "Melotte15" : "Melotte15", "vdb31" : "vdb31", "NGC1721" : "NGC1721",
+               "IC2118" : "IC2118", "IC410" : "IC410", "SH2-223" : "SH2-223", "SH2-224" : "SH2-224", "IC434" : "IC434", 
+               "SH2-240" : "SH2-240", "LDN1622" : "LDN1622", "SH2-261" : "SH2-261", "SH2-254" : "SH2-254", "NGC2202" : "NGC2202",
+               "IC443" : "IC443", "NGC2146" : "NGC2146", "NGC2217" : "NGC2217", "NGC2245" : "NGC2245", "SH2-308" : "SH2-308", 
+               "NGC2327" : "NGC2327", "SH2-301" : "SH2-301", "Abell21" : "Abell21", "NGC2835" : "NGC2835", "Abell33" : "Abell33", 
+               "NGC2976" : "NGC2976", "Arp316" : "Arp316", "NGC3359" : "NGC3359", "Arp214" : "Arp214", "NGC4395" : "NGC4395", 
+               "NGC4535" : "NGC4535", "Abell35" : "Abell35", "NGC5068" : "NGC5068", "NGC5297" : "NGC5297", "NGC5371" : "NGC5371", 
+               "NGC5364" : "NGC5364", "NGC5634" : "NGC5634", "NGC5701" : "NGC5701", "NGC5963" : "NGC5963", "NGC5982" : "NGC5982", 
+               "IC4592" : "IC4592", "IC4628" : "IC4628", "Barnard59" : "Barnard59", "SH2-003" : "SH2-003", "Barnard252" : "Barnard252",
+               "NGC6334" : "NGC6334", "NGC6357" : "NGC6357", "Barnard75" : "Barnard75", "NGC6384" : "NGC6384", "SH2-54" : "SH2-54", 
+               "vdb126" : "vdb126", "SH2-82" : "SH2-82", "NGC6820" : "NGC6820", "SH2-101" : "SH2-101", "WR134" : "WR134", 
+               "LBN331" : "LBN331", "LBN325" : "LBN325", "SH2-112" : "SH2-112", "SH2-115" : "SH2-115", "LBN468" : "LBN468", 
+               "IC5070" : "IC5070", "vdb141" : "vdb141", "SH2-114" : "SH2-114", "vdb152" : "vdb152", "SH2-132" : "SH2-132", 
+               "Arp319" : "Arp319", "NGC7497" : "NGC7497", "SH2-157" : "SH2-157", "NGC7606" : "NGC7606", "Abell85" : "Abell85", 
+               "LBN 564" : "LBN 564", "SH2-170" : "SH2-170", "LBN603" : "LBN603", "LBN639" : "LBN639", "LBN640" : "LBN640", 
+               "LDN1333" : "LDN1333", "NGC1097" : "NGC1097", "LBN762" : "LBN762", "SH2-202" : "SH2-202", "vdb14" : "vdb14", 
+               "vdb15" : "vdb15", "LDN1455" : "LDN1455", "vdb13" : "vdb13", "vdb16" : "vdb16", "IC348" : "IC348", "SH2-205" : "SH2-205",
+               "SH2-204" : "SH2-204", "Barnard208" : "Barnard208", "Barnard7" : "Barnard7", "vdb27" : "vdb27", "Barnard8" : "Barnard8",
+               "Barnard18" : "Barnard18", "SH2-216" : "SH2-216", "Abell7" : "Abell7", "SH2-263" : "SH2-263", "SH2-265" : "SH2-265",
+               "SH2-232" : "SH2-232", "Barnard35" : "Barnard35", "SH2-249" : "SH2-249", "IC447" : "IC447", "SH2-280" : "SH2-280",
+               "SH2-282" : "SH2-282", "SH2-304" : "SH2-304", "SH2-284" : "SH2-284", "LBN1036" : "LBN1036", "NGC2353" : "NGC2353",
+               "SH2-310" : "SH2-310", "SH2-302" : "SH2-302", "Gum14" : "Gum14", "Gum15" : "Gum15", "Gum17" : "Gum17", "Abell31" : "Abell31",
+               "SH2-1" : "SH2-1", "SH2-273" : "SH2-273", "SH2-46" : "SH2-46", "SH2-34" : "SH2-34", "IC4685" : "IC4685", "SH2-91" : "SH2-91",
+               "Barnard147" : "Barnard147", "IC1318" : "IC1318", "LBN380" : "LBN380", "Barnard150" : "Barnard150", "LBN552" : "LBN552",
+               "SH2-119" : "SH2-119", "SH2-124" : "SH2-124", "Barnard169" : "Barnard169", "LBN420" : "LBN420", "SH2-134" : "SH2-134",
+               "SH2-150" : "SH2-150", "LDN1251" : "LDN1251", "LBN438" : "LBN438", "SH2-154" : "SH2-154", "LDN1218" : "LDN1218", 
+               "SH2-160" : "SH2-160", "SH2-122" : "SH2-122", "LBN575" : "LBN575", "LDN1262" : "LDN1262", "LBN534" : "LBN534", 
+               "vdb158" : "vdb158", "NGC7380" : "NGC7380", "NGC6543" : "NGC6543", "NGC2264" : "NGC2264", "NGC474" : "NGC474",
+               "NGC246" : "NGC246", "NGC7479" : "NGC7479", "NGC7741" : "NGC7741", "IC5068" : "IC5068", "SH2-155" : "SH2-155", 
+               "NGC7008" : "NGC7008", "NGC4676A" : "NGC4676A", "NGC4536" : "NGC4536", "NGC2403" : "NGC2403", "IC11" : "IC11", 
+               "NGC2359" : "NGC2359", "IC5067" : "IC5067", "NGC281" : "NGC281", "IC44" : "IC44", "NGC6992" : "NGC6992", 
+               "NGC7293" : "NGC7293", "NGC6960" : "NGC6960", "IC4703" : "IC4703", "NGC6618" : "NGC6618", "UGC1810" : "UGC1810"}
+    
+# caldwell
+my_DSO_dict_caldwell = {"C1" : "NGC188", "C2" : "NGC40", "C3" : "NGC4236", "C4" : "NGC7023", "C5" : "IC342", "C6" : "NGC6543", "C7" : "NGC2403", 
+                        "C8" : "NGC559", "C9" : "SH2-155", "C10" : "NGC663", "C11" : "NGC7635", "C12" : "NGC6946", "C13" : "NGC457", 
+                        "C14" : "NGC869", "C15" : "NGC6826", "C16" : "NGC7243", "C17" : "NGC147", "C18" : "NGC185", "C19" : "IC5146", 
+                        "C20" : "NGC7000", "C21" : "NGC4449", "C22" : "NGC7662", "C23" : "NGC891", "C24" : "NGC1275", "C25" : "NGC2419", 
+                        "C26" : "NGC4244", "C27" : "NGC6888", "C28" : "NGC752", "C29" : "NGC5005", "C30" : "NGC7331", "C31" : "IC405", 
+                        "C32" : "NGC4631", "C33" : "NGC6992", "C34" : "NGC6960", "C35" : "NGC4889",
+                        "C36" : "NGC4559", "C37" : "NGC6885", "C38" : "NGC4546", "C39" : "NGC2392", "C40" : "NGC3626", "C41" : "HYADES",
+                        "C42" : "NGC7006", "C43" : "NGC7814", "C44" : "NGC7479", "C45" : "NGC5248", "C46" : "NGC2261", "C47" : "NGC6934",
+                        "C48" : "NGC2775", "C49" : "NGC2238", "C50" : "NGC2244", "C51" : "IC16", "C52" : "NGC4697", "C53" : "NGC3115",
+                        "C54" : "NGC2506", "C55" : "NGC7009", "C56" : "NGC246", "C57" : "NGC6822", "C58" : "NGC2360", "C59" : "NGC3242",
+                        "C60" : "NGC4038", "C61" : "NGC4039", "C62" : "NGC247", "C63" : "NGC7293", "C64" : "NGC2362", "C65" : "NGC253",
+                        "C66" : "NGC5694", "C67" : "NGC1097", "C68" : "NGC6729", "C69" : "NGC6302", "C70" : "NGC300"}
+
+# Solveigh's list of DSOs in southern hemisphere
+my_DSO_dict_southern_hemisphere = { "IC4406" : "IC4406", "IC4499" : "IC4499", "NGC104" : "NGC104", "NGC253" : "NGC253", "NGC346" : "NGC346",
+                                    "NGC1365" : "NGC1365", "NGC2070" : "NGC2070", "NGC2736" : "NGC2736", "NGC3132" : "NGC3132",
+                                    "NGC3293" : "NGC3293", "NGC3324" : "NGC3324", "NGC3372" : "NGC3372", "NGC3532" : "NGC3532",
+                                    "NGC3603" : "NGC3603", "NGC4372" : "NGC4372", "NGC4650" : "NGC4650", "NGC4755" : "NGC4755",
+                                    "NGC4945" : "NGC4945", "NGC5128" : "NGC5128", "NGC5139" : "NGC5139", "NGC5189" : "NGC5189",
+                                    "NGC5286" : "NGC5286", "NGC6300" : "NGC6300", "NGC6302" : "NGC6302", "NGC6334" : "NGC6334",
+                                    "NGC6337" : "NGC6337", "NGC6723" : "NGC6723", "NGC6744" : "NGC6744", "NGC6769" : "NGC6769",
+                                    "NGC6770" : "NGC6770", "NGC6771" : "NGC6771", "NGC6872" : "NGC6872" } #, "PN G329.0+01.9" : "PN G329.0+01.9",
+                                    #"SNR G263.9-03.3" : "SNR G263.9-03.3" }
+
+
+# planets, see sky_utils.body_track()
+my_DSO_dict_planets = {"Mercury" : "Mercury", "Venus" : "Venus", "Mars" : "Mars", "Jupiter" : "Jupiter",
+                       "Saturn" : "Saturn", "Uranus" : "Uranus", "Neptune" : "Neptune"}
+
+def catalogue_dict(catalogue, dso=None):
+  # {name : identifier} of a built-in catalogue (Messier, Caldwell, Others, South, Planets, All) or of one DSO
+  if dso != None:
+    dso_name = str(dso).upper()
+    return { dso_name : dso_name }
+  if str(catalogue) == "Caldwell":
+    return my_DSO_dict_caldwell
+  if str(catalogue) == "Others":
+    return my_DSO_dict_div
+  if str(catalogue) == "South":
+    return my_DSO_dict_southern_hemisphere
+  if str(catalogue) == "Planets":
+    solar_system = dict(my_DSO_dict_planets)
+    solar_system.update((name, name) for name in config.solar_system_targets)
+    return solar_system
+  if str(catalogue) == "All":
+    all_dsos = dict(my_DSO_dict_messier)
+    all_dsos.update(my_DSO_dict_caldwell)
+    all_dsos.update(my_DSO_dict_div)
+    return all_dsos
+  return my_DSO_dict_messier # default
+
+@dataclasses.dataclass
+class Settings:
+  # settings of a Planner, same names as the command line options
+  dso: str = None
+  catalogue: str = "Caldwell"
+  catalogue_file: str = None
+  chunk_size: int = 500
+  moon: bool = False
+  justthetopones: bool = False
+  direction: str = None
+  top: int = None
+  schedule: bool = False
+  min_block: int = 30
+  overhead: int = 10
+  min_alt: float = 30
+  darkness: str = "nautical"
+  engine: str = "fast"
+  backend: str = None
+  min_dark_hours: float = None
+  max_moon_illumination: float = 0.25
+  profile: str = None
+
+# sample times of a night in hours from midnight, shared by all DSOs
+delta_midnight_hours = np.linspace(-12, 12, 1000).astype(np.float32)
+
+def night_window(latitude, longitude, sun_alt=-6.0):
+  # sample times of delta_midnight_hours during the longest night of the year at
+  # the site (sun below sun_alt at the winter solstice), around local midnight:
+  # shifted by the time zone (UTC+1/2, see Planner.utcoffset()) and the equation of time
+  solstice = -23.44 if latitude >= 0 else 23.44
+  phi, delta = np.radians(latitude), np.radians(solstice)
+  cos_h = (np.sin(np.radians(sun_alt)) - np.sin(phi) * np.sin(delta)) / (np.cos(phi) * np.cos(delta))
+  if abs(cos_h) >= 1.0:
+    return delta_midnight_hours # polar day or night: the whole day
+  half_night = 12.0 - np.degrees(np.arccos(cos_h)) / 15.0
+  shift = max(abs(offset - longitude / 15.0) for offset in (1.0, 2.0)) + 0.3
+  return delta_midnight_hours[np.abs(delta_midnight_hours) <= min(12.0, half_night + shift)]
+
+def parse_date(the_date):
+  # dd.mm.yyyy or a date
+  if isinstance(the_date, str):
+    the_date = the_date.split(".")
+    return datetime.date(int(the_date[2]), int(the_date[1]), int(the_date[0]))
+  return the_date
+
+def site_configuration(site):
+  # config dict of a site, by name (Frankfurt, Windhoek) or as given
+  if isinstance(site, dict):
+    return site
+  if hasattr(config, "coordinates_" + str(site)):
+    return getattr(config, "coordinates_" + str(site))
+  return config.coordinates
+
+def is_summertime(dt, timeZone):
+   aware_dt = timeZone.localize(dt)
+   return aware_dt.dst() != datetime.timedelta(0,0)
+
+# Simbad and the alias index are the same for every planner, the lru caches
+# are shared by all of them (and safe to use from several threads)
+@functools.lru_cache(maxsize=None)
+def simbad_query(query):
+  # Simbad TAP result, asked only once per query and run
+  from astroquery.simbad import Simbad # https://github.com/astropy/astroquery, imported only when used
+  return Simbad.query_tap(query)
+
+@functools.lru_cache(maxsize=None)
+def sky_coordinates(dso_identifier):
+  # Simbad coordinates, asked only once per name and run
+  return SkyCoord.from_name(dso_identifier)
+
+# DSOs found by Simbad are appended to the first local catalogue, one thread at a time
+local_catalogue_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=8)
+def alias_index(file_names, chunk_size=500):
+  # offline name resolution from local catalogue files, built once per set of files
+  aliases = catalogue_utils.AliasIndex()
+  for file_name in file_names:
+    if not os.path.isfile(file_name):
+      continue
+    for records in catalogue_utils.iter_catalogue(file_name, int(chunk_size)):
+      for record in records:
+        aliases.add(record)
+  # Caldwell numbers are only known by the dict
+  for dso_name, dso_identifier in my_DSO_dict_caldwell.items():
+    aliases.add_alias(dso_name, dso_identifier)
+  if debug:
+    print("Alias index: " + str(len(aliases)) + " objects")
+  return aliases
+
+@functools.lru_cache(maxsize=8)
+def orbital_elements(comet_files, asteroid_files):
+  # comets and asteroids of the orbital elements files by designation and name
+  elements = catalogue_utils.AliasIndex()
+  for file_names, kind in ((comet_files, "comet"), (asteroid_files, "asteroid")):
+    for file_name in file_names:
+      if not os.path.isfile(file_name):
+        continue
+      for record in catalogue_utils.load_orbital_elements(file_name, kind):
+        elements.add(record)
+  return elements
+
+class DSOResult:
+  # Compact result of a DSO evaluation: the scalars used for sorting and the
+  # reports, plus optional float32 alt/az tracks for plots and export.
+  # Unset slots behave like missing attributes (see hasattr() in sort_DSOs).
+  __slots__ = ("the_object_name", "the_object_identifier", "theDate", "theDate_american", "today", "tomorrow",
+               "civil_night_start", "civil_night_end", "nautical_night_start", "nautical_night_end",
+               "astronomical_night_start", "astronomical_night_end",
+               "midnight", "ra", "dec", "object_type", "object_type_string", "magnitude", "major_axis", "minor_axis",
+               "max_alt", "max_alt_direction", "max_alt_az", "max_alt_time",
+               "max_alt_during_night", "max_alt_during_night_direction", "max_alt_during_night_obstime", "visible",
+               "score_at_max_alt", "top_score_at_max_alt", "sub_text_moon_at_max_alt",
+               "moon_dir_at_max_alt", "moon_alt_at_max_alt", "moon_phase_percent_at_max_alt",
+               "moon_az_at_max_alt", "moon_sep_at_max_alt", "moon_ok_at_max_alt", "airmass_at_max_alt", "sky_brightness_at_max_alt", "observability",
+               "usable_windows", "usable_hours", "rise_time", "set_time", "transit_time",
+               "designations", "track_hours", "track_alt", "track_az", "track_quality")
+
+  def without_tracks(self):
+    # copy with the scalars only, e.g. for checkpoints
+    result = DSOResult()
+    for field in DSOResult.__slots__:
+      if hasattr(self, field):
+        setattr(result, field, getattr(self, field))
+    result.track_hours, result.track_alt, result.track_az, result.track_quality = None, None, None, None
+    return result
+
+class DSO:
+
+  def __init__(self, planner, dso_name, dso_identifier, today, tomorrow, record=None, track=None):
+    # planner: site and settings of the run,
+    # record: catalogue entry with known coordinates (no Simbad lookup),
+    # track: precomputed (alt, az) arrays on the night grid (no transformation)
+    self.planner = planner
+    settings = planner.settings
+    utcoffset = planner.utcoffset(today)
+    self.the_object_name = str(dso_name).upper()
+    self.the_object_identifier = str(dso_identifier).upper() # e.g. M3, C19
+    self.theDate = today.strftime("%d.%m.%Y")
+    self.theDate_american = today.strftime("%Y-%m-%d")
+    self.today = today
+    self.tomorrow = tomorrow
+    self.tomorrow_american = tomorrow.strftime("%Y-%m-%d")
+
+    if debug:
+      print("Today: " + str(self.today))
+      print("Tomorrow: " + str(self.tomorrow))
+
+    self.civil_night_start, self.civil_night_end, self.nautical_night_start, self.nautical_night_end, self.astronomical_night_start, self.astronomical_night_end = planner.night_times(today)
+
+    if debug:
+      print("Latitude: " + str(planner.site["latitude"]))
+      print("Longitude: " + str(planner.site["longitude"]))
+      print("Elevation: " + str(planner.site["elevation"]))
+      print("Location: " + str(planner.site["location"]))
+      print("Nautical night start: " + str(self.nautical_night_start))
+      print("Nautical night end: " + str(self.nautical_night_end))
+      print("Astronomical night start: " + str(self.astronomical_night_start))
+      print("Astronomical night end: " + str(self.astronomical_night_end))
+
+    # planets, comets and asteroids move: their track comes from an ephemeris, see solar_system_track()
+    self.body = None
+    if record == None:
+      record = planner.solar_system_record(self.the_object_name)
+    if record == None:
+      record = planner.resolve_record(self.the_object_identifier)
+    if record == None and planner.embedded:
+      raise LookupError(str(self.the_object_identifier) + " is not in the local catalogues " + ", ".join(config.catalogue_files) + ", no Simbad lookup with --profile embedded")
+    if record == None:
+      self.simbad_lookup()
+      if self.object_type != "NONE":
+        planner.remember_record(self.local_record())
+    else:
+      self.catalogue_lookup(record)
+
+    if self.object_type == "AGN":
+      self.object_type_string = "Active galaxy nucleus"
+    elif self.object_type == "SNR":
+      self.object_type_string = "SuperNova remnant"
+    elif self.object_type == "SFR":
+      self.object_type_string = "Star forming region"
+    elif self.object_type == "SFR":
+      self.object_type_string = "Star forming region"
+    elif self.object_type == "GNe":
+      self.object_type_string = "Nebula"
+    elif self.object_type == "RNe":
+      self.object_type_string = "Reflection nebula"
+    elif self.object_type == "GDNe":
+      self.object_type_string = "Dark cloud (nebula)"
+    elif self.object_type == "MoC":
+      self.object_type_string = "Molecular cloud"
+    elif self.object_type == "IG":
+      self.object_type_string = "Interacting galaxies"
+    elif self.object_type == "PaG":
+      self.object_type_string = "Pair of galaxies"
+    elif self.object_type == "GiP":
+      self.object_type_string = "Galaxy in pair of galaxies"
+    elif self.object_type == "CGG":
+      self.object_type_string = "Compact group of galaxies"
+    elif self.object_type == "CIG":
+      self.object_type_string = "Cluster of galaxies"
+    elif self.object_type == "BH":
+      self.object_type_string = "Black hole"
+    elif self.object_type == "LSB":
+      self.object_type_string = "Low surface brightness galaxy"
+    elif self.object_type == "SBG":
+      self.object_type_string = "Starburst galaxy"
+    elif self.object_type == "H2G":
+      self.object_type_string = "HII galaxy"
+    elif self.object_type == "GGG":
+      self.object_type_string = "Galaxy"
+    elif self.object_type == "Cl":
+      self.object_type_string = "Cluster of stars"
+    elif self.object_type == "GlC":
+      self.object_type_string = "Globular cluster"
+    elif self.object_type == "OpC":
+      self.object_type_string = "Open cluster"
+    elif self.object_type == "Cl*":
+      self.object_type_string = "Open cluster"
+    elif self.object_type == "LIN":
+      self.object_type_string = "LINER-type active galaxy nucleus"
+    elif self.object_type == "SyG":
+      self.object_type_string = "Seyfert galaxy"
+    elif self.object_type == "Sy1":
+      self.object_type_string = "Seyfert 1 galaxy"
+    elif self.object_type == "Sy2":
+      self.object_type_string = "Seyfert 2 galaxy"
+    elif self.object_type == "GiG":
+      self.object_type_string = "Galaxy towards a group of galaxies"
+    elif self.object_type == "As*":
+      self.object_type_string = "Association of stars"
+    elif self.object_type == "PN":
+      self.object_type_string = "Planetary nebula"
+    elif self.object_type == "Planet":
+      self.object_type_string = "Planet"
+    elif self.object_type == "Comet":
+      self.object_type_string = "Comet"
+    elif self.object_type == "Asteroid":
+      self.object_type_string = "Minor planet"
+    else:
+      self.object_type_string = ""
+
+    if debug and self.body == None:
+      # direction at midnight, for information only
+      time = Time(str(self.theDate_american) + " 23:59:00") - utcoffset
+      print("Observation time: " + str(time))
+
+      ##############################################################################
+      # `astropy.coordinates.EarthLocation.get_site_names` and
+      # `~astropy.coordinates.EarthLocation.get_site_names` can be used to get
+      # locations of major observatories.
+      #
+      # Use `astropy.coordinates` to find the Alt, Az coordinates of the DSO at as
+      # observed from the current location today
+      the_object_altaz = self.the_object.transform_to(AltAz(obstime=time, location=planner.location))
+      to_alt = the_object_altaz.alt
+      to_az = the_object_altaz.az
+      print(str(self.the_object_name) + "'s altitude = " + str(to_alt) + ", azimut = " + str(to_az))
+      direction = sky_utils.compass_direction(to_az.value)
+      print("Dir@: " + str(time) + ": " + str(direction))
+
+    ##############################################################################
+    # This is helpful since it turns out M33 is barely above the horizon at this
+    # time. It's more informative to find M33's airmass over the course of
+    # the night.
+    #
+    # Find the alt,az coordinates of the object at 100 times evenly spaced between 10pm
+    # and 7am EDT:
+    # +1: otherwise the dso graph does not match the x-axis ticks
+    self.midnight = Time(str(self.tomorrow_american) + " 00:00:00") - utcoffset
+    #self.delta_midnight = np.linspace(-2, 10, 100) * u.hour
+    self.delta_midnight = planner.sample_hours * u.hour
+    # sun and moon (and the transform engine) are shared by all DSOs of this night
+    self.night = planner.night_at(self.midnight)
+
+    ##############################################################################
+    # convert alt, az to airmass with `~astropy.coordinates.AltAz.secz` attribute:
+    #the_objectairmasss_night = the_objectaltazs_night.secz
+    ##############################################################################
+    # Plot the airmass as a function of time:
+    '''
+      plt.plot(delta_midnight, the_objectairmasss_night)
+      plt.xlim(-2, 10)
+      plt.ylim(1, 4)
+      plt.xlabel("Hours from EDT Midnight")
+      plt.ylabel("Airmass [Sec(z)]")
+      plt.show()
+    '''
+
+    # The full alt/az track is only kept as a local: once the scalars are
+    # derived it is dropped, result() hands out float32 copies on request.
+    track_key = (planner.site["location"], self.theDate, self.the_object_name)
+    if track == None and track_key in planner.track_cache:
+      track = planner.track_cache[track_key]
+    if self.body != None:
+      self.solar_system_track()
+    elif track != None:
+      self.track_alt, self.track_az = track
+    elif settings.engine == "fast":
+      alt, az = sky_utils.fast_altaz(self.the_object.ra.deg, self.the_object.dec.deg, self.night["engine"])
+      self.track_alt, self.track_az = alt[0], az[0]
+    elif settings.engine != "astropy":
+      alt, az = planner.ephemeris_backend(settings.engine).target_altaz(self.the_object.ra.deg, self.the_object.dec.deg, self.night["times"].utc.jd)
+      self.track_alt, self.track_az = alt[0].astype(np.float32), az[0].astype(np.float32)
+    else:
+      frame_over_night = AltAz(obstime=self.night["times"], location=planner.location)
+      the_objectaltazs_over_night = self.the_object.transform_to(frame_over_night)
+      self.track_alt = the_objectaltazs_over_night.alt.value.astype(np.float32)
+      self.track_az = the_objectaltazs_over_night.az.value.astype(np.float32)
+      del the_objectaltazs_over_night, frame_over_night
+
+    self.visible = False
+    self.max_alt, self.max_alt_direction, self.max_alt_az, self.max_alt_time, self.max_alt_during_night, self.max_alt_during_night_direction, self.max_alt_during_night_obstime, self.visible, self.max_alt_index = self.max_altitudes(self.night, self.track_alt, self.track_az)
+
+    self.usable_windows, self.usable_hours, self.rise_time, self.set_time, self.transit_time = self.visibility_windows(self.night, self.track_alt, self.track_az)
+
+    # numeric scores (altitude, airmass, moon, darkness) for every sample of the night
+    scores = sky_utils.observability_scores(self.track_alt, self.track_az, self.night, horizon=planner.horizon, zenith_brightness=planner.site.get("sky_brightness", sky_utils.dark_sky_brightness))
+    self.track_quality = scores["score"]
+    self.score_at_max_alt, self.top_score_at_max_alt, self.sub_text_moon_at_max_alt, self.moon_dir_at_max_alt, self.moon_alt_at_max_alt, self.moon_phase_percent_at_max_alt = self.moon_check_at_max_alt(scores)
+
+  def simbad_lookup(self):
+    ##############################################################################
+    # `astropy.coordinates.SkyCoord.from_name` uses Simbad to resolve object
+    # names and retrieve coordinates.
+    #
+    # Get the coordinates of the desired DSO:
+    self.the_object = sky_coordinates(self.the_object_name)
+    if debug:
+      print("SkyCoord: " + str(self.the_object))
+      #print(self.the_object.ra)
+
+    # http://vizier.u-strasbg.fr/cgi-bin/OType?$1
+    result_table = ""
+    try:
+      # SELECT a.main_id, a.otype, b.B, b.V FROM basic AS a JOIN allfluxes AS b ON oidref = oid WHERE a.main_id='m13';
+      #query = "SELECT main_id, otype FROM basic WHERE main_id IN ('" + str(self.the_object_name) + "')")
+      query = "SELECT a.main_id, a.otype, b.B, b.V FROM basic AS a JOIN allfluxes AS b ON oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
+      query = "SELECT a.main_id, a.otype, b.B, b.V, galdim_minaxis, galdim_majaxis FROM basic AS a JOIN allfluxes AS b ON b.oidref = oid JOIN ident AS c ON c.oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
+      result_table = simbad_query(query)
+    except Exception as e:
+      print("Simbad lookup error for " + str(self.the_object_name) + ": " + str(e))
+      #result_table = Simbad.query_tap("SELECT main_id, otype FROM basic WHERE main_id IN ('" + str(self.the_object_name) + "')")
+      query = "SELECT a.main_id, a.otype, b.B, b.V FROM basic AS a JOIN allfluxes AS b ON oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
+      query = "SELECT a.main_id, a.otype, b.B, b.V, galdim_minaxis, galdim_majaxis FROM basic AS a JOIN allfluxes AS b ON b.oidref = oid JOIN ident AS c ON c.oidref = oid WHERE a.main_id='" + str(self.the_object_name) + "';"
+      result_table = simbad_query(query)
+    if debug:
+      print(result_table)
+      print("Main id: " + str(result_table["main_id"]) + "; " + str(len(result_table["main_id"].pformat())))
+    if len(result_table["main_id"].pformat()) == 2:
+      if debug:
+        print("DSO " + str(self.the_object_name) + " not found.")
+      #sys.exit(0)
+      self.object_type = "NONE"
+    else:
+
+      if debug:
+        print("Query result length: " + str(len(result_table["main_id"].pformat())))
+        print(str(result_table["main_id"].pformat()))
+        print(str(result_table["V"].pformat()))
+        print(str(result_table["galdim_majaxis"].pformat()))
+        #print(str(result_table["K"].pformat()))
+
+      if len(result_table["main_id"].pformat()) > 0:
+        otype = result_table["otype"].pformat()[2].strip()
+        if otype != "--":
+          self.object_type = otype
+        if debug:
+          print("Main ID: " + str(result_table["main_id"].pformat()[0].strip())) #Main ID: main_id
+          print("Main ID: " + str(result_table["main_id"].pformat()[1].strip())) #Main ID: -------
+          print("Main ID: " + str(result_table["main_id"].pformat()[2].strip())) #Main ID: M   1
+          '''
+          main_id otype         B                 V         galdim_minaxis galdim_majaxis
+                                                              arcmin         arcmin
+          ------- ----- ----------------- ----------------- -------------- --------------
+          M  31   AGN 4.360000133514404 3.440000057220459          70.79         199.53
+          '''
+          print("Brightness B: " + str(result_table["B"].pformat()[2].strip()) + " V: " + str(result_table["V"].pformat()[2].strip()))
+          print("Size: " + str(result_table["galdim_majaxis"].pformat()[2].strip()) + " x " + str(result_table["galdim_minaxis"].pformat()[2].strip()))
+          print("Object type: " + str(self.object_type))
+
+        mag = result_table["V"].pformat()[2].strip()
+        if mag != "--":
+          self.magnitude = float(mag)
+        else:
+          self.magnitude = -1.0
+        majax = result_table["galdim_majaxis"].pformat()[2].strip()  # arcmin
+        if majax != "--":
+          self.major_axis = float(majax)
+        else:
+          self.major_axis = -1.0
+        minax = result_table["galdim_minaxis"].pformat()[2].strip()  # arcmin
+        if minax != "--":
+          self.minor_axis = float(minax)
+        else:
+          self.minor_axis = -1.0
+      else:
+        self.object_type = ""
+        self.magnitude = -1.0
+        self.major_axis = -1.0
+        self.minor_axis = -1.0
+        self.visible = False
+        self.object_type_string = ""
+
+  def local_record(self):
+    # catalogue record of a DSO found by Simbad, see Planner.remember_record()
+    aliases = [self.the_object_name] if self.the_object_name != self.the_object_identifier else []
+    return dict(name=self.the_object_identifier, ra=self.the_object.ra.deg, dec=self.the_object.dec.deg, object_type=self.object_type,
+                magnitude=getattr(self, "magnitude", -1.0), major_axis=getattr(self, "major_axis", -1.0), minor_axis=getattr(self, "minor_axis", -1.0), aliases=aliases)
+
+  def catalogue_lookup(self, record):
+    # coordinates and object data from a local catalogue, solar system
+    # bodies get their coordinates with the track
+    self.body = record.get("body")
+    if self.body == None:
+      self.the_object = SkyCoord(ra=record["ra"] * u.deg, dec=record["dec"] * u.deg)
+    self.object_type = record.get("object_type", "")
+    self.magnitude = record.get("magnitude", -1.0)
+    self.major_axis = record.get("major_axis", -1.0)
+    self.minor_axis = record.get("minor_axis", -1.0)
+    if debug:
+      print("Catalogue: " + str(self.the_object_name) + " " + str(getattr(self, "the_object", "")) + " " + str(self.object_type))
+
+  def solar_system_track(self):
+    # one ephemeris call for the whole night grid, coordinates at midnight
+    alt, az, ra, dec = sky_utils.body_track(self.body, self.night, self.planner.location)
+    self.track_alt, self.track_az = alt, az
+    self.the_object = SkyCoord(ra=ra[len(ra) // 2] * u.deg, dec=dec[len(dec) // 2] * u.deg)
+    if debug:
+      print("Solar system body " + str(self.the_object_name) + " at midnight: " + str(self.the_object))
+
+  def result(self, keep_tracks=False):
+    # slim record of the scores, the astropy objects stay behind
+    result = DSOResult()
+    for field in DSOResult.__slots__:
+      if field in ("designations", "track_hours", "track_alt", "track_az", "track_quality"):
+        continue
+      if hasattr(self, field):
+        setattr(result, field, getattr(self, field))
+    result.ra = self.the_object.ra.deg
+    result.dec = self.the_object.dec.deg
+    result.designations = self.planner.designations.get(self.the_object_identifier) or self.planner.designations.get(self.the_object_name, [])
+    result.track_hours = self.planner.sample_hours
+    result.track_alt = None
+    result.track_az = None
+    result.track_quality = None
+    if keep_tracks:
+      result.track_alt = self.track_alt
+      result.track_az = self.track_az
+      result.track_quality = self.track_quality
+    return result
+
+  def visibility_windows(self, night, alt, az):
+    # dark windows above --min_alt, rise/set at the local horizon around the transit
+    max_sun_alt = -18 if self.planner.settings.darkness == "astronomical" else -12
+    windows = sky_utils.visibility_windows(alt[None, :], az[None, :], night, float(self.planner.settings.min_alt), max_sun_alt, self.planner.horizon)
+    obstimes = night["datetimes"]
+    usable_windows = [(obstimes[start], obstimes[end - 1]) for start, end in zip(windows["starts"], windows["ends"])]
+    usable_hours = float(np.sum(windows["ends"] - windows["starts"])) * float(night["hours"][1] - night["hours"][0])
+    transit = windows["transit"][0]
+    rises = windows["rises"][windows["rises"] <= transit]
+    sets = windows["sets"][windows["sets"] > transit]
+    rise_time = obstimes[rises[-1]] if len(rises) > 0 else None
+    set_time = obstimes[sets[0]] if len(sets) > 0 else None
+    if debug:
+      print("Usable: " + str(usable_windows) + ", rise " + str(rise_time) + ", transit " + str(obstimes[transit]) + ", set " + str(set_time))
+    return usable_windows, usable_hours, rise_time, set_time, obstimes[transit]
+
+  def max_altitudes(self, night, alt, az):
+    try:
+      if debug:
+        print("Check object alt az during night time")
+        print("Astro night: " + str(self.astronomical_night_start) + "  " + str(self.astronomical_night_end))
+        print("Nautical night: " + str(self.nautical_night_start) + "  " + str(self.nautical_night_end))
+      obstimes = night["datetimes"]
+      #in_the_dark = (self.astronomical_night_start < obstimes) & (obstimes < self.astronomical_night_end)
+      in_the_dark = (self.nautical_night_start < obstimes) & (obstimes < self.nautical_night_end)
+      # not hidden by trees and buildings of the site
+      free = sky_utils.above_horizon(alt, az, self.planner.horizon)
+
+      if debug:
+        print(len(alt))
+        print(np.count_nonzero(in_the_dark))
+
+      if in_the_dark.any():
+        # culmination as seen from the site: highest unobstructed sample, if any
+        if (in_the_dark & free).any():
+          index_alt_max = int(np.argmax(np.where(in_the_dark & free, alt, -np.inf)))
+        else:
+          index_alt_max = int(np.argmax(np.where(in_the_dark, alt, -np.inf)))
+        dso_in_the_dark_alt_max = float(alt[index_alt_max])
+        if debug:
+          print("max: " + str(dso_in_the_dark_alt_max) + " at " + str(obstimes[index_alt_max]))
+
+        # check whether object is visible during the night
+        if np.count_nonzero(in_the_dark & free) > 30:
+          visible = True # DSO is visible for at least 30 minutes during the night time
+        else:
+          visible = False
+
+        dso_in_the_dark_alt_max_az = float(az[index_alt_max])
+        direction_max_alt = sky_utils.compass_direction(dso_in_the_dark_alt_max_az)
+        if debug:
+          print("DSO night max alt direction: " + str(direction_max_alt))
+
+        # Direction of total max. altitude
+        index_alt_max_total = int(np.argmax(alt))
+        alt_max_total = float(alt[index_alt_max_total])
+        direction_max_alt_total = sky_utils.compass_direction(float(az[index_alt_max_total]))
+
+        alt_max_total_obstime = obstimes[index_alt_max] #frame_over_night.obstime[index_alt_max_total]
+        max_alt_txt = "Max. Alt. " + str(round(alt_max_total,2)) + "deg at: " + str(alt_max_total_obstime) + " in " + str(direction_max_alt_total)
+        if debug:
+          print(max_alt_txt)
+      else:
+        return -1, -1, -1, -1, -1, -1, -1, False, -1
+      return dso_in_the_dark_alt_max, direction_max_alt, dso_in_the_dark_alt_max_az, obstimes[index_alt_max], alt_max_total, direction_max_alt_total, alt_max_total_obstime, visible, index_alt_max
+    except Exception as e:
+      print(str(e))
+
+
+  def moon_check_at_max_alt(self, scores):
+    # moon suitability at the time of max. altitude, taken from the numeric scores
+    score = False
+    top_score = False
+    sub_text = "    "
+
+    try:
+      i = self.max_alt_index
+      moon_alt = float(scores["moon_alt"][i])
+      moon_az = float(self.night["moon_az"][i])
+      moon_phase_percent = round(100.0 * float(scores["illumination"][i]), 2)
+      self.moon_az_at_max_alt = moon_az
+      self.moon_sep_at_max_alt = float(scores["moon_separation"][i])
+      self.airmass_at_max_alt = float(scores["airmass"][i])
+      self.sky_brightness_at_max_alt = float(scores["sky_brightness"][i])
+      self.observability = float(scores["score"].max())
+      moon_dir = sky_utils.compass_direction(moon_az)
+      if debug:
+        print("  Moon alt " + str(round(moon_alt,1)) + " az " + str(round(moon_az,1)) + " dir " + str(moon_dir) + " (" + str(moon_phase_percent) + " %)")
+        print("  Moon separation " + str(round(self.moon_sep_at_max_alt,1)) + ", airmass " + str(round(self.airmass_at_max_alt,2)) + ", score " + str(round(self.observability,3)))
+
+      self.moon_ok_at_max_alt = moon_alt < 0 or self.moon_sep_at_max_alt >= sky_utils.moon_min_separation
+      if moon_alt < 0:
+        msg = "TOP: Moon < the horizon at " + str(self.max_alt_time.strftime("%d.%m. %H:%M"))
+        if debug:
+          print(msg)
+        score = True
+        top_score = True
+        sub_text += "\n    " + msg
+      if self.moon_sep_at_max_alt >= sky_utils.moon_min_separation:
+        msg = "OK: Moon " + str(round(self.moon_sep_at_max_alt,0)) + "deg away, dir moon: " + str(moon_dir) + " (" + str(round(moon_az,0)) + ", alt " + " (" + str(round(moon_alt,0)) + ") " + ", DSO: " + str(self.max_alt_direction) + " (" + str(round(self.max_alt_az,0)) + ")"
+        if debug:
+          print(msg)
+        score = True
+        sub_text += "\n    " + msg
+      if moon_phase_percent < 50:
+        msg = "Nice: Moon illumination < 50 %: " + str(moon_phase_percent) + " %"
+        if debug:
+          print(msg)
+        score = True
+        sub_text += "\n    " + msg
+      return score, top_score, sub_text, moon_dir, round(moon_alt,0), moon_phase_percent
+    except Exception as e:
+      print("Moon check error: " + str(e))
+
+
+merge_tolerance_arcmin = 2.0
+schedule_slot_minutes = 5
+
+class Planner:
+  # Site and settings of a run. All computations take the site, its horizon
+  # and the settings from here, results go back to the caller.
+
+  def __init__(self, site=None, settings=None, **kwargs):
+    # site: name of a config site or a config dict, settings: Settings, dict or
+    # the command line options (names which are no Settings are ignored),
+    # kwargs: single settings
+    values = {}
+    if settings != None:
+      if isinstance(settings, Settings):
+        values = dataclasses.asdict(settings)
+      else:
+        values = settings if isinstance(settings, dict) else vars(settings)
+    names = set(field.name for field in dataclasses.fields(Settings))
+    values = dict((name, value) for name, value in values.items() if name in names)
+    values.update(kwargs)
+    self.settings = Settings(**values)
+    self.site = site_configuration(site)
+    self.horizon = config.site_horizon(self.site)
+    self.location = EarthLocation(lat=self.site["latitude"], lon=self.site["longitude"], height=self.site["elevation"])
+    self.timezone = pytz.timezone(self.site["timezone"])
+    # precomputed (alt, az) tracks by (site, date, DSO), may be shared by several planners
+    self.track_cache = {}
+    # all names of the DSOs merged from several catalogues, see merge_catalogues()
+    self.designations = {}
+    # (names, catalogue_utils.SkyIndex) by catalogue contents, see sky_index()
+    self.sky_indexes = {}
+    # calendar_utils.DarkCalendar by year, see dark_calendar()
+    self.calendars = {}
+    # (name, date, error) of the evaluations that failed, see evaluate_isolated()
+    self.failures = []
+    # twilight times by night, see night_times()
+    self.twilight_times = {}
+    # --profile embedded: packaged catalogue only, sun and moon from pyephem, no IERS
+    # tables and only the samples of the night, see night_window()
+    self.embedded = self.settings.profile == "embedded"
+    if self.embedded and not self.settings.backend:
+      self.settings.backend = "ephem"
+    self.sample_hours = night_window(self.site["latitude"], self.site["longitude"]) if self.embedded else delta_midnight_hours
+
+  def utcoffset(self, day=None):
+    # MEZ assumed (UTC+1/2), at noon of the day or now
+    if day == None:
+      now = datetime.datetime.now()
+    else:
+      now = datetime.datetime.combine(day, datetime.time(12))
+    if is_summertime(now, self.timezone):
+      return +2 * u.hour  # +2 summertime, +1 wintertime
+    return +1 * u.hour
+
+  def midnight(self, day):
+    # local midnight after the evening of day
+    return Time((day + datetime.timedelta(days=1)).strftime("%Y-%m-%d") + " 00:00:00") - self.utcoffset(day)
+
+  def ephemeris_backend(self, name):
+    # None: astropy positions and ephem twilight times as before
+    if not name:
+      return None
+    return sky_utils.get_backend(name, self.site["latitude"], self.site["longitude"], self.site["elevation"])
+
+  def night_times(self, day):
+    # civil, nautical and astronomical night (start, end) of the night starting at day as
+    # naive UTC datetimes with and without --backend, once per day; without astronomical
+    # night its times are the nautical ones
+    if day not in self.twilight_times:
+      if self.settings.backend:
+        times = list(sky_utils.night_times(self.ephemeris_backend(self.settings.backend), day))
+      else:
+        times = list(sky_utils.astro_night_times(day.strftime("%d.%m.%Y"), self.site["latitude"], self.site["longitude"], debug))
+      if times[4] == None and times[5] == None:
+        times[4], times[5] = times[2], times[3]
+      self.twilight_times[day] = tuple(times)
+    return self.twilight_times[day]
+
+  def night(self, day):
+    # sun, moon and transform engine of the night starting at day
+    return self.night_at(self.midnight(day))
+
+  def night_at(self, midnight):
+    # sun, moon and transform engine of the night around midnight (Time) on the sample grid of the planner
+    return sky_utils.night_ephemeris(midnight, self.sample_hours, self.location, self.ephemeris_backend(self.settings.backend), ut1=not self.embedded)
+
+  def targets_altaz(self, ra, dec, night):
+    # (N, T) float32 alt/az tracks of many objects over the night with the selected engine
+    if self.settings.engine == "fast":
+      return sky_utils.fast_altaz(ra, dec, night["engine"])
+    if self.settings.engine != "astropy":
+      alt, az = self.ephemeris_backend(self.settings.engine).target_altaz(ra, dec, night["times"].utc.jd)
+      return alt.astype(np.float32), az.astype(np.float32)
+    coords = SkyCoord(ra=np.asarray(ra) * u.deg, dec=np.asarray(dec) * u.deg)
+    altaz = coords[:, None].transform_to(AltAz(obstime=night["times"][None, :], location=self.location))
+    return altaz.alt.deg.astype(np.float32), altaz.az.deg.astype(np.float32)
+
+  def evaluate(self, dso_name, dso_identifier, day, record=None, track=None, keep_tracks=False):
+    # DSOResult of one object for the night starting at day
+    return DSO(self, dso_name, dso_identifier, day, day + datetime.timedelta(days=1), record=record, track=track).result(keep_tracks=keep_tracks)
+
+  def evaluate_isolated(self, dso_name, dso_identifier, day, checkpoint=None, **kwargs):
+    # evaluate() that does not stop the run: a failing object (e.g. a Simbad timeout)
+    # is reported, remembered and None is returned. With a checkpoint_utils.Checkpoint
+    # finished objects are taken from it (it keeps the scalars only, the tracks are
+    # computed again from the position if needed) and new results and failures go into it.
+    item = (str(dso_identifier).upper(), day.isoformat())
+    if checkpoint != None:
+      dso = checkpoint.result(item)
+      if dso != None and kwargs.get("keep_tracks"):
+        dso = self.restore_tracks(dso, day, kwargs.get("track"))
+      if dso != None:
+        return dso
+    try:
+      dso = self.evaluate(dso_name, dso_identifier, day, **kwargs)
+    except Exception as e:
+      print("DSO evaluation error " + str(dso_name) + " " + day.strftime("%d.%m.%Y") + ": " + str(e))
+      self.failures.append((str(dso_name), day, str(e)))
+      if checkpoint != None:
+        checkpoint.fail(item, e)
+      return None
+    if checkpoint != None:
+      checkpoint.add(item, dso.without_tracks())
+    return dso
+
+  def restore_tracks(self, dso, day, track=None):
+    # copy of a DSOResult of the checkpoint with the tracks of the night starting at day,
+    # the same as evaluate() computes them; None for moving objects, they are evaluated again
+    if dso.object_type in ("Planet", "Comet", "Asteroid"):
+      return None
+    track_key = (self.site["location"], day.strftime("%d.%m.%Y"), dso.the_object_name)
+    if track == None:
+      track = self.track_cache.get(track_key)
+    night = self.night(day)
+    if track == None:
+      alt, az = self.targets_altaz([dso.ra], [dso.dec], night)
+      track = (alt[0], az[0])
+    scores = sky_utils.observability_scores(track[0], track[1], night, horizon=self.horizon, zenith_brightness=self.site.get("sky_brightness", sky_utils.dark_sky_brightness))
+    result = dso.without_tracks()
+    result.track_hours = self.sample_hours
+    result.track_alt, result.track_az = track
+    result.track_quality = scores["score"]
+    return result
+
+  def evaluate_catalogue_file(self, file_name, today, keep_tracks=False, checkpoint=None):
+    # Stream a large catalogue in chunks: one vectorized transformation per chunk,
+    # a cheap prefilter on the arrays and full DSO evaluation only for the objects
+    # that can be seen at all. Only DSOs passing the filters are yielded.
+    night = self.night(today)
+    dark = night["sun_alt"] < -12
+    checked, passed = 0, 0
+    for records in catalogue_utils.iter_catalogue(file_name, int(self.settings.chunk_size)):
+      alt, az = self.targets_altaz([r["ra"] for r in records], [r["dec"] for r in records], night)
+      # at least 30 samples above the horizon during the night, see DSO.max_altitudes()
+      candidates = np.flatnonzero(np.count_nonzero(sky_utils.above_horizon(alt, az, self.horizon) & dark, axis=1) > 30)
+      for i in candidates:
+        record = records[i]
+        dso = self.evaluate_isolated(record["name"], record["name"], today, checkpoint, record=record, track=(alt[i], az[i]), keep_tracks=keep_tracks)
+        if dso == None:
+          continue
+        if dso.max_alt > 0 and dso.visible and self.dso_filter(dso):
+          passed += 1
+          yield dso
+      checked += len(records)
+      if debug:
+        print("Checked " + str(checked) + " catalogue objects, " + str(passed) + " passed")
+
+  def catalogue(self, catalogue=None):
+    # {name : identifier} of the selected catalogue, "All" merged by position
+    if catalogue == None:
+      catalogue = self.settings.catalogue
+    if not isinstance(catalogue, str):
+      return catalogue
+    dsos = catalogue_dict(catalogue, self.settings.dso)
+    self.designations = {}
+    if catalogue == "All" and self.settings.dso == None:
+      dsos, self.designations = self.merge_catalogues([my_DSO_dict_messier, my_DSO_dict_caldwell, my_DSO_dict_div])
+    return dsos
+
+  def catalogue_coordinates(self, catalogue=None):
+    # names, ra, dec (deg) of the selected catalogue
+    names, ra, dec = [], [], []
+    if self.settings.catalogue_file != None and self.settings.dso == None:
+      for records in catalogue_utils.iter_catalogue(self.settings.catalogue_file, int(self.settings.chunk_size)):
+        for record in records:
+          names.append(record["name"])
+          ra.append(record["ra"])
+          dec.append(record["dec"])
+    else:
+      missing = []
+      for dso_name, dso_identifier in self.catalogue(catalogue).items():
+        position = self.object_position(dso_identifier)
+        if position == None:
+          if self.embedded and self.solar_system_record(dso_identifier) == None:
+            missing.append(str(dso_name))
+          continue
+        names.append(dso_name)
+        ra.append(position[0])
+        dec.append(position[1])
+      if len(missing) > 0:
+        print("Not in the local catalogues, skipped with --profile embedded: " + ", ".join(missing))
+    return names, ra, dec
+
+  def catalogue_contents(self, catalogue=None):
+    # what the selected catalogue consists of, for cache keys: the content
+    # hash of a catalogue file or the sorted (name, identifier) pairs
+    if self.settings.catalogue_file != None and self.settings.dso == None:
+      with open(self.settings.catalogue_file, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+    return sorted(self.catalogue(catalogue).items())
+
+  def visibility_index(self, year, catalogue=None, base_dir="./"):
+    # annual index of the selected catalogue at the site, rebuilt when the inputs changed
+    content = self.catalogue_contents(catalogue)
+    key = index_utils.index_key(self.site, content, year, self.settings.min_alt)
+    file_name = index_utils.index_file_name(base_dir, self.site, self.settings.catalogue, year)
+    index = index_utils.load_index(file_name, key)
+    if index != None:
+      return index
+
+    print("Build visibility index " + str(file_name) + "...")
+    names, ra, dec = self.catalogue_coordinates(catalogue)
+    first_night = datetime.date(int(year), 1, 1)
+    nights = (datetime.date(int(year) + 1, 1, 1) - first_night).days
+    utcoffsets = [self.utcoffset(first_night + datetime.timedelta(days=d)).to_value(u.hour) for d in range(nights)]
+    return index_utils.build_index(file_name, key, names, ra, dec, self.location, year, utcoffsets, float(self.settings.min_alt), self.horizon)
+
+  def altitude_year(self, year, catalogue=None, step_minutes=10):
+    # names, (objects, nights, samples) float32 altitudes of every night of the year
+    # (NaN below the local horizon) and the sun and moon of the grid, see sky_utils.year_ephemeris()
+    first_night = datetime.date(int(year), 1, 1)
+    nights = (datetime.date(int(year) + 1, 1, 1) - first_night).days
+    utcoffsets = [self.utcoffset(first_night + datetime.timedelta(days=d)).to_value(u.hour) for d in range(nights)]
+    grid = sky_utils.year_ephemeris(self.location, first_night, nights, utcoffsets, step_minutes)
+    names, ra, dec = self.catalogue_coordinates(catalogue)
+    altitudes = np.full((len(names), nights, len(grid["hours"])), np.nan, dtype=np.float32)
+    # nights without enough moon-free dark time stay empty
+    skipped = [d for d, day in enumerate(grid["days"]) if not self.dark_enough(day)]
+    chunk_size = max(1, int(self.settings.chunk_size) // 10) # 52560 samples per object
+    for start in range(0, len(names), chunk_size):
+      end = min(start + chunk_size, len(names))
+      alt, az = sky_utils.fast_altaz(ra[start:end], dec[start:end], grid["engine"])
+      alt[~sky_utils.above_horizon(alt, az, self.horizon)] = np.nan
+      altitudes[start:end] = alt.reshape(end - start, nights, len(grid["hours"]))
+      altitudes[start:end, skipped] = np.nan
+      if debug:
+        print("Altitudes of the year: " + str(end) + " of " + str(len(names)) + " objects")
+    return names, altitudes, grid
+
+  def sky_index(self, catalogue=None):
+    # names and spatial index of the catalogue positions, built once per catalogue contents
+    key = repr(self.catalogue_contents(catalogue))
+    if key not in self.sky_indexes:
+      names, ra, dec = self.catalogue_coordinates(catalogue)
+      self.sky_indexes[key] = (names, catalogue_utils.SkyIndex(ra, dec))
+      if debug:
+        print("Sky index: " + str(len(names)) + " objects")
+    return self.sky_indexes[key]
+
+  def objects_near(self, dso_identifier, radius, catalogue=None):
+    # [(name, separation in deg)] of the catalogue objects within radius of a DSO, nearest first
+    position = self.object_position(dso_identifier)
+    if position == None:
+      return []
+    names, index = self.sky_index(catalogue)
+    candidates, separations = index.cone(position[0], position[1], radius)
+    return [(names[i], float(separation)) for i, separation in zip(candidates, separations)]
+
+  def objects_above(self, when, min_alt, direction=None, catalogue=None):
+    # [(name, alt, az)] of the catalogue objects above min_alt and the local horizon
+    # at the local time when (datetime), highest first. Only the objects within
+    # 90 - min_alt of the zenith (+1 deg for precession since J2000 and aberration)
+    # are transformed.
+    time = Time(when - datetime.timedelta(hours=self.utcoffset(when.date()).to_value(u.hour)))
+    zenith_ra = time.sidereal_time("apparent", longitude=self.location.lon).deg
+    names, index = self.sky_index(catalogue)
+    candidates, _ = index.cone(zenith_ra, self.location.lat.deg, 90.0 - float(min_alt) + 1.0)
+    if len(candidates) == 0:
+      return []
+    alt, az = sky_utils.fast_altaz(index.ra[candidates], index.dec[candidates], sky_utils.transform_engine(time.reshape((1,)), self.location))
+    visible = (alt[:, 0] >= float(min_alt)) & sky_utils.above_horizon(alt, az, self.horizon)[:, 0]
+    if direction != None:
+      visible &= sky_utils.in_direction(az[:, 0], direction)
+    highest = [i for i in np.argsort(-alt[:, 0], kind="stable") if visible[i]]
+    return [(names[candidates[i]], float(alt[i, 0]), float(az[i, 0])) for i in highest]
+
+  def dark_calendar(self, year, base_dir="./"):
+    # moon-free dark time of every night of the year at the site, rebuilt when the inputs changed
+    year = int(year)
+    if year not in self.calendars:
+      key = calendar_utils.calendar_key(self.site, year, self.settings.max_moon_illumination)
+      file_name = calendar_utils.calendar_file_name(base_dir, self.site, year)
+      calendar = calendar_utils.load_calendar(file_name, key)
+      if calendar == None:
+        print("Build dark time calendar " + str(file_name) + "...")
+        first_night = datetime.date(year, 1, 1)
+        nights = (datetime.date(year + 1, 1, 1) - first_night).days
+        utcoffsets = [self.utcoffset(first_night + datetime.timedelta(days=d)).to_value(u.hour) for d in range(nights)]
+        calendar = calendar_utils.build_calendar(file_name, key, self.location, year, utcoffsets, float(self.settings.max_moon_illumination))
+      self.calendars[year] = calendar
+    return self.calendars[year]
+
+  def dark_enough(self, day, base_dir="./"):
+    # False if the night starting at day has less moon-free dark time than --min_dark_hours
+    if self.settings.min_dark_hours == None:
+      return True
+    return self.dark_calendar(day.year, base_dir).moon_free_hours(day) >= float(self.settings.min_dark_hours)
+
+  def dark_nights(self, first_day, days, base_dir="./"):
+    # (day, moon-free hours, dark hours, moon-free intervals) of the nights from first_day
+    # passing --min_dark_hours; a range into the next year takes that year's calendar
+    nights = []
+    for d in range(int(days)):
+      day = first_day + datetime.timedelta(days=d)
+      if not self.dark_enough(day, base_dir):
+        continue
+      calendar = self.dark_calendar(day.year, base_dir)
+      nights.append((day, calendar.moon_free_hours(day), calendar.dark_hours(day), calendar.intervals(day)))
+    return nights
+
+  def alias_index(self):
+    files = list(config.catalogue_files)
+    if self.settings.catalogue_file != None:
+      files.insert(0, self.settings.catalogue_file)
+    return alias_index(tuple(files), int(self.settings.chunk_size))
+
+  def solar_system_record(self, dso_identifier):
+    # record of a planet or of a comet/asteroid of the orbital elements files, None for other names
+    key = catalogue_utils.name_key(dso_identifier).lower()
+    if key in sky_utils.planets:
+      return dict(name=key.capitalize(), object_type="Planet", magnitude=-1.0, major_axis=-1.0, minor_axis=-1.0, body=key)
+    record = orbital_elements(tuple(config.comet_elements_files), tuple(config.asteroid_elements_files)).resolve(dso_identifier, fuzzy=False)
+    if record == None:
+      return None
+    return dict(record, body=sky_utils.orbit(*record["orbit"]))
+
+  def local_DSOs(self, catalogue):
+    # --profile embedded: the DSOs of a {name : identifier} dict known to the local catalogues
+    # (or solar system bodies) and the names of the others, which can not be evaluated
+    known, missing = {}, []
+    for dso_name, dso_identifier in catalogue.items():
+      if self.solar_system_record(dso_identifier) != None or self.resolve_record(dso_identifier) != None:
+        known[dso_name] = dso_identifier
+      else:
+        missing.append(str(dso_name))
+    return known, missing
+
+  def remember_record(self, record):
+    # a DSO found by Simbad goes into the first local catalogue, so it is resolved
+    # offline from now on: the catalogue of the built-in lists grows with their first use
+    file_name = config.catalogue_files[0]
+    with local_catalogue_lock:
+      try:
+        catalogue_utils.append_catalogue(file_name, [record])
+      except OSError as e:
+        print("Local catalogue " + str(file_name) + " not written: " + str(e))
+        return
+      self.alias_index().add(record)
+    if debug:
+      print("Added " + str(record["name"]) + " to " + str(file_name))
+
+  def resolve_record(self, dso_identifier):
+    # catalogue record of a name, None if it is not in a local catalogue
+    record = self.alias_index().resolve(dso_identifier)
+    if debug and record != None:
+      print("Resolved " + str(dso_identifier) + " locally as " + str(record["name"]))
+    return record
+
+  def object_position(self, dso_identifier):
+    # (ra, dec) in deg from the local catalogues or Simbad, None if unknown or moving;
+    # with --profile embedded the caller names the DSOs missing locally, see local_DSOs()
+    if self.solar_system_record(dso_identifier) != None:
+      return None
+    record = self.resolve_record(dso_identifier)
+    if record != None:
+      return record["ra"], record["dec"]
+    if self.embedded:
+      return None
+    try:
+      the_object = sky_coordinates(str(dso_identifier).upper())
+    except Exception as e:
+      print("Name resolution error " + str(dso_identifier) + ": " + str(e))
+      return None
+    return the_object.ra.deg, the_object.dec.deg
+
+  def merge_catalogues(self, catalogues):
+    # One entry per sky object out of several {name : identifier} dicts: entries with
+    # the same identifier or a position closer than merge_tolerance_arcmin are merged
+    # into the first one, which keeps all designations.
+    entries = []
+    for catalogue in catalogues:
+      entries += [(dso_name, dso_identifier) for dso_name, dso_identifier in catalogue.items()]
+    # same identifier (e.g. C33 and NGC6992): one position lookup
+    identifiers = {}
+    for i, (dso_name, dso_identifier) in enumerate(entries):
+      identifiers.setdefault(catalogue_utils.name_key(dso_identifier), i)
+    firsts = sorted(identifiers.values())
+    positions = [self.object_position(entries[i][1]) for i in firsts]
+    known = [k for k, position in enumerate(positions) if position != None]
+    labels = dict((i, i) for i in firsts)
+    matches = catalogue_utils.cross_match([positions[k][0] for k in known], [positions[k][1] for k in known], merge_tolerance_arcmin / 60.0)
+    for k, match in zip(known, matches):
+      labels[firsts[k]] = firsts[known[match]]
+    labels = [labels[identifiers[catalogue_utils.name_key(dso_identifier)]] for dso_name, dso_identifier in entries]
+
+    merged, designations = {}, {}
+    for i, (dso_name, dso_identifier) in enumerate(entries):
+      primary = entries[labels[i]][0]
+      if primary not in merged:
+        merged[primary] = entries[labels[i]][1]
+        designations[primary.upper()] = []
+      for name in (dso_name, dso_identifier):
+        if name not in designations[primary.upper()]:
+          designations[primary.upper()].append(name)
+    if debug:
+      print("Merged " + str(len(entries)) + " catalogue entries into " + str(len(merged)) + " DSOs")
+    return merged, designations
+
+  def schedule(self, dso_list):
+    # imaging plan for the night from the altitude tracks of the DSOs
+    dsos = [dso for dso in dso_list if dso.track_alt is not None]
+    if len(dsos) == 0:
+      return []
+    night = self.night_at(dsos[0].midnight)
+    alt = np.stack([dso.track_alt for dso in dsos])
+    az = np.stack([dso.track_az for dso in dsos])
+    scores = sky_utils.observability_scores(alt, az, night, horizon=self.horizon, zenith_brightness=self.site.get("sky_brightness", sky_utils.dark_sky_brightness))
+
+    sample_minutes = 24 * 60 / (len(delta_midnight_hours) - 1)
+    samples_per_slot = max(int(round(schedule_slot_minutes / sample_minutes)), 1)
+    slot_minutes = samples_per_slot * sample_minutes
+    quality, slot_index = sky_utils.slot_quality(scores["score"], alt, night["sun_alt"], samples_per_slot, float(self.settings.min_alt), visible=scores["visible"])
+    min_block = int(np.ceil(float(self.settings.min_block) / slot_minutes))
+    overhead = int(np.ceil(float(self.settings.overhead) / slot_minutes))
+    blocks = sky_utils.schedule_night(quality, min_block, overhead)
+
+    plan = []
+    for o, first, end in blocks:
+      i, j = slot_index[first], min(slot_index[end], len(night["datetimes"]) - 1)
+      plan.append((dsos[o], night["datetimes"][i], night["datetimes"][j], float(alt[o, i:j].mean()), float(quality[o, first:end].mean())))
+      if debug:
+        print("Schedule: " + str(dsos[o].the_object_name) + " " + str(night["datetimes"][i]) + " - " + str(night["datetimes"][j]))
+    return plan
+
+  def dso_filter(self, dso):
+    # moon and direction filters of tonight's checks on the numeric scores
+    if self.settings.moon:
+      if self.settings.justthetopones:
+        if not dso.top_score_at_max_alt:
+          return False
+      elif not dso.moon_ok_at_max_alt:
+        return False
+    if self.settings.direction != None:
+      if not sky_utils.in_direction(dso.max_alt_az, self.settings.direction):
+        return False
+    return True
+
+  def reportable(self, dso):
+    # True if the DSO makes it into tonight's lists (before --top), see sort_DSOs()
+    if not dso.max_alt > 0:
+      return False
+    dt = dso.max_alt_time
+    if not (dso.astronomical_night_start < dt < dso.astronomical_night_end or dso.nautical_night_start < dt < dso.nautical_night_end):
+      return False
+    return self.dso_filter(dso)
+
+  def sort_DSOs(self, dso_list):
+    # sort by max. altitude time
+    dsol = sorted(dso_list, key=lambda x: x.max_alt_time)
+    if debug:
+      print("\n\n\n")
+      print("Sorted by max. altitude time:")
+
+    astronomical_night_start, astronomical_night_end = "",""
+    nautical_night_start, nautical_night_end = "", ""
+    astronomical_night_dsos = []
+    nautical_night_dsos = []
+    invisible_dsos = []
+    for dso in dsol:
+      dt = dso.max_alt_time
+      astronomical_night_start = dso.astronomical_night_start
+      astronomical_night_end = dso.astronomical_night_end
+      nautical_night_start = dso.nautical_night_start
+      nautical_night_end = dso.nautical_night_end
+
+      if self.settings.moon:
+        if debug:
+          print("###" + str(dso.score_at_max_alt) + ", " + str(dso.top_score_at_max_alt) + ", " + str(dso.sub_text_moon_at_max_alt))
+
+      if dso.max_alt > 0:
+        if dso.astronomical_night_start < dt < dso.astronomical_night_end:
+          if debug:
+            print(dso.the_object_name + ": " + str(dso.max_alt) + " in " + str(dso.max_alt_direction) + " at " + str(dso.max_alt_time) + " (astronomical night)")
+            if hasattr(dso, "major_axis") and hasattr(dso, "minor_axis") and hasattr(dso, "magnitude"):
+              print("  dimensions: " + str(dso.major_axis) + " * " + str(dso.minor_axis) + " \"""; mag: " + str(dso.magnitude))
+          if self.dso_filter(dso):
+            astronomical_night_dsos.append(dso)
+        elif dso.nautical_night_start < dt < dso.nautical_night_end:
+          if debug:
+            print(dso.the_object_name + ": " + str(dso.max_alt) + " in " + str(dso.max_alt_direction) + " at " + str(dso.max_alt_time) + " (nautical night)")
+            if hasattr(dso, "major_axis") and hasattr(dso, "minor_axis") and hasattr(dso, "magnitude"):
+              print("  dimensions: " + str(dso.major_axis) + " * " + str(dso.minor_axis) + " \"""; mag: " + str(dso.magnitude))
+          if self.dso_filter(dso):
+            nautical_night_dsos.append(dso)
+      else:
+        if debug:
+          print("Invisible DSO: " + str(dso.the_object_name))
+        invisible_dsos.append(dso)
+
+    if self.settings.top != None:
+      # keep the best ones by observability score, still ordered by max. altitude time
+      candidates = nautical_night_dsos + astronomical_night_dsos
+      best = set(sky_utils.top_k([dso.observability for dso in candidates], int(self.settings.top)))
+      # candidates are the nautical ones followed by the astronomical ones
+      nautical = len(nautical_night_dsos)
+      nautical_night_dsos = [dso for i, dso in enumerate(nautical_night_dsos) if i in best]
+      astronomical_night_dsos = [dso for i, dso in enumerate(astronomical_night_dsos) if nautical + i in best]
+
+    if debug:
+      print("Astronomical night: " + str(astronomical_night_start) + " - " + str(astronomical_night_end))
+      print("Nautical night: " + str(nautical_night_start) + " - " + str(nautical_night_end))
+    return astronomical_night_start, astronomical_night_end, astronomical_night_dsos, nautical_night_start, nautical_night_end, nautical_night_dsos, invisible_dsos
+
+  def stream_night(self, day, catalogue=None, keep_tracks=False, checkpoint=None):
+    # DSOResults of the night starting at day, one by one as they are evaluated;
+    # catalogue files are streamed in chunks and yield only the DSOs passing the filters,
+    # failing objects are skipped (see evaluate_isolated())
+    day = parse_date(day)
+    if catalogue == None and self.settings.catalogue_file != None and self.settings.dso == None:
+      catalogue = self.settings.catalogue_file
+    if isinstance(catalogue, str) and self.settings.dso == None and (catalogue == self.settings.catalogue_file or os.path.isfile(catalogue)):
+      for dso in self.evaluate_catalogue_file(catalogue, day, keep_tracks=keep_tracks, checkpoint=checkpoint):
+        yield dso
+    else:
+      for dso_name, dso_identifier in self.catalogue(catalogue).items():
+        dso = self.evaluate_isolated(dso_identifier, dso_name, day, checkpoint, keep_tracks=keep_tracks)
+        if dso != None:
+          yield dso
+
+  def plan_night(self, day, catalogue=None, callback=None, keep_tracks=False, keep_results=True, checkpoint=None):
+    # Best DSOs of the night starting at day. catalogue: {name : identifier}, the
+    # name of a built-in catalogue or a catalogue file (default: the settings),
+    # callback: called with every DSOResult right after its evaluation.
+    # keep_results=False keeps only what the lists need (with --top only the best
+    # ones so far), so memory does not grow with the catalogue.
+    # Returns a dict of the night times (of the planner, also without any DSO) and
+    # DSOResult lists, failed objects in "failures".
+    day = parse_date(day)
+    keep_tracks = keep_tracks or self.settings.schedule
+    failures = len(self.failures)
+    dso_list = []
+    best = [] # heap of (observability, count, DSOResult) with --top and keep_results=False
+    for count, dso in enumerate(self.stream_night(day, catalogue, keep_tracks, checkpoint)):
+      if callback:
+        callback(dso)
+      if keep_results or not dso.max_alt > 0:
+        dso_list.append(dso)
+      elif self.reportable(dso):
+        if self.settings.top == None:
+          dso_list.append(dso)
+        elif len(best) < int(self.settings.top):
+          heapq.heappush(best, (dso.observability, count, dso))
+        elif int(self.settings.top) > 0 and dso.observability > best[0][0]:
+          heapq.heapreplace(best, (dso.observability, count, dso))
+    dso_list += [dso for _, _, dso in sorted(best, key=lambda entry: entry[1])]
+
+    _, _, astronomical_night_dsos, _, _, nautical_night_dsos, invisible_dsos = self.sort_DSOs(dso_list)
+    _, _, nautical_night_start, nautical_night_end, astronomical_night_start, astronomical_night_end = self.night_times(day)
+    plan = dict(
+      site = self.site["location"],
+      date = day,
+      results = dso_list,
+      nautical_night = (nautical_night_start, nautical_night_end),
+      nautical = nautical_night_dsos,
+      astronomical_night = (astronomical_night_start, astronomical_night_end),
+      astronomical = astronomical_night_dsos,
+      invisible = invisible_dsos,
+      schedule = None,
+      failures = self.failures[failures:]
+    )
+    if self.settings.schedule:
+      plan["schedule"] = self.schedule(nautical_night_dsos + astronomical_night_dsos)
+    return plan
+
+  def best_dates(self, dso_name, dso_identifier=None, year=None, callback=None, checkpoint=None, keep_tracks=True):
+    # DSOResults (with tracks for the plot) of one object on the 1st of every month
+    # of the year, without the nights below --min_dark_hours
+    if dso_identifier == None:
+      dso_identifier = dso_name
+    if year == None:
+      year = datetime.date.today().year
+    dso_list = []
+    for the_month in range(1, 13):
+      the_day = datetime.date(int(year), the_month, 1)
+      if not self.dark_enough(the_day):
+        if debug:
+          print("Skip " + the_day.strftime("%d.%m.%Y") + ": not enough moon-free dark time")
+        continue
+      if debug:
+        print("Calculate visibility of " + str(dso_name) + " at " + the_day.strftime("%d.%m.%Y"))
+      dso = self.evaluate_isolated(dso_name, dso_identifier, the_day, checkpoint, keep_tracks=keep_tracks)
+      if dso == None:
+        continue
+      if callback:
+        callback(dso)
+      dso_list.append(dso)
+    return dso_list
+
+def plan_night(site, date, catalogue=None, callback=None, **settings):
+  # best DSOs of a night at a site, see Planner.plan_night()
+  return Planner(site, **settings).plan_night(date, catalogue, callback)
+
+def best_dates(obj, site, year=None, **settings):
+  # DSOResults of an object on the 1st of every month, best observability first
+  dso_list = Planner(site, dso=obj, **settings).best_dates(obj, year=year)
+  return sorted(dso_list, key=lambda dso: (bool(dso.visible), getattr(dso, "observability", 0.0)), reverse=True)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Altitude-vs-date charts of Solveighs DSO observation planning
+#
+# A whole year of one object is a nights x time-of-night altitude array (see
+# Planner.altitude_year()) and is rendered as one image instead of one scatter
+# curve per night. Daylight and twilight are shaded over it, the hours with a
+# bright moon above the horizon are hatched. The sheet puts the small charts of
+# a whole catalogue into one figure.
+#
+
+import math
+import numpy as np
+import matplotlib.pyplot as plt
+
+debug = False
+
+# shading of day (sun > -6), nautical (> -12) and astronomical twilight (> -18)
+twilight_levels = [-6, -12, -18]
+twilight_alpha = [0.85, 0.55, 0.25]
+bright_moon = 0.3 # illuminated fraction
+
+def darkness_overlay(sun_alt):
+  # RGBA image: grey over day and twilight, transparent in the dark night
+  alpha = np.zeros(sun_alt.shape, dtype=np.float32)
+  for level, value in zip(reversed(twilight_levels), reversed(twilight_alpha)):
+    alpha[sun_alt > level] = value
+  overlay = np.zeros(sun_alt.shape + (4,), dtype=np.float32)
+  overlay[..., :3] = 0.75
+  overlay[..., 3] = alpha
+  return overlay
+
+def moon_mask(grid):
+  # 1 where a bright moon is above the horizon during the dark part of the night
+  return ((grid["moon_alt"] > 0) & (grid["moon_illumination"] > bright_moon) & (grid["sun_alt"] < twilight_levels[1])).astype(np.float32)
+
+def year_overlays(grid):
+  # darkness and moon overlays of the grid, the same for every object of a site
+  return dict(darkness=darkness_overlay(grid["sun_alt"]), moon=moon_mask(grid))
+
+def heatmap(ax, altitude, grid, title=None, overlays=None, small=False):
+  # one imshow of the (nights, samples) altitude array, overlays from year_overlays() can be shared
+  hours = grid["hours"]
+  step = hours[1] - hours[0]
+  extent = [hours[0], hours[-1] + step, len(grid["days"]), 0]
+  if overlays == None:
+    overlays = year_overlays(grid)
+  cmap = plt.get_cmap("viridis").copy()
+  cmap.set_bad("#303030") # below the local horizon
+  image = ax.imshow(altitude, aspect="auto", interpolation="nearest", extent=extent, cmap=cmap, vmin=0, vmax=90)
+  ax.imshow(overlays["darkness"], aspect="auto", interpolation="nearest", extent=extent)
+  if overlays["moon"].any():
+    ax.contourf(hours + step / 2.0, np.arange(len(grid["days"])) + 0.5, overlays["moon"], levels=[0.5, 1.5],
+                colors="none", hatches=["////"])
+  months = [d for d, day in enumerate(grid["days"]) if day.day == 1]
+  ax.set_yticks(months)
+  ax.set_xlim(-9, 9)
+  if small:
+    ax.set_yticklabels([])
+    ax.set_xticks([])
+    ax.tick_params(length=0)
+  else:
+    ax.set_yticklabels([grid["days"][d].strftime("%b") for d in months])
+    xt = np.arange(-8, 10, 2)
+    ax.set_xticks(xt)
+    ax.set_xticklabels([str(h % 24) for h in xt])
+    ax.set_xlabel("Hours from Midnight")
+  if title != None:
+    ax.set_title(title, fontsize="x-small" if small else "medium")
+  return image
+
+def plot_year(file_name, name, altitude, grid):
+  # altitude of one object over the year in one figure
+  plt.close("all")
+  figure, ax = plt.subplots(figsize=(8, 8), facecolor="lightgrey")
+  image = heatmap(ax, altitude, grid, str(name) + " " + str(grid["first_night"].year))
+  figure.colorbar(image, ax=ax).set_label("Altitude [deg]")
+  figure.savefig(file_name, dpi=100)
+  plt.close(figure)
+  if debug:
+    print("Saved: " + str(file_name))
+
+def plot_sheet(file_name, names, altitudes, grid, title=None, columns=None):
+  # small multiples of all objects in one figure, one colorbar
+  plt.close("all")
+  if columns == None:
+    columns = max(1, int(math.ceil(math.sqrt(len(names) * 1.5))))
+  rows = max(1, int(math.ceil(len(names) / float(columns))))
+  figure, axes = plt.subplots(rows, columns, figsize=(1.6 * columns, 1.9 * rows + 0.6), facecolor="lightgrey", squeeze=False)
+  shared = year_overlays(grid)
+  image = None
+  for i, ax in enumerate(axes.ravel()):
+    if i >= len(names):
+      ax.axis("off")
+      continue
+    image = heatmap(ax, altitudes[i], grid, str(names[i]), shared, small=True)
+  if title != None:
+    figure.suptitle(title)
+  if image != None:
+    figure.colorbar(image, ax=axes.ravel().tolist(), shrink=0.6).set_label("Altitude [deg]")
+  figure.savefig(file_name, dpi=100)
+  plt.close(figure)
+  if debug:
+    print("Saved: " + str(file_name) + " (" + str(len(names)) + " objects)")
@@ -6,10 +6,14 @@
 #
 
 import datetime
+import functools
 from datetime import date
 import pytz
 from skyfield.api import load, wgs84, N, W
-from astropy.coordinates import AltAz
+import numpy as np
+import erfa
+import astropy.units as u
+from astropy.coordinates import AltAz, CIRS, get_sun, get_body
 from astropy.time import Time
 import ephem
 import config
@@ -19,7 +23,10 @@ import decimal
 dec = decimal.Decimal
 debug = False
 
-eph = load('de421.bsp') # will be downloaded at first load
+@functools.lru_cache(maxsize=1)
+def ephemeris():
+  # JPL ephemeris of skyfield, loaded at first use only (downloaded at first load)
+  return load('de421.bsp')
 
 def compass_direction(azimuth):
   direction = ""
@@ -69,6 +76,697 @@ def compass_direction(azimuth):
     direction = "N"
   return direction
 
+# azimuth sectors of compass_direction(): [from, to)
+compass_sectors = [("N", 0, 15), ("NNE", 15, 30), ("NE", 30, 60), ("ENE", 60, 75), ("E", 75, 105),
+                   ("ESE", 105, 135), ("SE", 135, 150), ("SSE", 150, 165), ("S", 165, 195),
+                   ("SSW", 195, 225), ("SW", 225, 240), ("WSW", 240, 255), ("W", 255, 285),
+                   ("WNW", 285, 300), ("NW", 300, 330), ("NWN", 330, 345), ("N", 345, 360.001)]
+
+def direction_az_ranges(direction):
+  # "S" -> azimuth ranges of all compass sectors containing "S" (S, SSE, SE, ...),
+  # "150-210" -> explicit azimuth range
+  direction = str(direction).strip().upper()
+  if "-" in direction:
+    az_from, az_to = direction.split("-")
+    az_from, az_to = float(az_from) % 360, float(az_to) % 360
+    if az_from <= az_to:
+      return [(az_from, az_to)]
+    return [(az_from, 360.001), (0, az_to)] # across north
+  return [(az_from, az_to) for name, az_from, az_to in compass_sectors if direction in name]
+
+def in_direction(azimuth, direction):
+  azimuth = np.asarray(azimuth)
+  mask = np.zeros(azimuth.shape, dtype=bool)
+  for az_from, az_to in direction_az_ranges(direction):
+    mask |= (azimuth >= az_from) & (azimuth < az_to)
+  return mask
+
+def top_k(values, k):
+  # indices of the k largest values, best first
+  values = np.asarray(values)
+  if k <= 0 or len(values) == 0:
+    return np.array([], dtype=int)
+  if k < len(values):
+    candidates = np.argpartition(-values, k - 1)[:k]
+  else:
+    candidates = np.arange(len(values))
+  return candidates[np.argsort(-values[candidates], kind="stable")]
+
+##############################################################################
+def moon_elongation(sun, moon):
+  # sun-moon angle (rad), the sun taken into the topocentric frame of the moon:
+  # separation() between GCRS frames of different obsgeoloc warns on every call
+  return moon.separation(sun.transform_to(moon.frame)).rad
+
+# Sun and moon over a night are the same for every DSO: compute them once per
+# night and site on the common sample grid.
+night_cache = {}
+
+def night_ephemeris(midnight, delta_hours, location, backend=None, ut1=True):
+  # backend: EphemerisBackend for sun and moon, default astropy,
+  # ut1=False: no IERS tables for the transform engine, see transform_engine()
+  key = (midnight.isot, round(location.lat.deg, 6), round(location.lon.deg, 6), round(location.height.value, 1), len(delta_hours), float(delta_hours[0]), getattr(backend, "name", None), ut1)
+  night = night_cache.get(key) # one lookup: another thread may clear the cache
+  if night != None:
+    return night
+  if len(night_cache) > 31:
+    night_cache.clear()
+
+  times = midnight + np.asarray(delta_hours, dtype=np.float64) * u.hour
+  if backend == None:
+    frame = AltAz(obstime=times, location=location)
+    sun = get_sun(times)
+    moon = get_body("moon", times, location)
+    sunaltaz = sun.transform_to(frame)
+    moonaltaz = moon.transform_to(frame)
+    sun_alt = sunaltaz.alt.deg
+    moon_alt, moon_az = moonaltaz.alt.deg, moonaltaz.az.deg
+    # illuminated fraction from the sun-moon elongation
+    elongation = moon_elongation(sun, moon)
+    illumination = (1.0 - np.cos(elongation)) / 2.0
+  else:
+    jd = times.utc.jd
+    sun_alt, _ = backend.sun_altaz(jd)
+    moon_alt, moon_az = backend.moon_altaz(jd)
+    illumination = backend.moon_illumination(jd)
+
+  night = dict(
+    times = times,
+    engine = transform_engine(times, location, ut1=ut1),
+    hours = np.asarray(delta_hours, dtype=np.float32),
+    datetimes = times.tt.datetime, # same time scale as DSO.max_alt_time
+    sun_alt = np.asarray(sun_alt).astype(np.float32),
+    moon_alt = np.asarray(moon_alt).astype(np.float32),
+    moon_az = np.asarray(moon_az).astype(np.float32),
+    moon_illumination = np.asarray(illumination).astype(np.float32)
+  )
+  if debug:
+    print("Night ephemeris for " + str(midnight.iso) + ": sun min. alt " + str(round(float(night["sun_alt"].min()),1)) + ", moon max. alt " + str(round(float(night["moon_alt"].max()),1)))
+  night_cache[key] = night
+  return night
+
+def year_ephemeris(location, first_night, nights, utcoffset_hours, step_minutes=10):
+  # sun and moon of many nights on one time grid (nights x samples around local
+  # midnight), utcoffset_hours per night; the transform engine of the grid is
+  # returned as well, targets are then one fast_altaz() call per chunk
+  hours = np.arange(-12, 12, step_minutes / 60.0)
+  midnights = Time((first_night + datetime.timedelta(days=1)).isoformat() + " 00:00:00") + np.arange(nights) * u.day - np.asarray(utcoffset_hours, dtype=float) * u.hour
+  times = (midnights[:, None] + hours[None, :] * u.hour).ravel()
+  engine = transform_engine(times, location)
+  # sun and moon move slowly: positions once per hour, interpolated to the grid
+  jd = times.utc.jd
+  coarse = Time(np.arange(jd[0], jd[-1] + 1.0 / 24.0, 1.0 / 24.0), format="jd", scale="utc")
+  sun = get_sun(coarse)
+  moon = get_body("moon", coarse, location)
+  positions = []
+  for body in (sun, moon):
+    ra = np.degrees(np.interp(jd, coarse.jd, np.unwrap(body.ra.rad))) % 360.0
+    positions.append((ra, np.interp(jd, coarse.jd, body.dec.deg)))
+  sun_alt, _ = fast_altaz(positions[0][0], positions[0][1], engine, per_sample=True)
+  moon_alt, _ = fast_altaz(positions[1][0], positions[1][1], engine, per_sample=True)
+  (sun_ra, sun_dec), (moon_ra, moon_dec) = [(np.radians(ra), np.radians(dec)) for ra, dec in positions]
+  elongation = np.arccos(np.clip(np.sin(sun_dec) * np.sin(moon_dec) + np.cos(sun_dec) * np.cos(moon_dec) * np.cos(sun_ra - moon_ra), -1.0, 1.0))
+  shape = (nights, len(hours))
+  return dict(
+    first_night = first_night,
+    days = [first_night + datetime.timedelta(days=d) for d in range(nights)],
+    hours = hours,
+    engine = engine,
+    sun_alt = sun_alt[0].reshape(shape),
+    moon_alt = moon_alt[0].reshape(shape),
+    moon_illumination = ((1.0 - np.cos(elongation)) / 2.0).astype(np.float32).reshape(shape)
+  )
+
+def sun_moon_altitudes(jd, location, step_hours=1.0):
+  # sun and moon altitude (deg, no refraction) and moon illumination at many UTC
+  # julian dates, e.g. every minute of a year: topocentric CIRS positions are
+  # computed every step_hours and interpolated, the hour angle of every sample
+  # comes from the Earth rotation angle (UT1-UTC neglected, < 15")
+  jd = np.asarray(jd, dtype=float)
+  coarse = Time(np.arange(jd.min() - step_hours / 24.0, jd.max() + 2 * step_hours / 24.0, step_hours / 24.0), format="jd", scale="utc")
+  frame = CIRS(obstime=coarse, location=location)
+  sun = get_sun(coarse)
+  moon = get_body("moon", coarse, location)
+  elongation = np.interp(jd, coarse.jd, moon_elongation(sun, moon))
+  earth_rotation = erfa.era00(jd, 0.0)
+  sin_lat, cos_lat = np.sin(location.lat.rad), np.cos(location.lat.rad)
+  altitudes = []
+  for body in (sun.transform_to(frame), moon.transform_to(frame)):
+    ra = np.interp(jd, coarse.jd, np.unwrap(body.ra.rad))
+    dec = np.interp(jd, coarse.jd, body.dec.rad)
+    hour_angle = earth_rotation + location.lon.rad - ra
+    altitudes.append(np.degrees(np.arcsin(sin_lat * np.sin(dec) + cos_lat * np.cos(dec) * np.cos(hour_angle))).astype(np.float32))
+  return altitudes[0], altitudes[1], ((1.0 - np.cos(elongation)) / 2.0).astype(np.float32)
+
+##############################################################################
+# Transform engine: the star-independent part of ICRS -> AltAz (precession,
+# nutation, Earth rotation, polar motion, aberration, refraction constants) is
+# computed once per time sample and site with ERFA, all objects are then
+# rotated with one einsum. Light deflection by the sun is neglected (< 0.01"
+# away from the sun), polar motion is set to zero (< 0.5").
+
+def transform_engine(times, location, pressure=0.0, temperature=0.0, humidity=0.0, wavelength=1.0, ut1=True):
+  # pressure in hPa (0: no refraction, like astropy's AltAz default), temperature in deg C,
+  # humidity 0..1, wavelength in micrometer; ut1=False: UT1-UTC neglected (< 15"),
+  # the IERS tables (about 100 MB in memory) are not loaded
+  utc = times.utc
+  dut1 = np.zeros(np.shape(utc.jd1))
+  if ut1:
+    try:
+      dut1 = np.asarray(times.delta_ut1_utc, dtype=float)
+    except Exception:
+      pass
+  astrom, eo = erfa.apco13(utc.jd1, utc.jd2, dut1, location.lon.rad, location.lat.rad,
+                           location.height.to_value(u.m), 0.0, 0.0, pressure, temperature, humidity, wavelength)
+  astrom = np.atleast_1d(astrom)
+  c, s = np.cos(astrom["eral"]), np.sin(astrom["eral"])
+  zero, one = np.zeros_like(c), np.ones_like(c)
+  earth_rotation = np.stack([np.stack([c, s, zero], -1), np.stack([-s, c, zero], -1), np.stack([zero, zero, one], -1)], -2)
+  sx, cx = np.sin(astrom["xpl"]), np.cos(astrom["xpl"])
+  sy, cy = np.sin(astrom["ypl"]), np.cos(astrom["ypl"])
+  polar_motion = np.stack([np.stack([cx, zero, sx], -1), np.stack([sx * sy, cy, -cx * sy], -1), np.stack([-sx * cy, sy, cx * cy], -1)], -2)
+  sphi, cphi = astrom["sphi"], astrom["cphi"]
+  horizon = np.stack([np.stack([sphi, zero, -cphi], -1), np.stack([zero, one, zero], -1), np.stack([cphi, zero, sphi], -1)], -2)
+  matrix = horizon @ polar_motion @ earth_rotation @ astrom["bpn"]
+  return dict(matrix=matrix, v=astrom["v"], bm1=astrom["bm1"], em=astrom["em"], diurab=astrom["diurab"],
+              refa=astrom["refa"], refb=astrom["refb"])
+
+def fast_altaz(ra, dec, engine, dtype=np.float32, per_sample=False):
+  # ra, dec in deg, shape (N,) -> alt, az in deg, shape (N, T);
+  # per_sample: one position per time sample (moving body), shape (T,) -> (1, T)
+  ra = np.radians(np.atleast_1d(np.asarray(ra, dtype=float)))
+  dec = np.radians(np.atleast_1d(np.asarray(dec, dtype=float)))
+  p = np.stack([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)], -1)
+
+  # annual aberration (erfa.ab): p' = a * p + b * v, so that the rotation
+  # can be applied to p and v separately: M p' = a * (M p) + b * (M v)
+  v = engine["v"]
+  bm1 = engine["bm1"][None, :]
+  if per_sample:
+    pdv = np.sum(p * v, axis=-1)[None, :]
+  else:
+    pdv = p @ v.T
+  w1 = 1.0 + pdv / (1.0 + bm1)
+  w2 = erfa.SRS / engine["em"][None, :]
+  a = bm1 - w2 * pdv
+  b = w1 + w2
+  norm = np.sqrt(a * a + 2.0 * a * b * pdv + b * b * np.sum(v * v, axis=-1)[None, :])
+  a /= norm
+  b /= norm
+
+  # CIRS -> -HA/Dec -> horizon in one rotation per time sample
+  if per_sample:
+    mp = np.einsum("tij,tj->it", engine["matrix"], p)[:, None, :]
+  else:
+    mp = np.einsum("tij,nj->int", engine["matrix"], p)
+  mv = np.einsum("tij,tj->it", engine["matrix"], v)
+  x = a * mp[0] + b * mv[0][None, :]
+  y = a * mp[1] + b * mv[1][None, :]
+  z = a * mp[2] + b * mv[2][None, :]
+  # diurnal aberration (erfa.atioq)
+  diurab = engine["diurab"][None, :]
+  f = 1.0 - diurab * y
+  x, y, z = f * x, f * (y + diurab), f * z
+
+  # refraction (erfa.atioq), no-op without pressure
+  r = np.maximum(np.hypot(x, y), 1e-6)
+  zc = np.maximum(z, 0.05)
+  tz = r / zc
+  w = engine["refb"][None, :] * tz * tz
+  delta = (engine["refa"][None, :] + w) * tz / (1.0 + (engine["refa"][None, :] + 3.0 * w) / (zc * zc))
+  cosdel = 1.0 - delta * delta / 2.0
+  f = cosdel - delta * zc / r
+  x, y, z = x * f, y * f, cosdel * z + delta * r
+
+  az = np.degrees(np.arctan2(y, -x)) % 360.0
+  alt = np.degrees(np.arctan2(z, np.hypot(x, y)))
+  return alt.astype(dtype), az.astype(dtype)
+
+def airmass(altitude):
+  # Kasten & Young (1989), inf below the horizon
+  altitude = np.asarray(altitude, dtype=np.float32)
+  with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+    x = 1.0 / (np.sin(np.radians(altitude)) + 0.50572 * np.power(altitude + 6.07995, -1.6364))
+  return np.where(altitude > 0, x, np.inf).astype(np.float32)
+
+def angular_separation(alt1, az1, alt2, az2):
+  alt1, az1, alt2, az2 = np.radians(alt1), np.radians(az1), np.radians(alt2), np.radians(az2)
+  cos_sep = np.sin(alt1) * np.sin(alt2) + np.cos(alt1) * np.cos(alt2) * np.cos(az1 - az2)
+  return np.degrees(np.arccos(np.clip(cos_sep, -1.0, 1.0))).astype(np.float32)
+
+def darkness(sun_alt):
+  # 0: sun above civil twilight (-6), 1: astronomical night (-18)
+  return np.clip((-6.0 - np.asarray(sun_alt, dtype=np.float32)) / 12.0, 0.0, 1.0)
+
+min_altitude = 5 # deg
+moon_min_separation = 30 # deg
+
+def above_horizon(alt, az, horizon=None, min_alt=min_altitude):
+  # one comparison for all samples of all objects against the azimuth-indexed horizon
+  alt = np.asarray(alt)
+  if horizon is None:
+    return alt > min_alt
+  index = np.floor(np.asarray(az)).astype(np.int16) % 360
+  return alt > horizon[index]
+
+def mask_intervals(mask):
+  # (N, T) bool -> rows, first and behind-last sample of every run of True values,
+  # in row order and sorted by start within a row
+  mask = np.atleast_2d(np.asarray(mask, dtype=bool))
+  edges = np.diff(np.pad(mask.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+  rows, starts = np.nonzero(edges == 1)
+  _, ends = np.nonzero(edges == -1)
+  return rows, starts, ends
+
+def split_rows(rows, values, count):
+  # per object lists out of the flat arrays of mask_intervals()/visibility_windows()
+  return np.split(np.asarray(values), np.searchsorted(rows, np.arange(1, count)))
+
+def visibility_windows(alt, az, night, min_alt=30, max_sun_alt=-12, horizon=None):
+  # alt/az: (N, T) tracks on the grid of the night.
+  # windows: dark (sun below max_sun_alt), above min_alt and above the local horizon,
+  # rises/sets: first sample above/below the local horizon, transit: highest sample
+  alt = np.atleast_2d(alt)
+  az = np.atleast_2d(az)
+  free = above_horizon(alt, az, horizon)
+  dark = np.asarray(night["sun_alt"]) < max_sun_alt
+  rows, starts, ends = mask_intervals(free & (alt >= min_alt) & dark[None, :])
+  edges = np.diff(free.astype(np.int8), axis=1)
+  rise_rows, rises = np.nonzero(edges == 1)
+  set_rows, sets = np.nonzero(edges == -1)
+  return dict(rows=rows, starts=starts, ends=ends,
+              rise_rows=rise_rows, rises=rises + 1, set_rows=set_rows, sets=sets + 1,
+              transit=np.argmax(alt, axis=1))
+
+##############################################################################
+# Sky brightness (V band) after Krisciunas & Schaefer (1991), PASP 103, 1033
+
+extinction = 0.172 # mag/airmass in V
+dark_sky_brightness = 21.0 # mag/arcsec^2 at the zenith without moon and twilight
+twilight_gradient = 0.6 # mag/arcsec^2 the sky brightens per degree of sun altitude above -18
+
+def nanolambert(mag):
+  return 34.08 * np.exp(20.7233 - 0.92104 * np.asarray(mag, dtype=np.float64))
+
+def sky_magnitude(brightness):
+  return (20.7233 - np.log(np.asarray(brightness) / 34.08)) / 0.92104
+
+def _ks_airmass(zenith_distance):
+  # KS eq. 3, finite down to the horizon
+  return 1.0 / np.sqrt(1.0 - 0.96 * np.sin(np.radians(zenith_distance)) ** 2)
+
+def moon_sky_brightness(separation, moon_alt, alt, illumination, k=extinction):
+  # nanoLambert added by the moon at an object (KS eq. 15), 0 with the moon below the horizon
+  phase_angle = np.degrees(np.arccos(np.clip(2.0 * np.asarray(illumination, dtype=np.float64) - 1.0, -1.0, 1.0)))
+  moon_magnitude = -12.73 + 0.026 * phase_angle + 4e-9 * phase_angle ** 4
+  moon_illuminance = 10.0 ** (-0.4 * (moon_magnitude + 16.57))
+  rho = np.radians(np.asarray(separation, dtype=np.float64))
+  scattering = 10.0 ** 5.36 * (1.06 + np.cos(rho) ** 2) + 10.0 ** (6.15 - np.degrees(rho) / 40.0)
+  x_moon = _ks_airmass(90.0 - np.clip(moon_alt, 0.0, 90.0))
+  x_object = _ks_airmass(90.0 - np.clip(alt, 0.0, 90.0))
+  brightness = scattering * moon_illuminance * 10.0 ** (-0.4 * k * x_moon) * (1.0 - 10.0 ** (-0.4 * k * x_object))
+  return np.where(np.asarray(moon_alt) > 0, brightness, 0.0)
+
+def sky_brightness(alt, sun_alt, moon_separation, moon_alt, illumination, zenith_brightness=dark_sky_brightness, k=extinction):
+  # nanoLambert of the sky at an object: dark sky (KS eq. 2) + twilight + moon
+  x = _ks_airmass(90.0 - np.clip(alt, 0.0, 90.0))
+  dark = nanolambert(zenith_brightness) * 10.0 ** (-0.4 * k * (x - 1.0)) * x
+  # twilight: the whole sky brightens with the sun from -18 deg on, up to the horizon
+  twilight = nanolambert(zenith_brightness - twilight_gradient * np.clip(np.asarray(sun_alt, dtype=np.float64) + 18.0, 0.0, 18.0)) - nanolambert(zenith_brightness)
+  return dark + twilight + moon_sky_brightness(moon_separation, moon_alt, alt, illumination, k)
+
+def observability_scores(alt, az, night, min_alt=min_altitude, horizon=None, zenith_brightness=dark_sky_brightness):
+  # alt/az: (T,) or (N, T) arrays on the grid of the night; sun/moon broadcast over N
+  alt = np.asarray(alt, dtype=np.float32)
+  az = np.asarray(az, dtype=np.float32)
+  visible = above_horizon(alt, az, horizon, min_alt)
+  moon_alt = night["moon_alt"]
+  illumination = night["moon_illumination"]
+  dark = darkness(night["sun_alt"])
+
+  x = airmass(alt)
+  moon_separation = angular_separation(alt, az, moon_alt, night["moon_az"])
+  # contrast: brightness of the dark sky at the zenith over the brightness of the
+  # sky at the object (twilight, moon), times the transmission through the airmass
+  brightness = sky_brightness(alt, night["sun_alt"], moon_separation, moon_alt, illumination, zenith_brightness)
+  contrast = nanolambert(zenith_brightness) / brightness
+  score = np.where(visible, contrast / x, 0.0)
+
+  return dict(
+    altitude = alt,
+    airmass = x,
+    moon_separation = moon_separation,
+    moon_alt = moon_alt,
+    illumination = illumination,
+    darkness = dark,
+    sky_brightness = sky_magnitude(brightness).astype(np.float32), # mag/arcsec^2
+    visible = visible,
+    score = score.astype(np.float32)
+  )
+
+##############################################################################
+# Night session scheduler: sequence of targets and time blocks over the night
+
+def slot_quality(score, alt, sun_alt, samples_per_slot, min_alt=30, max_sun_alt=-12, visible=None):
+  # average the (N, T) sample scores into slots of the dark part of the night,
+  # slots with any sample below min_alt (or hidden by the horizon) are forbidden (-inf)
+  score = np.atleast_2d(score)
+  alt = np.atleast_2d(alt)
+  if visible is not None:
+    alt = np.where(np.atleast_2d(visible), alt, -90.0)
+  dark = np.flatnonzero(np.asarray(sun_alt) < max_sun_alt)
+  if len(dark) < samples_per_slot:
+    return np.zeros((len(score), 0), dtype=np.float32), np.array([], dtype=int)
+  first = dark[0]
+  slots = (dark[-1] + 1 - first) // samples_per_slot
+  last = first + slots * samples_per_slot
+  shape = (len(score), slots, samples_per_slot)
+  quality = score[:, first:last].reshape(shape).mean(axis=2)
+  allowed = alt[:, first:last].reshape(shape).min(axis=2) >= min_alt
+  quality = np.where(allowed, quality, -np.inf).astype(np.float32)
+  return quality, first + np.arange(slots + 1) * samples_per_slot
+
+def schedule_night(quality, min_block, overhead):
+  # Dynamic programming over the slots of the night. quality: (N, S) per object
+  # and slot (-inf: not allowed), blocks last at least min_block slots, switching
+  # targets costs overhead slots. Returns [(object index, first slot, end slot)].
+  quality = np.asarray(quality, dtype=np.float64)
+  n, slots = quality.shape
+  m = max(int(min_block), 1)
+  g = max(int(overhead), 0)
+  if n == 0 or slots == 0:
+    return []
+
+  free = np.full(slots + 1, -np.inf)   # telescope ready at slot boundary b
+  ended = np.full(slots + 1, -np.inf)  # a block (>= m slots) just ended at b
+  free[0] = 0.0
+  free_from_ended = np.zeros(slots + 1, dtype=bool)
+  ended_obj = np.zeros(slots + 1, dtype=int)
+  continued = np.zeros((slots, n), dtype=bool) # block of >= m slots continued
+  run = np.full((n, m), -np.inf) # run[o, l]: observing o for l+1 slots (l = m-1: >= m)
+
+  for s in range(slots):
+    if s > 0:
+      from_ended = ended[s - g] if s - g >= 1 else -np.inf
+      free_from_ended[s] = from_ended > free[s - 1]
+      free[s] = max(free[s - 1], from_ended)
+    new_run = np.empty_like(run)
+    if m == 1:
+      continued[s] = run[:, 0] > free[s]
+      new_run[:, 0] = np.maximum(run[:, 0], free[s]) + quality[:, s]
+    else:
+      new_run[:, 0] = free[s] + quality[:, s]
+      new_run[:, 1:m - 1] = run[:, 0:m - 2] + quality[:, s:s + 1]
+      continued[s] = run[:, m - 1] > run[:, m - 2]
+      new_run[:, m - 1] = np.maximum(run[:, m - 2], run[:, m - 1]) + quality[:, s]
+    run = new_run
+    ended_obj[s + 1] = int(np.argmax(run[:, m - 1]))
+    ended[s + 1] = run[ended_obj[s + 1], m - 1]
+
+  from_ended = ended[slots - g] if slots - g >= 1 else -np.inf
+  free_from_ended[slots] = from_ended > free[slots - 1]
+  free[slots] = max(free[slots - 1], from_ended)
+
+  # walk back through the decisions, no overhead needed after the last block
+  blocks = []
+  last = int(np.argmax(ended))
+  if ended[last] > free[slots]:
+    boundary, in_block = last, True
+  else:
+    boundary, in_block = slots, False
+  value = max(ended[last], free[slots])
+  while boundary > 0:
+    if in_block:
+      o = ended_obj[boundary]
+      s = boundary - 1
+      l = m - 1
+      while True:
+        if l == m - 1 and continued[s, o]:
+          s -= 1
+        elif l == 0:
+          break
+        else:
+          l -= 1
+          s -= 1
+      blocks.append((o, s, boundary))
+      boundary = s
+      in_block = False
+    elif free_from_ended[boundary]:
+      boundary -= g
+      in_block = True
+    else:
+      boundary -= 1
+  blocks.reverse()
+  if debug:
+    print("Schedule value: " + str(round(value, 3)) + ", " + str(len(blocks)) + " blocks")
+  return blocks
+
+##############################################################################
+# Ephemeris backends: sun/moon positions, twilight events and target alt/az
+# from astropy, skyfield or ephem behind one interface. Times are numpy arrays
+# of UTC Julian dates, every backend converts them once per call.
+
+class EphemerisBackend:
+  name = ""
+
+  def __init__(self, latitude, longitude, elevation):
+    self.latitude = float(latitude)
+    self.longitude = float(longitude)
+    self.elevation = float(elevation)
+
+  def sun_altaz(self, jd):
+    raise NotImplementedError
+
+  def moon_altaz(self, jd):
+    raise NotImplementedError
+
+  def moon_illumination(self, jd):
+    # illuminated fraction 0..1
+    raise NotImplementedError
+
+  def target_altaz(self, ra, dec, jd):
+    # ra, dec in deg (N,) -> alt, az in deg (N, T)
+    raise NotImplementedError
+
+  def twilight(self, day, horizon):
+    # sun crossing the horizon (deg) downwards in the evening of day and upwards
+    # the next morning as naive UTC datetimes, None if it does not happen
+    noon = Time(day.strftime("%Y-%m-%d") + " 12:00:00").utc.jd - self.longitude / 360.0
+    jd = noon + np.arange(0, 24 * 60 + 1) / (24.0 * 60.0) # minute grid from local noon to noon
+    alt, _ = self.sun_altaz(jd)
+    below = np.asarray(alt) < horizon
+    crossings = np.flatnonzero(np.diff(below.astype(np.int8)))
+    start, end = None, None
+    for i in crossings:
+      when = Time(jd[i + 1], format="jd", scale="utc").datetime
+      if below[i + 1] and start == None:
+        start = when
+      elif not below[i + 1] and start != None:
+        end = when
+    if start == None or end == None:
+      return None, None
+    return start, end
+
+class AstropyBackend(EphemerisBackend):
+  name = "astropy"
+
+  def _frame(self, jd):
+    from astropy.coordinates import EarthLocation
+    times = Time(jd, format="jd", scale="utc")
+    location = EarthLocation(lat=self.latitude * u.deg, lon=self.longitude * u.deg, height=self.elevation * u.m)
+    return times, AltAz(obstime=times, location=location)
+
+  def sun_altaz(self, jd):
+    times, frame = self._frame(jd)
+    altaz = get_sun(times).transform_to(frame)
+    return altaz.alt.deg, altaz.az.deg
+
+  def moon_altaz(self, jd):
+    times, frame = self._frame(jd)
+    altaz = get_body("moon", times, frame.location).transform_to(frame)
+    return altaz.alt.deg, altaz.az.deg
+
+  def moon_illumination(self, jd):
+    times, frame = self._frame(jd)
+    elongation = moon_elongation(get_sun(times), get_body("moon", times, frame.location))
+    return (1.0 - np.cos(elongation)) / 2.0
+
+  def target_altaz(self, ra, dec, jd):
+    from astropy.coordinates import SkyCoord
+    times, frame = self._frame(np.atleast_1d(jd)[None, :])
+    altaz = SkyCoord(ra=np.atleast_1d(ra) * u.deg, dec=np.atleast_1d(dec) * u.deg)[:, None].transform_to(frame)
+    return altaz.alt.deg, altaz.az.deg
+
+class SkyfieldBackend(EphemerisBackend):
+  name = "skyfield"
+
+  def __init__(self, latitude, longitude, elevation):
+    EphemerisBackend.__init__(self, latitude, longitude, elevation)
+    self.ts = load.timescale()
+    self.observer = ephemeris()['earth'] + wgs84.latlon(self.latitude, self.longitude, elevation_m=self.elevation)
+
+  def _time(self, jd):
+    # UTC Julian date -> skyfield time (leap seconds by astropy)
+    return self.ts.tt_jd(Time(np.asarray(jd, dtype=float), format="jd", scale="utc").tt.jd)
+
+  def _altaz(self, body, jd):
+    alt, az, _ = self.observer.at(self._time(jd)).observe(body).apparent().altaz()
+    return alt.degrees, az.degrees
+
+  def sun_altaz(self, jd):
+    return self._altaz(ephemeris()['sun'], jd)
+
+  def moon_altaz(self, jd):
+    return self._altaz(ephemeris()['moon'], jd)
+
+  def moon_illumination(self, jd):
+    eph = ephemeris()
+    return self.observer.at(self._time(jd)).observe(eph['moon']).apparent().fraction_illuminated(eph['sun'])
+
+  def target_altaz(self, ra, dec, jd):
+    from skyfield.api import Star
+    t = self._time(jd)
+    position = self.observer.at(t)
+    alt, az = [], []
+    for r, d in zip(np.atleast_1d(ra), np.atleast_1d(dec)):
+      a, z, _ = position.observe(Star(ra_hours=r / 15.0, dec_degrees=d)).apparent().altaz()
+      alt.append(a.degrees)
+      az.append(z.degrees)
+    return np.array(alt), np.array(az)
+
+class EphemBackend(EphemerisBackend):
+  name = "ephem"
+
+  def _observer(self):
+    observer = ephem.Observer()
+    observer.lat, observer.lon = str(self.latitude), str(self.longitude)
+    observer.elevation = self.elevation
+    observer.pressure = 0 # no refraction, like the other backends
+    return observer
+
+  def _altaz(self, body, jd):
+    # ephem is scalar: one compute() per sample
+    observer = self._observer()
+    alt, az = np.empty(len(jd)), np.empty(len(jd))
+    for i, d in enumerate(np.asarray(jd) - 2415020.0): # ephem dates count from 1899-12-31 12:00
+      observer.date = d
+      body.compute(observer)
+      alt[i], az[i] = body.alt, body.az
+    return np.degrees(alt), np.degrees(az)
+
+  def sun_altaz(self, jd):
+    return self._altaz(ephem.Sun(), jd)
+
+  def moon_altaz(self, jd):
+    return self._altaz(ephem.Moon(), jd)
+
+  def moon_illumination(self, jd):
+    observer = self._observer()
+    moon = ephem.Moon()
+    illumination = np.empty(len(jd))
+    for i, d in enumerate(np.asarray(jd) - 2415020.0):
+      observer.date = d
+      moon.compute(observer)
+      illumination[i] = moon.moon_phase
+    return illumination
+
+  def target_altaz(self, ra, dec, jd):
+    alt, az = [], []
+    for r, d in zip(np.atleast_1d(ra), np.atleast_1d(dec)):
+      star = ephem.FixedBody()
+      star._ra, star._dec = np.radians(r), np.radians(d)
+      a, z = self._altaz(star, jd)
+      alt.append(a)
+      az.append(z)
+    return np.array(alt), np.array(az)
+
+  def twilight(self, day, horizon):
+    observer = self._observer()
+    observer.horizon = str(horizon)
+    observer.date = day.strftime("%Y/%m/%d") + " 12:00"
+    sun = ephem.Sun()
+    try:
+      start = observer.next_setting(sun)
+      observer.date = start
+      end = observer.next_rising(sun)
+    except (ephem.AlwaysUpError, ephem.NeverUpError):
+      return None, None
+    return start.datetime(), end.datetime()
+
+backend_classes = {"astropy" : AstropyBackend, "skyfield" : SkyfieldBackend, "ephem" : EphemBackend}
+backend_cache = {}
+
+def get_backend(name, latitude, longitude, elevation):
+  key = (name, float(latitude), float(longitude), float(elevation))
+  if key not in backend_cache:
+    backend_cache[key] = backend_classes[name](latitude, longitude, elevation)
+  return backend_cache[key]
+
+def night_times(backend, day):
+  # same as astro_night_times() (naive UTC), from the backend
+  civil_night_start, civil_night_end = backend.twilight(day, -6)
+  nautical_night_start, nautical_night_end = backend.twilight(day, -12)
+  astronomical_night_start, astronomical_night_end = backend.twilight(day, -18)
+  return civil_night_start, civil_night_end, nautical_night_start, nautical_night_end, astronomical_night_start, astronomical_night_end
+
+##############################################################################
+# Solar system targets: planets from astropy's ephemeris, comets and asteroids
+# from MPC orbital elements with skyfield. They move during the night, so the
+# whole night grid goes through one ephemeris call per body.
+planets = ["mercury", "venus", "mars", "jupiter", "saturn", "uranus", "neptune"]
+
+def orbit(kind, row):
+  # skyfield body of a comet ("comet") or asteroid from a row of the MPC elements
+  from skyfield.data import mpc
+  from skyfield.constants import GM_SUN_Pitjeva_2005_km3_s2 as GM_SUN
+  if kind == "comet":
+    return ephemeris()['sun'] + mpc.comet_orbit(row, load.timescale(), GM_SUN)
+  return ephemeris()['sun'] + mpc.mpcorb_orbit(row, load.timescale(), GM_SUN)
+
+def body_track(body, night, location):
+  # alt, az, ra, dec in deg over the night grid, shape (T,);
+  # body: planet name or skyfield body (see orbit()), no refraction like fast_altaz()
+  times = night["times"]
+  if isinstance(body, str):
+    coords = get_body(body, times, location)
+    altaz = coords.transform_to(AltAz(obstime=times, location=location))
+    return altaz.alt.deg.astype(np.float32), altaz.az.deg.astype(np.float32), coords.ra.deg, coords.dec.deg
+  observer = ephemeris()['earth'] + wgs84.latlon(location.lat.deg, location.lon.deg, elevation_m=location.height.to_value(u.m))
+  apparent = observer.at(load.timescale().tt_jd(times.tt.jd)).observe(body).apparent()
+  alt, az, _ = apparent.altaz()
+  ra, dec, _ = apparent.radec()
+  return alt.degrees.astype(np.float32), az.degrees.astype(np.float32), ra.hours * 15.0, dec.degrees
+
+def benchmark_backends(latitude, longitude, elevation, midnight, ra, dec, samples=1000):
+  # runtime of each backend for one night and its deviation from astropy
+  import time
+  jd = midnight.utc.jd + np.linspace(-0.5, 0.5, samples)
+  results = {}
+  reference = None
+  for name in ["astropy", "skyfield", "ephem"]:
+    try:
+      backend = backend_classes[name](latitude, longitude, elevation)
+      timings = {}
+      values = {}
+      for what, call in [("sun", lambda: backend.sun_altaz(jd)), ("moon", lambda: backend.moon_altaz(jd)),
+                         ("illumination", lambda: backend.moon_illumination(jd)), ("targets", lambda: backend.target_altaz(ra, dec, jd)),
+                         ("twilight", lambda: backend.twilight((midnight - 12 * u.hour).datetime.date(), -18))]:
+        start = time.perf_counter()
+        values[what] = call()
+        timings[what] = time.perf_counter() - start
+      if reference == None:
+        reference = values
+      errors = dict(
+        sun = float(np.max(np.abs(np.asarray(values["sun"][0]) - reference["sun"][0]))),
+        moon = float(np.max(np.abs(np.asarray(values["moon"][0]) - reference["moon"][0]))),
+        illumination = float(np.max(np.abs(np.asarray(values["illumination"]) - reference["illumination"]))),
+        targets = float(np.max(np.abs(np.asarray(values["targets"][0]) - reference["targets"][0])))
+      )
+      results[name] = dict(timings=timings, errors=errors, twilight=values["twilight"])
+    except Exception as e:
+      print("Backend " + str(name) + " error: " + str(e))
+  return results
+
 def observation_night_directions(the_object, the_object_name, today, tomorrow, utcoffset, the_location):
   try:
     # observation directions 20 pm .. 4 am
@@ -158,7 +856,11 @@ def observation_night_directions(the_object, the_object_name, today, tomorrow, u
     print(str(e))
 
 
+@functools.lru_cache(maxsize=64) # same for every DSO of a night
 def astro_night_times(theDate, latitude, longitude, debug):
+  # civil, nautical and astronomical night (start, end) of the night starting at theDate
+  # as naive UTC datetimes like the night grid (see night_ephemeris()), never in the
+  # local time of the computer; None if the sun does not get that low
   civil_night_start = None
   civil_night_end = None
   nautical_night_start = None
@@ -185,32 +887,32 @@ def astro_night_times(theDate, latitude, longitude, debug):
 
   try:
     earth.horizon = "0"
-    #sunset = ephem.localtime(earth.next_setting(sun))
-    #sunrise = ephem.localtime(earth.next_rising(sun))
+    #sunset = earth.next_setting(sun).datetime()
+    #sunrise = earth.next_rising(sun).datetime()
 
     earth.horizon = "-6"
     earth.date = date_today
     sun.compute()
-    civil_night_start = ephem.localtime(earth.next_setting(sun))
+    civil_night_start = earth.next_setting(sun).datetime()
     earth.date = date_tomorrow  # make sure to hit the next day's rising
     sun.compute()
-    civil_night_end = ephem.localtime(earth.next_rising(sun))
+    civil_night_end = earth.next_rising(sun).datetime()
 
     earth.horizon = "-12"
     earth.date = date_today
     sun.compute()
-    nautical_night_start = ephem.localtime(earth.next_setting(sun))
+    nautical_night_start = earth.next_setting(sun).datetime()
     earth.date = date_tomorrow  # make sure to hit the next day's rising
     sun.compute()
-    nautical_night_end = ephem.localtime(earth.next_rising(sun))
+    nautical_night_end = earth.next_rising(sun).datetime()
 
     earth.horizon = "-18"
     earth.date = date_today
     sun.compute()
-    astronomical_night_start = ephem.localtime(earth.next_setting(sun))
+    astronomical_night_start = earth.next_setting(sun).datetime()
     earth.date = date_tomorrow  # make sure to hit the next day's rising
     sun.compute()
-    astronomical_night_end = ephem.localtime(earth.next_rising(sun))
+    astronomical_night_end = earth.next_rising(sun).datetime()
 
   # ephem throws an "AlwaysUpError" when there is no astronomical twilight (which occurs in summer in nordic countries)
   except ephem.AlwaysUpError:
@@ -248,6 +950,7 @@ def moon_data(theDate, theTime):
   ts = load.timescale()
   t = ts.utc(int(theDate.split(".")[2]), int(theDate.split(".")[1]), int(theDate.split(".")[0]), int(for_time[0]), int(for_time[1]))
 
+  eph = ephemeris()
   sun, moon, earth = eph['sun'], eph['moon'], eph['earth']
   #e = earth.at(t)
   mylocation = earth + wgs84.latlon(49.878708* N, 8.646927*W)
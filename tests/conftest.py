@@ -0,0 +1,5 @@
+# the modules of Solveighs DSO observation planning live in the repository root
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,56 @@
+# --calendar: moon-free dark time around known moon phases and over the turn of
+# the year (new moon 10.10.2026, full moon 26.10.2026 04:12 UTC)
+import os
+import datetime
+import pytest
+import calendar_utils
+import planning
+
+@pytest.fixture(scope="module")
+def calendar_dir(tmp_path_factory):
+  # calendars built once for the module, 10 minute samples keep the full year builds short
+  with pytest.MonkeyPatch.context() as monkeypatch:
+    monkeypatch.setattr(calendar_utils, "step_minutes", 10)
+    yield str(tmp_path_factory.mktemp("calendars"))
+
+@pytest.fixture
+def planner(calendar_dir):
+  return planning.Planner("Frankfurt", profile="embedded")
+
+def test_moon_free_hours_follow_the_moon(planner, calendar_dir):
+  calendar = planner.dark_calendar(2026, calendar_dir)
+  for day in (datetime.date(2026, 10, 9), datetime.date(2026, 10, 10)):
+    assert calendar.dark_hours(day) > 9
+    assert calendar.moon_free_hours(day) > calendar.dark_hours(day) - 0.25
+  for day in (datetime.date(2026, 10, 25), datetime.date(2026, 10, 26)):
+    assert calendar.dark_hours(day) > 10
+    assert calendar.moon_free_hours(day) == 0
+    assert calendar.intervals(day) == []
+
+def test_dark_nights_over_the_turn_of_the_year(planner, calendar_dir, monkeypatch):
+  loads = []
+  load_calendar = calendar_utils.load_calendar
+  def counted(file_name, key=None):
+    loads.append(file_name)
+    return load_calendar(file_name, key)
+  monkeypatch.setattr(calendar_utils, "load_calendar", counted)
+
+  nights = planner.dark_nights(datetime.date(2026, 12, 29), 6, calendar_dir)
+  assert [day for day, _, _, _ in nights] == [datetime.date(2026, 12, 29) + datetime.timedelta(days=d) for d in range(6)]
+  # the calendar of each year is read once (and again after building it), not every night
+  assert sorted(planner.calendars) == [2026, 2027]
+  assert sorted(set(os.path.basename(file_name) for file_name in loads)) == ["dark_time_Frankfurt_2026.npz", "dark_time_Frankfurt_2027.npz"]
+  assert len(loads) <= 4
+  for (day, moon_free_hours, dark_hours, intervals), (_, _, next_dark_hours, _) in zip(nights, nights[1:]):
+    assert abs(dark_hours - next_dark_hours) < 0.25
+    # the intervals belong to the night starting at day, in the evening or after midnight
+    for start, end in intervals:
+      assert datetime.datetime.combine(day, datetime.time(12)) < start < end < datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time(12))
+    assert sum((end - start).total_seconds() for start, end in intervals) / 3600.0 == pytest.approx(moon_free_hours, abs=0.01)
+
+def test_dark_nights_skip_short_nights(planner, calendar_dir):
+  planner.settings.min_dark_hours = 5
+  days = [day for day, _, _, _ in planner.dark_nights(datetime.date(2026, 10, 14), 14, calendar_dir)]
+  assert datetime.date(2026, 10, 14) in days
+  assert datetime.date(2026, 10, 25) not in days
+  assert days == sorted(days) and len(days) < 14
@@ -0,0 +1,70 @@
+# --best --resume: an interrupted run continues from its checkpoint and only
+# evaluates the remaining months, the restored months get their tracks again
+import os
+import numpy as np
+import pytest
+import config
+import catalogue_utils
+import checkpoint_utils
+import planning
+
+def planner_settings(tmp_path, monkeypatch):
+  # M31 from a catalogue file, offline: no Simbad, sun and moon from ephem
+  catalogue_file = str(tmp_path / "dsos.csv")
+  catalogue_utils.write_catalogue(catalogue_file, [dict(name="M31", ra=10.684708, dec=41.268750, object_type="AGN", magnitude=3.4, major_axis=177.8, minor_axis=69.7)])
+  monkeypatch.setattr(config, "catalogue_files", [str(tmp_path / "DSO_catalogue.csv")])
+  return dict(catalogue_file=catalogue_file, profile="embedded")
+
+def counting(planner, calls, stop_after=None):
+  # planner.evaluate() that counts its calls and is interrupted (Ctrl-C) after stop_after of them
+  evaluate = planner.evaluate
+  def counted(dso_name, dso_identifier, day, **kwargs):
+    if stop_after != None and len(calls) == stop_after:
+      raise KeyboardInterrupt()
+    calls.append(day)
+    return evaluate(dso_name, dso_identifier, day, **kwargs)
+  planner.evaluate = counted
+
+def test_best_resumes_after_interrupt(tmp_path, monkeypatch):
+  settings = planner_settings(tmp_path, monkeypatch)
+  file_name = str(tmp_path / "checkpoint" / "best_M31.pkl")
+  reference = planning.Planner("Frankfurt", **settings).best_dates("M31", year=2026, keep_tracks=True)
+  assert len(reference) == 12
+
+  calls = []
+  planner = planning.Planner("Frankfurt", **settings)
+  counting(planner, calls, stop_after=5)
+  checkpoint = checkpoint_utils.Checkpoint(file_name, "inputs", enabled=True)
+  with pytest.raises(KeyboardInterrupt):
+    planner.best_dates("M31", year=2026, checkpoint=checkpoint, keep_tracks=True)
+  checkpoint.save() # as the command line does when a run stops
+  checkpoint.close()
+  assert len(calls) == 5
+
+  calls = []
+  planner = planning.Planner("Frankfurt", **settings)
+  counting(planner, calls)
+  checkpoint = checkpoint_utils.Checkpoint(file_name, "inputs", enabled=True)
+  assert len(checkpoint.results) == 5
+  resumed = planner.best_dates("M31", year=2026, checkpoint=checkpoint, keep_tracks=True)
+  checkpoint.finish()
+  assert len(calls) == 7 # only the months after the interruption
+  assert not os.path.exists(file_name)
+
+  assert [dso.today for dso in resumed] == [dso.today for dso in reference]
+  for dso, expected in zip(resumed, reference):
+    assert dso.max_alt == pytest.approx(expected.max_alt)
+    assert dso.max_alt_time == expected.max_alt_time
+    np.testing.assert_allclose(dso.track_alt, expected.track_alt, atol=1e-4)
+    np.testing.assert_allclose(dso.track_az, expected.track_az, atol=1e-4)
+    np.testing.assert_allclose(dso.track_quality, expected.track_quality, atol=1e-6)
+
+def test_other_inputs_start_from_scratch(tmp_path, monkeypatch):
+  settings = planner_settings(tmp_path, monkeypatch)
+  file_name = str(tmp_path / "checkpoint" / "best_M31.pkl")
+  checkpoint = checkpoint_utils.Checkpoint(file_name, "inputs", enabled=True)
+  planning.Planner("Frankfurt", **settings).best_dates("M31", year=2026, checkpoint=checkpoint, keep_tracks=False)
+  checkpoint.save()
+  checkpoint.close()
+  assert len(checkpoint_utils.Checkpoint(file_name, "inputs", enabled=True).results) == 12
+  assert len(checkpoint_utils.Checkpoint(file_name, "other inputs", enabled=True).results) == 0
@@ -0,0 +1,28 @@
+# Planner.night_times(): the same naive UTC times with and without --backend,
+# whatever the time zone of the computer is
+import time
+import datetime
+import pytest
+import planning
+
+@pytest.fixture(params=["UTC", "America/New_York", "Asia/Tokyo"])
+def host_timezone(request, monkeypatch):
+  monkeypatch.setenv("TZ", request.param)
+  time.tzset()
+  yield request.param
+  monkeypatch.undo()
+  time.tzset()
+
+@pytest.mark.parametrize("site", ["Frankfurt", "Windhoek"])
+@pytest.mark.parametrize("day", [datetime.date(2026, 1, 15), datetime.date(2026, 3, 29), datetime.date(2026, 10, 19)])
+def test_night_times_agree(site, day, host_timezone):
+  default = planning.Planner(site).night_times(day)
+  ephem = planning.Planner(site, backend="ephem").night_times(day)
+  for start_or_end, expected in zip(default, ephem):
+    assert abs((start_or_end - expected).total_seconds()) < 3 * 60
+
+def test_night_times_are_utc():
+  # nautical night at Frankfurt on 19.10.2026: 17:38 - 04:42 UTC (19:38 - 05:42 summer time)
+  nautical_start, nautical_end = planning.Planner("Frankfurt").night_times(datetime.date(2026, 10, 19))[2:4]
+  assert abs((nautical_start - datetime.datetime(2026, 10, 19, 17, 38)).total_seconds()) < 3 * 60
+  assert abs((nautical_end - datetime.datetime(2026, 10, 20, 4, 42)).total_seconds()) < 3 * 60
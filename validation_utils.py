@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Accuracy versus speed validation of Solveighs DSO observation planning
+#
+# A reference dataset is computed once with the astropy path (Planner with the
+# astropy engine, astropy sun and moon, full sampling) for a series of nights
+# of a year: max. altitude during the night, its time and azimuth, visibility
+# and observability score of every catalogue object, each object evaluated by
+# Planner.evaluate() like an object of a catalogue file. The reference keeps
+# the names and positions of the objects, so a comparison needs no name
+# resolution. Any other engine, ephemeris backend or sampling is compared
+# against it: error distributions, agreement of direction and visibility,
+# overlap of the top-k ranking per night and the speedup.
+#
+
+import os
+import json
+import time
+import hashlib
+import datetime
+import numpy as np
+import sky_utils # own
+
+debug = False
+
+reference_version = 2
+reference_sites = ["Frankfurt", "Windhoek"]
+fields = ["max_alt", "max_alt_time", "max_alt_az", "visible", "score"]
+
+def reference_key(site, catalogue_contents, year, step_days):
+  # catalogue_contents: see Planner.catalogue_contents()
+  site_data = dict((k, site.get(k)) for k in ("latitude", "longitude", "elevation", "horizon", "horizon_file", "sky_brightness"))
+  data = json.dumps([reference_version, site_data, catalogue_contents, int(year), int(step_days)], sort_keys=True, default=str)
+  return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+def reference_file_name(base_dir, site, catalogue_name, year, step_days):
+  return os.path.join(base_dir, "validation", "reference_" + str(site["location"]) + "_" + str(catalogue_name) + "_" + str(year) + "_" + str(step_days) + "d.npz")
+
+def night_days(year, step_days=7):
+  # every step_days-th night of the year
+  first_night = datetime.date(int(year), 1, 1)
+  nights = (datetime.date(int(year) + 1, 1, 1) - first_night).days
+  return [first_night + datetime.timedelta(days=d) for d in range(0, nights, int(step_days))]
+
+def evaluate(planner, names, ra, dec, days, samples=None, chunk_size=500):
+  # (nights, objects) arrays of the fields from Planner.evaluate() with the engine and
+  # backend of the planner, the tracks of a chunk in one transformation as in
+  # Planner.evaluate_catalogue_file(); samples: points per night over the span of the
+  # sample grid of the planner (None: its grid); returns the arrays and the runtime in s
+  ra = np.asarray(ra, dtype=float)
+  dec = np.asarray(dec, dtype=float)
+  if samples != None and int(samples) != len(planner.sample_hours):
+    planner.sample_hours = np.linspace(float(planner.sample_hours[0]), float(planner.sample_hours[-1]), int(samples)).astype(np.float32)
+  result = dict((field, np.full((len(days), len(ra)), np.nan, dtype=np.float32)) for field in fields)
+
+  sky_utils.night_cache.clear() # every run pays for its sun and moon
+  planner.twilight_times.clear()
+  start = time.perf_counter()
+  for n, day in enumerate(days):
+    night = planner.night(day)
+    midnight = planner.midnight(day).tt.datetime # time scale of DSOResult.max_alt_time
+    for first in range(0, len(ra), int(chunk_size)):
+      last = min(first + int(chunk_size), len(ra))
+      alt, az = planner.targets_altaz(ra[first:last], dec[first:last], night)
+      for i in range(last - first):
+        record = dict(name=names[first + i], ra=float(ra[first + i]), dec=float(dec[first + i]))
+        dso = planner.evaluate_isolated(record["name"], record["name"], day, record=record, track=(alt[i], az[i]))
+        if dso == None:
+          continue
+        if dso.max_alt_time != -1: # -1: no dark samples, see DSO.max_altitudes()
+          result["max_alt"][n, first + i] = dso.max_alt
+          result["max_alt_time"][n, first + i] = (dso.max_alt_time - midnight).total_seconds() / 3600.0
+          result["max_alt_az"][n, first + i] = dso.max_alt_az
+        result["visible"][n, first + i] = dso.visible
+        result["score"][n, first + i] = dso.observability
+    if debug:
+      print("Validation: night " + str(day) + " (" + str(n + 1) + " of " + str(len(days)) + ")")
+  return result, time.perf_counter() - start
+
+def save_reference(file_name, key, names, ra, dec, days, result, seconds):
+  os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+  np.savez_compressed(file_name, key=key, names=np.array(names, dtype=str), ra=np.asarray(ra, dtype=float), dec=np.asarray(dec, dtype=float),
+                      days=np.array([d.isoformat() for d in days]), seconds=seconds, **result)
+
+def load_reference(file_name, key=None):
+  # (names, ra, dec, result, seconds) or None if missing or built from other inputs
+  if not os.path.isfile(file_name):
+    return None
+  with np.load(file_name, allow_pickle=False) as data:
+    if key != None and (str(data["key"]) != key or "ra" not in data.files):
+      if debug:
+        print("Reference " + str(file_name) + " is outdated")
+      return None
+    return [str(name) for name in data["names"]], data["ra"], data["dec"], dict((field, data[field]) for field in fields), float(data["seconds"])
+
+def build_reference(planner, file_name, key, names, ra, dec, days, chunk_size=500):
+  # reference of the objects computed with the planner (astropy engine, no backend, full sampling) and stored
+  print("Build reference " + str(file_name) + " (" + str(len(days)) + " nights x " + str(len(names)) + " DSOs)...")
+  result, seconds = evaluate(planner, names, ra, dec, days, None, chunk_size)
+  save_reference(file_name, key, names, ra, dec, days, result, seconds)
+  return names, np.asarray(ra, dtype=float), np.asarray(dec, dtype=float), result, seconds
+
+def distribution(errors):
+  # median, 95th percentile and maximum of absolute errors
+  if len(errors) == 0:
+    return dict(median=0.0, p95=0.0, max=0.0)
+  return dict(median=float(np.median(errors)), p95=float(np.percentile(errors, 95)), max=float(np.max(errors)))
+
+def compare(reference, candidate, k=10):
+  # errors of the candidate (arcsec, minutes) and agreement with the reference
+  both = np.isfinite(reference["max_alt_time"]) & np.isfinite(candidate["max_alt_time"])
+  daz = (candidate["max_alt_az"] - reference["max_alt_az"] + 180.0) % 360.0 - 180.0
+  direction = np.vectorize(sky_utils.compass_direction, otypes=[str])
+  overlaps = []
+  for n in range(len(reference["score"])):
+    best = set(sky_utils.top_k(np.nan_to_num(reference["score"][n]), k))
+    if len(best) > 0:
+      overlaps.append(len(best & set(sky_utils.top_k(np.nan_to_num(candidate["score"][n]), k))) / float(len(best)))
+  return dict(
+    max_alt = distribution(np.abs(candidate["max_alt"] - reference["max_alt"])[both] * 3600.0),
+    max_alt_time = distribution(np.abs(candidate["max_alt_time"] - reference["max_alt_time"])[both] * 60.0),
+    max_alt_az = distribution(np.abs(daz)[both] * 3600.0),
+    direction = float(np.mean(direction(reference["max_alt_az"][both]) == direction(candidate["max_alt_az"][both]))) if both.any() else 1.0,
+    visible = float(np.mean(reference["visible"] == candidate["visible"])),
+    top_k = dict(k=int(k), mean=float(np.mean(overlaps)) if overlaps else 1.0, min=float(np.min(overlaps)) if overlaps else 1.0)
+  )
+
+def format_report(report):
+  # lines of a validation report
+  def line(name, d, unit):
+    return "  " + name + ": median " + str(round(d["median"], 1)) + unit + ", 95% " + str(round(d["p95"], 1)) + unit + ", max " + str(round(d["max"], 1)) + unit
+  return [line("max. altitude", report["max_alt"], "\""),
+          line("time of max. altitude", report["max_alt_time"], " min"),
+          line("azimuth at max. altitude", report["max_alt_az"], "\""),
+          "  direction agrees: " + str(round(100 * report["direction"], 2)) + " %, visibility agrees: " + str(round(100 * report["visible"], 2)) + " %",
+          "  top-" + str(report["top_k"]["k"]) + " overlap: mean " + str(round(100 * report["top_k"]["mean"], 1)) + " %, min " + str(round(100 * report["top_k"]["min"], 1)) + " %"]
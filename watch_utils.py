@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Live "what's up now" table of Solveighs DSO observation planning
+#
+# The alt/az tracks of all objects are computed once for the whole night.
+# Everything that depends on "now" is derived from precomputed per-sample
+# tables (next setting / next rising sample, culmination sample), so one
+# refresh only interpolates between two samples and reads a few columns.
+#
+
+import numpy as np
+
+debug = False
+
+def _next_event(events):
+  # (N, T) bool -> (N, T) index of the next event at or after every sample, T if none
+  samples = events.shape[1]
+  index = np.where(events, np.arange(samples, dtype=np.int32)[None, :], samples)
+  return np.minimum.accumulate(index[:, ::-1], axis=1)[:, ::-1]
+
+class WatchTable:
+
+  def __init__(self, names, hours, alt, az, free, sun_alt=None):
+    # hours: (T,) hours from midnight, alt/az: (N, T) tracks, free: (N, T) above the local horizon
+    self.names = list(names)
+    self.hours = np.asarray(hours, dtype=np.float64)
+    self.alt = np.asarray(alt, dtype=np.float32)
+    self.az = np.asarray(az, dtype=np.float32)
+    self.sun_alt = None if sun_alt is None else np.asarray(sun_alt, dtype=np.float32)
+    self.step = (self.hours[-1] - self.hours[0]) / (len(self.hours) - 1)
+
+    # a sample is a setting (rising) if the object is up (down) and down (up) at the next one
+    sets = np.zeros_like(free)
+    sets[:, :-1] = free[:, :-1] & ~free[:, 1:]
+    rises = np.zeros_like(free)
+    rises[:, :-1] = ~free[:, :-1] & free[:, 1:]
+    self.free = free
+    self.next_set = _next_event(sets)
+    self.next_rise = _next_event(rises)
+    self.culmination = np.argmax(self.alt, axis=1)
+    self.tick = None
+
+  def state(self, hour):
+    # current altitude, azimuth and time to culmination/setting/rising (hours, nan if not tonight)
+    position = (hour - self.hours[0]) / self.step
+    position = min(max(position, 0.0), len(self.hours) - 1.0)
+    i = min(int(position), len(self.hours) - 2)
+    weight = position - i
+    if debug and i != self.tick:
+      print("Watch: sample " + str(i))
+    self.tick = i
+
+    alt = self.alt[:, i] + (self.alt[:, i + 1] - self.alt[:, i]) * weight
+    # azimuth across north: interpolate the wrapped difference
+    daz = (self.az[:, i + 1] - self.az[:, i] + 180.0) % 360.0 - 180.0
+    az = (self.az[:, i] + daz * weight) % 360.0
+    up = self.free[:, i + 1] if weight > 0.5 else self.free[:, i]
+
+    hours = np.append(self.hours, np.nan) # index T -> no event
+    to_culmination = self.hours[self.culmination] - hour
+    to_culmination[to_culmination < 0] = np.nan
+    to_set = hours[self.next_set[:, i]] - hour
+    to_rise = hours[self.next_rise[:, i]] - hour
+    state = dict(alt=alt, az=az, up=up, to_culmination=to_culmination, to_set=to_set, to_rise=to_rise)
+    if self.sun_alt is not None:
+      state["sun_alt"] = float(self.sun_alt[i] + (self.sun_alt[i + 1] - self.sun_alt[i]) * weight)
+    return state
+
+def format_duration(hours):
+  if hours is None or not np.isfinite(hours):
+    return "-"
+  minutes = int(round(hours * 60))
+  return "%d:%02d" % (minutes // 60, minutes % 60)
+
+def format_table(table, state, compass_direction, count=None):
+  # lines of the table: objects above the horizon by altitude, then the next risings
+  up = np.flatnonzero(state["up"])
+  up = up[np.argsort(-state["alt"][up], kind="stable")]
+  down = np.flatnonzero(~state["up"] & np.isfinite(state["to_rise"]))
+  down = down[np.argsort(state["to_rise"][down], kind="stable")]
+  if count != None:
+    up = up[:int(count)]
+    down = down[:max(int(count) - len(up), 0)]
+
+  lines = ["%-16s %6s %6s %-4s %8s %8s" % ("DSO", "Alt", "Az", "Dir", "Culm. in", "Sets in")]
+  for i in up:
+    lines.append("%-16s %6.1f %6.1f %-4s %8s %8s" % (table.names[i][:16], state["alt"][i], state["az"][i], compass_direction(state["az"][i]),
+                                                     format_duration(state["to_culmination"][i]), format_duration(state["to_set"][i])))
+  if len(down) > 0:
+    lines.append("")
+    lines.append("%-16s %8s" % ("Rising", "Rises in"))
+    for i in down:
+      lines.append("%-16s %8s" % (table.names[i][:16], format_duration(state["to_rise"][i])))
+  return lines